@@ -1,9 +1,14 @@
 """Sistema de recomendaciones con IA"""
 from typing import Dict, List
 from sqlalchemy.orm import Session
+from app.config import get_settings
 from app.models import StudentTopicProgress, MathTopic, ExerciseAttempt, User
+from app.services.cache import TTLCache
 import json
 
+# Análisis de clase por paralelo, etiquetado con sus estudiantes
+class_recommendations_cache = TTLCache(get_settings().CLASS_RECOMMENDATIONS_TTL_SECONDS)
+
 
 class AIRecommendations:
     """Sistema de recomendaciones inteligentes para estudiantes"""
@@ -144,18 +149,24 @@ class AIRecommendations:
     @staticmethod
     def generate_class_recommendations(paralelo_id: str, db: Session) -> Dict:
         """
-        Genera recomendaciones para el profesor sobre el curso en general
+        Genera recomendaciones para el profesor sobre el curso en general.
+        El análisis se cachea por paralelo durante CLASS_RECOMMENDATIONS_TTL_SECONDS
+        y se invalida cuando cambia el progreso de alguno de sus estudiantes.
         """
         from app.models import Enrollment
         from sqlalchemy import func
 
-        # Obtener estudiantes del paralelo
-        enrollments = db.query(Enrollment).filter(
-            Enrollment.paralelo_id == paralelo_id,
-            Enrollment.is_active == True
-        ).all()
+        cached = class_recommendations_cache.get(str(paralelo_id))
+        if cached is not None:
+            return cached
 
-        student_ids = [e.student_id for e in enrollments]
+        # Obtener estudiantes del paralelo
+        student_ids = [
+            row.student_id for row in db.query(Enrollment.student_id).filter(
+                Enrollment.paralelo_id == paralelo_id,
+                Enrollment.is_active == True
+            ).all()
+        ]
 
         if not student_ids:
             return {
@@ -165,27 +176,32 @@ class AIRecommendations:
                 "strong_topics": []
             }
 
-        # Analizar temas por estudiante
+        # Analizar todos los temas en una sola consulta agrupada
+        rows = db.query(
+            StudentTopicProgress.topic,
+            func.avg(StudentTopicProgress.mastery_level).label("mastery"),
+            func.sum(StudentTopicProgress.total_attempts).label("attempts"),
+            func.sum(StudentTopicProgress.correct_attempts).label("correct"),
+            func.count(StudentTopicProgress.id).label("students")
+        ).filter(
+            StudentTopicProgress.student_id.in_(student_ids)
+        ).group_by(StudentTopicProgress.topic).all()
+
+        # Mismo orden que el enum de temas
+        topic_order = {topic: index for index, topic in enumerate(MathTopic)}
         topic_stats = {}
 
-        for topic in MathTopic:
-            progress_list = db.query(StudentTopicProgress).filter(
-                StudentTopicProgress.student_id.in_(student_ids),
-                StudentTopicProgress.topic == topic
-            ).all()
+        for row in sorted(rows, key=lambda row: topic_order[row.topic]):
+            total_attempts = int(row.attempts or 0)
+            total_correct = int(row.correct or 0)
+            accuracy = (total_correct / total_attempts * 100) if total_attempts > 0 else 0
 
-            if progress_list:
-                avg_mastery = sum(p.mastery_level for p in progress_list) / len(progress_list)
-                total_attempts = sum(p.total_attempts for p in progress_list)
-                total_correct = sum(p.correct_attempts for p in progress_list)
-                accuracy = (total_correct / total_attempts * 100) if total_attempts > 0 else 0
-
-                topic_stats[topic] = {
-                    "mastery": avg_mastery,
-                    "accuracy": accuracy,
-                    "students_practicing": len(progress_list),
-                    "total_attempts": total_attempts
-                }
+            topic_stats[row.topic] = {
+                "mastery": float(row.mastery),
+                "accuracy": accuracy,
+                "students_practicing": row.students,
+                "total_attempts": total_attempts
+            }
 
         # Identificar temas débiles y fuertes
         weak_topics = []
@@ -239,7 +255,7 @@ class AIRecommendations:
         else:
             overall_health = "unknown"
 
-        return {
+        result = {
             "overall_health": overall_health,
             "recommendations": recommendations,
             "weak_topics": weak_topics,
@@ -247,6 +263,14 @@ class AIRecommendations:
             "average_mastery": round(avg_class_mastery, 1) if topic_stats else 0
         }
 
+        class_recommendations_cache.set(str(paralelo_id), result, tags=[str(student_id) for student_id in student_ids])
+        return result
+
+    @staticmethod
+    def invalidate_class_recommendations(student_id: str):
+        """Descartar el análisis cacheado de los paralelos del estudiante (llamar después del commit)"""
+        class_recommendations_cache.invalidate_tag(str(student_id))
+
     @staticmethod
     def _get_topic_name(topic: MathTopic) -> str:
         """Obtiene el nombre en español del tema"""
@@ -264,44 +288,55 @@ class AIRecommendations:
 
     @staticmethod
     def update_topic_progress(student_id: str, topic: MathTopic, is_correct: bool, db: Session):
-        """Actualiza el progreso del estudiante en un tema específico"""
-        from datetime import datetime
-
-        progress = db.query(StudentTopicProgress).filter(
-            StudentTopicProgress.student_id == student_id,
-            StudentTopicProgress.topic == topic
-        ).first()
-
-        if not progress:
-            progress = StudentTopicProgress(
-                student_id=student_id,
-                topic=topic,
-                total_attempts=0,
-                correct_attempts=0,
-                wrong_attempts=0,
-                mastery_level=0
-            )
-            db.add(progress)
-
-        progress.total_attempts += 1
-        if is_correct:
-            progress.correct_attempts += 1
-        else:
-            progress.wrong_attempts += 1
-
-        progress.last_practiced = datetime.now()
+        """
+        Actualiza el progreso del estudiante en un tema específico con un solo
+        INSERT ... ON CONFLICT DO UPDATE. No hace commit: forma parte de la transacción del llamador.
+        Retorna la fila actualizada (total_attempts, correct_attempts, mastery_level, needs_improvement).
+        """
+        from sqlalchemy import func, case, cast, literal, Integer
+        from sqlalchemy.dialects.postgresql import insert
 
-        # Calcular nivel de dominio (mastery_level)
-        accuracy = (progress.correct_attempts / progress.total_attempts * 100) if progress.total_attempts > 0 else 0
+        correct = 1 if is_correct else 0
 
-        # Fórmula de mastery: considera tanto la precisión como la cantidad de práctica
-        # Máximo 100%, pero requiere tanto buena precisión como suficiente práctica
-        practice_factor = min(progress.total_attempts / 20, 1.0)  # Máximo en 20 intentos
-        accuracy_factor = accuracy / 100
+        # Primer intento: practice_factor = 1/20
+        first_mastery = int(min(1 / 20, 1.0) * correct * 100)
 
-        progress.mastery_level = int(practice_factor * accuracy_factor * 100)
+        stmt = insert(StudentTopicProgress).values(
+            student_id=student_id,
+            topic=topic,
+            total_attempts=1,
+            correct_attempts=correct,
+            wrong_attempts=1 - correct,
+            mastery_level=first_mastery,
+            needs_improvement=first_mastery < 50 or correct * 100 < 60,
+            last_practiced=func.now()
+        )
 
-        # Marcar si necesita mejora
-        progress.needs_improvement = progress.mastery_level < 50 or accuracy < 60
+        total = StudentTopicProgress.total_attempts + 1
+        correct_total = StudentTopicProgress.correct_attempts + correct
 
-        db.commit()
+        # Fórmula de mastery: considera tanto la precisión como la cantidad de práctica
+        # practice_factor = min(total / 20, 1), accuracy_factor = correct / total
+        accuracy = correct_total * literal(100.0) / total
+        mastery = cast(func.floor(func.least(total / literal(20.0), literal(1.0)) * accuracy), Integer)
+
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[StudentTopicProgress.student_id, StudentTopicProgress.topic],
+            set_={
+                "total_attempts": total,
+                "correct_attempts": correct_total,
+                "wrong_attempts": StudentTopicProgress.wrong_attempts + (1 - correct),
+                "mastery_level": mastery,
+                # Marcar si necesita mejora
+                "needs_improvement": case((mastery < 50, True), (accuracy < 60, True), else_=False),
+                "last_practiced": func.now(),
+                "updated_at": func.now()
+            }
+        ).returning(
+            StudentTopicProgress.total_attempts,
+            StudentTopicProgress.correct_attempts,
+            StudentTopicProgress.mastery_level,
+            StudentTopicProgress.needs_improvement
+        )
+
+        return db.execute(stmt).one()
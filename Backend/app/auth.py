@@ -4,9 +4,11 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.config import get_settings
-from app.database import get_db
+from app.database import get_db, get_async_db
 from app.models import User, UserRole
 from app.schemas import TokenData
 
@@ -56,6 +58,38 @@ def decode_token(token: str) -> TokenData:
         )
 
 
+def create_exercise_token(data: dict) -> str:
+    """
+    Crea un token de ejercicio: JWT firmado (HMAC) con expiración. No lleva la respuesta
+    (se regenera desde la semilla al responder), así que no necesita cifrado
+    """
+    to_encode = data.copy()
+    to_encode.update({
+        "typ": "exercise",
+        "exp": datetime.utcnow() + timedelta(minutes=settings.EXERCISE_TOKEN_EXPIRES_MINUTES)
+    })
+    return jwt.encode(to_encode, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
+
+
+def decode_exercise_token(token: str) -> dict:
+    """Valida la firma y la expiración de un token de ejercicio"""
+    try:
+        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+    except JWTError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ejercicio inválido o expirado"
+        )
+
+    if payload.get("typ") != "exercise":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ejercicio inválido o expirado"
+        )
+
+    return payload
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
@@ -65,6 +99,35 @@ async def get_current_user(
     token_data = decode_token(token)
 
     user = db.query(User).filter(User.email == token_data.email).first()
+    return _validate_user(user)
+
+
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """Obtiene el usuario actual desde el token usando la sesión asíncrona"""
+    token = credentials.credentials
+    token_data = decode_token(token)
+
+    result = await db.execute(select(User).where(User.email == token_data.email))
+    user = result.scalars().first()
+    return _validate_user(user)
+
+
+async def get_current_user_from_query(
+    token: str,
+    db: Session = Depends(get_db)
+) -> User:
+    """Obtiene el usuario actual desde un token en la query (EventSource no permite cabeceras)"""
+    token_data = decode_token(token)
+
+    user = db.query(User).filter(User.email == token_data.email).first()
+    return _validate_user(user)
+
+
+def _validate_user(user: Optional[User]) -> User:
+    """Verifica que el usuario exista y esté activo"""
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
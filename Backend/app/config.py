@@ -15,6 +15,10 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
     JWT_EXPIRES_IN: int = 7  # días
 
+    # Ejercicios sin estado: next-exercise entrega un token firmado en lugar de guardar el ejercicio
+    STATELESS_EXERCISES: bool = False
+    EXERCISE_TOKEN_EXPIRES_MINUTES: int = 30
+
     # Server
     PORT: int = 3000
     NODE_ENV: str = "development"
@@ -37,6 +41,24 @@ class Settings(BaseSettings):
     # Frontend URL
     FRONTEND_URL: str = "http://localhost:8080"
 
+    # Pool de ejercicios pregenerados
+    EXERCISE_POOL_SIZE: int = 20  # ejercicios listos por (tema, dificultad, banda)
+    EXERCISE_POOL_REFILL_THRESHOLD: int = 5  # rellenar cuando la cola baja de este valor
+    EXERCISE_POOL_MAX_AGE_SECONDS: int = 1800  # antigüedad máxima de un ejercicio servido desde el pool
+    EXERCISE_POOL_CLEANUP_JOB_SECONDS: int = 3600  # borrado de ejercicios del pool sin responder
+
+    # Snapshots de desempeño por paralelo
+    PERFORMANCE_SNAPSHOT_TTL_SECONDS: int = 300  # antigüedad a partir de la cual un snapshot está vencido
+    PERFORMANCE_REFRESH_INTERVAL_SECONDS: int = 120  # frecuencia de la tarea refresh_performance_snapshots
+
+    # Recomendaciones por paralelo
+    CLASS_RECOMMENDATIONS_TTL_SECONDS: int = 300  # vigencia del análisis cacheado de un paralelo
+
+    # Planificador de tareas en segundo plano
+    SCHEDULER_TICK_SECONDS: int = 15  # frecuencia con que se revisan las tareas pendientes
+    CHALLENGE_DEADLINE_JOB_SECONDS: int = 30  # cierre de versus con tiempo límite vencido
+    GOAL_EXPIRY_JOB_SECONDS: int = 300  # marcado masivo de metas vencidas
+
     @property
     def EMAIL_CONFIGURED(self) -> bool:
         return bool(self.SMTP_USER and self.SMTP_PASSWORD)
@@ -45,6 +67,10 @@ class Settings(BaseSettings):
     def DATABASE_URL(self) -> str:
         return f"postgresql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
 
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        return f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+
     @property
     def CORS_ORIGINS_LIST(self) -> list[str]:
         return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
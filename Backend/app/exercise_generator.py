@@ -1,35 +1,66 @@
 """Generador de ejercicios matemáticos"""
 import random
 import json
-from typing import Dict, List, Tuple
+import hmac
+import hashlib
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
 from app.models import MathTopic, ExerciseDifficulty
+from app.config import get_settings
+
+settings = get_settings()
 
 
 class ExerciseGenerator:
     """Generador de ejercicios matemáticos dinámicos"""
 
+    # Puntos base por dificultad
+    BASE_POINTS = {
+        ExerciseDifficulty.easy: 10,
+        ExerciseDifficulty.medium: 20,
+        ExerciseDifficulty.hard: 35
+    }
+
     @staticmethod
-    def generate_exercise(topic: MathTopic, difficulty: ExerciseDifficulty, current_score: int = 0) -> Dict:
-        """Genera un ejercicio basado en el tema y dificultad"""
+    def generate_exercise(topic: MathTopic, difficulty: ExerciseDifficulty, current_score: int = 0, seed: Optional[int] = None) -> Dict:
+        """
+        Genera un ejercicio basado en el tema y dificultad.
+        Con la misma semilla (y los mismos parámetros) el ejercicio es idéntico.
+        """
+        # Instancia propia por llamada: no depende del estado global de random
+        rng = random.Random(seed)
 
         # Ajustar dificultad basada en puntaje
         effective_difficulty = ExerciseGenerator._adjust_difficulty_by_score(difficulty, current_score)
 
         if topic == MathTopic.combined_operations:
-            return ExerciseGenerator._generate_combined_operations(effective_difficulty)
+            return ExerciseGenerator._generate_combined_operations(effective_difficulty, rng)
         elif topic == MathTopic.linear_equations:
-            return ExerciseGenerator._generate_linear_equation(effective_difficulty)
+            return ExerciseGenerator._generate_linear_equation(effective_difficulty, rng)
         elif topic == MathTopic.quadratic_equations:
-            return ExerciseGenerator._generate_quadratic_equation(effective_difficulty)
+            return ExerciseGenerator._generate_quadratic_equation(effective_difficulty, rng)
         elif topic == MathTopic.fractions:
-            return ExerciseGenerator._generate_fractions(effective_difficulty)
+            return ExerciseGenerator._generate_fractions(effective_difficulty, rng)
         elif topic == MathTopic.operations:
-            return ExerciseGenerator._generate_basic_operations(effective_difficulty)
+            return ExerciseGenerator._generate_basic_operations(effective_difficulty, rng)
         elif topic == MathTopic.percentages:
-            return ExerciseGenerator._generate_percentages(effective_difficulty)
+            return ExerciseGenerator._generate_percentages(effective_difficulty, rng)
         else:
             # Por defecto, operaciones combinadas
-            return ExerciseGenerator._generate_combined_operations(effective_difficulty)
+            return ExerciseGenerator._generate_combined_operations(effective_difficulty, rng)
+
+    @staticmethod
+    def session_seed(session_id, seq: int) -> int:
+        """
+        Semilla determinista para el ejercicio número `seq` de una sesión.
+        Se deriva con HMAC del secreto del servidor para que el cliente no pueda predecirla.
+        """
+        digest = hmac.new(
+            settings.JWT_SECRET.encode(),
+            f"{session_id}:{seq}".encode(),
+            hashlib.sha256
+        ).digest()
+        return int.from_bytes(digest[:8], "big")
 
     @staticmethod
     def _adjust_difficulty_by_score(difficulty: ExerciseDifficulty, score: int) -> ExerciseDifficulty:
@@ -52,13 +83,7 @@ class ExerciseGenerator:
         Calcula puntos ganados/perdidos
         Returns: (points_earned, points_lost)
         """
-        base_points = {
-            ExerciseDifficulty.easy: 10,
-            ExerciseDifficulty.medium: 20,
-            ExerciseDifficulty.hard: 35
-        }
-
-        points = base_points.get(difficulty, 10)
+        points = ExerciseGenerator.BASE_POINTS.get(difficulty, 10)
 
         if is_correct:
             # Bonus por velocidad (si responde en menos de 30 segundos)
@@ -84,13 +109,26 @@ class ExerciseGenerator:
             return (0, penalty)
 
     @staticmethod
-    def _generate_combined_operations(difficulty: ExerciseDifficulty) -> Dict:
+    def exercise_points(difficulty: ExerciseDifficulty, current_score: int) -> int:
+        """Cuántos puntos vale un ejercicio (valor guardado y mostrado al estudiante)"""
+        points = ExerciseGenerator.BASE_POINTS.get(difficulty, 10)
+
+        # Aumentar valor de puntos con score alto
+        if current_score > 500:
+            points = int(points * 1.3)
+        elif current_score > 200:
+            points = int(points * 1.15)
+
+        return points
+
+    @staticmethod
+    def _generate_combined_operations(difficulty: ExerciseDifficulty, rng: random.Random) -> Dict:
         """Genera operaciones combinadas"""
         if difficulty == ExerciseDifficulty.easy:
             # 2-3 operaciones simples
-            a = random.randint(1, 20)
-            b = random.randint(1, 20)
-            c = random.randint(1, 10)
+            a = rng.randint(1, 20)
+            b = rng.randint(1, 20)
+            c = rng.randint(1, 10)
 
             operations = [
                 (f"{a} + {b} - {c}", a + b - c),
@@ -98,14 +136,14 @@ class ExerciseGenerator:
                 (f"{a + b} - {c} × 2", (a + b) - (c * 2)),
             ]
 
-            question, answer = random.choice(operations)
+            question, answer = rng.choice(operations)
 
         elif difficulty == ExerciseDifficulty.medium:
             # 3-4 operaciones con paréntesis
-            a = random.randint(2, 15)
-            b = random.randint(2, 15)
-            c = random.randint(2, 10)
-            d = random.randint(1, 5)
+            a = rng.randint(2, 15)
+            b = rng.randint(2, 15)
+            c = rng.randint(2, 10)
+            d = rng.randint(1, 5)
 
             operations = [
                 (f"({a} + {b}) × {c} - {d}", (a + b) * c - d),
@@ -114,14 +152,14 @@ class ExerciseGenerator:
                 (f"{a} + ({b} × {c}) - {d}", a + (b * c) - d),
             ]
 
-            question, answer = random.choice(operations)
+            question, answer = rng.choice(operations)
 
         else:  # hard
             # 4-5 operaciones complejas con múltiples paréntesis
-            a = random.randint(5, 20)
-            b = random.randint(3, 15)
-            c = random.randint(2, 10)
-            d = random.randint(2, 8)
+            a = rng.randint(5, 20)
+            b = rng.randint(3, 15)
+            c = rng.randint(2, 10)
+            d = rng.randint(2, 8)
 
             operations = [
                 (f"(({a} + {b}) × {c}) - ({d} × 2)", ((a + b) * c) - (d * 2)),
@@ -129,18 +167,18 @@ class ExerciseGenerator:
                 (f"({a} × {b}) ÷ {c} + ({d} × {c})", (a * b) // c + (d * c)),
             ]
 
-            question, answer = random.choice(operations)
+            question, answer = rng.choice(operations)
 
         # Generar opciones incorrectas
         correct_answer = int(answer)
         wrong_answers = [
-            correct_answer + random.randint(1, 5),
-            correct_answer - random.randint(1, 5),
+            correct_answer + rng.randint(1, 5),
+            correct_answer - rng.randint(1, 5),
             int(correct_answer * 1.1),
         ]
 
         options = [str(correct_answer)] + [str(w) for w in wrong_answers]
-        random.shuffle(options)
+        rng.shuffle(options)
 
         return {
             "title": "Operación Combinada",
@@ -152,13 +190,13 @@ class ExerciseGenerator:
         }
 
     @staticmethod
-    def _generate_linear_equation(difficulty: ExerciseDifficulty) -> Dict:
+    def _generate_linear_equation(difficulty: ExerciseDifficulty, rng: random.Random) -> Dict:
         """Genera ecuaciones lineales"""
         if difficulty == ExerciseDifficulty.easy:
             # ax + b = c
-            a = random.randint(1, 5)
-            x_val = random.randint(1, 10)
-            c = a * x_val + random.randint(-10, 10)
+            a = rng.randint(1, 5)
+            x_val = rng.randint(1, 10)
+            c = a * x_val + rng.randint(-10, 10)
             b = c - (a * x_val)
 
             if b >= 0:
@@ -168,23 +206,23 @@ class ExerciseGenerator:
 
         elif difficulty == ExerciseDifficulty.medium:
             # ax + b = cx + d
-            a = random.randint(2, 8)
-            c = random.randint(1, a-1) if a > 1 else 1
-            x_val = random.randint(1, 10)
-            d = random.randint(-15, 15)
+            a = rng.randint(2, 8)
+            c = rng.randint(1, a-1) if a > 1 else 1
+            x_val = rng.randint(1, 10)
+            d = rng.randint(-15, 15)
             b = (c - a) * x_val + d
 
             equation = f"{a}x + {b} = {c}x + {d}"
 
         else:  # hard
             # a(x + b) = c(x - d) + e
-            a = random.randint(2, 6)
-            b = random.randint(1, 8)
-            c = random.randint(1, 5)
-            d = random.randint(1, 8)
+            a = rng.randint(2, 6)
+            b = rng.randint(1, 8)
+            c = rng.randint(1, 5)
+            d = rng.randint(1, 8)
 
             # Resolver para un valor específico
-            x_val = random.randint(5, 15)
+            x_val = rng.randint(5, 15)
             e = a * (x_val + b) - c * (x_val - d)
 
             equation = f"{a}(x + {b}) = {c}(x - {d}) + {e}"
@@ -192,13 +230,13 @@ class ExerciseGenerator:
         # Generar opciones
         correct_answer = x_val
         wrong_answers = [
-            x_val + random.randint(1, 3),
-            x_val - random.randint(1, 3),
+            x_val + rng.randint(1, 3),
+            x_val - rng.randint(1, 3),
             x_val * 2,
         ]
 
         options = [str(correct_answer)] + [str(w) for w in wrong_answers]
-        random.shuffle(options)
+        rng.shuffle(options)
 
         return {
             "title": "Ecuación Lineal",
@@ -210,13 +248,13 @@ class ExerciseGenerator:
         }
 
     @staticmethod
-    def _generate_fractions(difficulty: ExerciseDifficulty) -> Dict:
+    def _generate_fractions(difficulty: ExerciseDifficulty, rng: random.Random) -> Dict:
         """Genera ejercicios de fracciones"""
         if difficulty == ExerciseDifficulty.easy:
             # Suma simple de fracciones con mismo denominador
-            den = random.choice([2, 3, 4, 5, 6])
-            num1 = random.randint(1, den-1)
-            num2 = random.randint(1, den-1)
+            den = rng.choice([2, 3, 4, 5, 6])
+            num1 = rng.randint(1, den-1)
+            num2 = rng.randint(1, den-1)
 
             result_num = num1 + num2
             result_den = den
@@ -231,14 +269,14 @@ class ExerciseGenerator:
 
         elif difficulty == ExerciseDifficulty.medium:
             # Suma de fracciones con diferente denominador
-            den1 = random.choice([2, 3, 4, 5])
-            den2 = random.choice([2, 3, 4, 5, 6])
+            den1 = rng.choice([2, 3, 4, 5])
+            den2 = rng.choice([2, 3, 4, 5, 6])
 
             while den1 == den2:
-                den2 = random.choice([2, 3, 4, 5, 6])
+                den2 = rng.choice([2, 3, 4, 5, 6])
 
-            num1 = random.randint(1, den1-1)
-            num2 = random.randint(1, den2-1)
+            num1 = rng.randint(1, den1-1)
+            num2 = rng.randint(1, den2-1)
 
             # Calcular resultado
             from math import lcm
@@ -256,10 +294,10 @@ class ExerciseGenerator:
 
         else:  # hard
             # Multiplicación y división de fracciones
-            num1, den1 = random.randint(1, 8), random.randint(2, 9)
-            num2, den2 = random.randint(1, 8), random.randint(2, 9)
+            num1, den1 = rng.randint(1, 8), rng.randint(2, 9)
+            num2, den2 = rng.randint(1, 8), rng.randint(2, 9)
 
-            if random.choice([True, False]):
+            if rng.choice([True, False]):
                 # Multiplicación
                 result_num = num1 * num2
                 result_den = den1 * den2
@@ -288,7 +326,7 @@ class ExerciseGenerator:
         wrong_answers.append(f"{result_num - 1}/{result_den}" if result_num > 1 else f"{result_num}/{result_den - 1}")
 
         options = [correct_answer] + wrong_answers
-        random.shuffle(options)
+        rng.shuffle(options)
 
         return {
             "title": "Fracciones",
@@ -300,12 +338,12 @@ class ExerciseGenerator:
         }
 
     @staticmethod
-    def _generate_basic_operations(difficulty: ExerciseDifficulty) -> Dict:
+    def _generate_basic_operations(difficulty: ExerciseDifficulty, rng: random.Random) -> Dict:
         """Genera operaciones básicas"""
         if difficulty == ExerciseDifficulty.easy:
-            a = random.randint(1, 20)
-            b = random.randint(1, 20)
-            op = random.choice(['+', '-', '×'])
+            a = rng.randint(1, 20)
+            b = rng.randint(1, 20)
+            op = rng.choice(['+', '-', '×'])
 
             if op == '+':
                 answer = a + b
@@ -317,13 +355,13 @@ class ExerciseGenerator:
             question = f"{a} {op} {b}"
 
         else:
-            a = random.randint(10, 50)
-            b = random.randint(2, 20)
-            op = random.choice(['+', '-', '×', '÷'])
+            a = rng.randint(10, 50)
+            b = rng.randint(2, 20)
+            op = rng.choice(['+', '-', '×', '÷'])
 
             if op == '÷':
                 # Asegurar división exacta
-                answer = random.randint(2, 20)
+                answer = rng.randint(2, 20)
                 a = answer * b
             elif op == '+':
                 answer = a + b
@@ -336,13 +374,13 @@ class ExerciseGenerator:
 
         correct_answer = int(answer)
         wrong_answers = [
-            correct_answer + random.randint(1, 10),
-            correct_answer - random.randint(1, 10),
-            correct_answer + random.randint(11, 20),
+            correct_answer + rng.randint(1, 10),
+            correct_answer - rng.randint(1, 10),
+            correct_answer + rng.randint(11, 20),
         ]
 
         options = [str(correct_answer)] + [str(w) for w in wrong_answers if w != correct_answer][:3]
-        random.shuffle(options)
+        rng.shuffle(options)
 
         return {
             "title": "Operación Básica",
@@ -354,11 +392,11 @@ class ExerciseGenerator:
         }
 
     @staticmethod
-    def _generate_percentages(difficulty: ExerciseDifficulty) -> Dict:
+    def _generate_percentages(difficulty: ExerciseDifficulty, rng: random.Random) -> Dict:
         """Genera ejercicios de porcentajes"""
         if difficulty == ExerciseDifficulty.easy:
-            percentage = random.choice([10, 20, 25, 50, 75])
-            number = random.randint(20, 200)
+            percentage = rng.choice([10, 20, 25, 50, 75])
+            number = rng.randint(20, 200)
 
             # Ajustar para que sea resultado entero
             while (number * percentage) % 100 != 0:
@@ -368,8 +406,8 @@ class ExerciseGenerator:
             question = f"¿Cuánto es el {percentage}% de {number}?"
 
         else:
-            percentage = random.randint(5, 95)
-            number = random.randint(50, 500)
+            percentage = rng.randint(5, 95)
+            number = rng.randint(50, 500)
 
             answer = round((number * percentage) / 100, 2)
             question = f"¿Cuánto es el {percentage}% de {number}?"
@@ -383,7 +421,7 @@ class ExerciseGenerator:
         ]
 
         options = [correct_answer] + wrong_answers
-        random.shuffle(options)
+        rng.shuffle(options)
 
         return {
             "title": "Porcentajes",
@@ -395,12 +433,12 @@ class ExerciseGenerator:
         }
 
     @staticmethod
-    def _generate_quadratic_equation(difficulty: ExerciseDifficulty) -> Dict:
+    def _generate_quadratic_equation(difficulty: ExerciseDifficulty, rng: random.Random) -> Dict:
         """Genera ecuaciones cuadráticas"""
         # x² + bx + c = 0
         # Generamos desde las raíces
-        root1 = random.randint(-5, 10)
-        root2 = random.randint(-5, 10)
+        root1 = rng.randint(-5, 10)
+        root2 = rng.randint(-5, 10)
 
         # Expandir (x - root1)(x - root2)
         b = -(root1 + root2)
@@ -422,12 +460,12 @@ class ExerciseGenerator:
 
         wrong_answers = [
             max(root1, root2),
-            correct_answer + random.randint(1, 5),
-            correct_answer - random.randint(1, 5),
+            correct_answer + rng.randint(1, 5),
+            correct_answer - rng.randint(1, 5),
         ]
 
         options = [str(correct_answer)] + [str(w) for w in wrong_answers][:3]
-        random.shuffle(options)
+        rng.shuffle(options)
 
         return {
             "title": "Ecuación Cuadrática",
@@ -437,3 +475,389 @@ class ExerciseGenerator:
             "explanation": f"Las raíces son {root1} y {root2}, la menor es {correct_answer}",
             "topic": MathTopic.quadratic_equations
         }
+
+    # ==================== GENERACIÓN POR LOTES (NumPy) ====================
+
+    @staticmethod
+    def generate_batch(topic: MathTopic, difficulty: ExerciseDifficulty, n: int, seed: Optional[int] = None) -> List[Dict]:
+        """
+        Genera N ejercicios de una vez con arreglos de NumPy para operandos, respuestas y distractores.
+        La dificultad se usa tal cual (sin ajuste por puntaje).
+        """
+        if n <= 0:
+            return []
+
+        rng = np.random.default_rng(seed)
+
+        if topic == MathTopic.combined_operations:
+            return ExerciseGenerator._batch_combined_operations(rng, difficulty, n)
+        elif topic == MathTopic.linear_equations:
+            return ExerciseGenerator._batch_linear_equation(rng, difficulty, n)
+        elif topic == MathTopic.quadratic_equations:
+            return ExerciseGenerator._batch_quadratic_equation(rng, n)
+        elif topic == MathTopic.fractions:
+            return ExerciseGenerator._batch_fractions(rng, difficulty, n)
+        elif topic == MathTopic.operations:
+            return ExerciseGenerator._batch_basic_operations(rng, difficulty, n)
+        elif topic == MathTopic.percentages:
+            return ExerciseGenerator._batch_percentages(rng, difficulty, n)
+        else:
+            # Por defecto, operaciones combinadas
+            return ExerciseGenerator._batch_combined_operations(rng, difficulty, n)
+
+    @staticmethod
+    def _randint(rng: np.random.Generator, low, high, n: int) -> np.ndarray:
+        """Equivalente vectorizado de random.randint (ambos extremos incluidos)"""
+        return rng.integers(low, np.asarray(high) + 1, size=n)
+
+    @staticmethod
+    def _pick_distractors(answers: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+        """
+        Selecciona 3 distractores por fila, únicos y distintos de la respuesta.
+        Se agregan valores de respaldo (respuesta + 1..k+3) para garantizar siempre 3 válidos.
+        """
+        k = candidates.shape[1]
+        fallback = answers[:, None] + np.arange(1, k + 4)
+        candidates = np.concatenate([candidates.astype(answers.dtype), fallback], axis=1)
+
+        valid = candidates != answers[:, None]
+        for j in range(1, candidates.shape[1]):
+            valid[:, j] &= ~(candidates[:, :j] == candidates[:, j:j + 1]).any(axis=1)
+
+        order = np.argsort(~valid, axis=1, kind="stable")[:, :3]
+        return np.take_along_axis(candidates, order, axis=1)
+
+    @staticmethod
+    def _build_batch(
+        rng: np.random.Generator,
+        answers: np.ndarray,
+        distractors: np.ndarray,
+        questions: List[str],
+        explanations: List[str],
+        title: str,
+        topic: MathTopic,
+        formatter: Callable = str
+    ) -> List[Dict]:
+        """Arma los diccionarios de ejercicios con las opciones mezcladas"""
+        n = len(questions)
+        options_matrix = np.concatenate([answers[:, None], distractors], axis=1)
+        permutations = np.argsort(rng.random((n, 4)), axis=1)
+        shuffled = np.take_along_axis(options_matrix, permutations, axis=1).tolist()
+
+        exercises = []
+        for i in range(n):
+            correct_answer = formatter(answers[i].item())
+            exercises.append({
+                "title": title,
+                "question": questions[i],
+                "correct_answer": correct_answer,
+                "options": json.dumps([formatter(value) for value in shuffled[i]]),
+                "explanation": explanations[i],
+                "topic": topic
+            })
+        return exercises
+
+    @staticmethod
+    def _batch_combined_operations(rng: np.random.Generator, difficulty: ExerciseDifficulty, n: int) -> List[Dict]:
+        """Versión por lotes de _generate_combined_operations (divisiones exactas)"""
+        randint = ExerciseGenerator._randint
+
+        if difficulty == ExerciseDifficulty.easy:
+            a, b, c = randint(rng, 1, 20, n), randint(rng, 1, 20, n), randint(rng, 1, 10, n)
+            s = a + b
+            templates = [
+                ("{a} + {b} - {c}", a + b - c),
+                ("{a} × {c} + {b}", a * c + b),
+                ("{s} - {c} × 2", s - c * 2),
+            ]
+            d = np.zeros(n, dtype=int)
+
+        elif difficulty == ExerciseDifficulty.medium:
+            b, c, d = randint(rng, 2, 15, n), randint(rng, 2, 10, n), randint(rng, 1, 5, n)
+            choice = rng.integers(0, 4, size=n)
+            # En la plantilla con ÷, a es múltiplo de c para que la división sea exacta
+            a = np.where(choice == 2, c * randint(rng, 1, 15 // c, n), randint(rng, 2, 15, n))
+            s = a + b
+            templates = [
+                ("({a} + {b}) × {c} - {d}", (a + b) * c - d),
+                ("{a} × ({b} - {c}) + {d}", a * (b - c) + d),
+                ("({a} × {b}) ÷ {c} + {d}", (a * b) // c + d),
+                ("{a} + ({b} × {c}) - {d}", a + (b * c) - d),
+            ]
+
+        else:  # hard
+            b, c, d = randint(rng, 3, 15, n), randint(rng, 2, 10, n), randint(rng, 2, 8, n)
+            choice = rng.integers(0, 3, size=n)
+            a = np.where(choice == 2, c * randint(rng, -(-5 // c), 20 // c, n), randint(rng, 5, 20, n))
+            s = a + b
+            templates = [
+                ("(({a} + {b}) × {c}) - ({d} × 2)", ((a + b) * c) - (d * 2)),
+                ("{a} × ({b} + {c}) - ({d} × {c})", a * (b + c) - (d * c)),
+                ("({a} × {b}) ÷ {c} + ({d} × {c})", (a * b) // c + (d * c)),
+            ]
+
+        if difficulty == ExerciseDifficulty.easy:
+            choice = rng.integers(0, len(templates), size=n)
+
+        all_answers = np.stack([answer for _, answer in templates], axis=1)
+        answers = np.take_along_axis(all_answers, choice[:, None], axis=1)[:, 0]
+
+        candidates = np.stack([
+            answers + randint(rng, 1, 5, n),
+            answers - randint(rng, 1, 5, n),
+            (answers * 1.1).astype(int),
+        ], axis=1)
+        distractors = ExerciseGenerator._pick_distractors(answers, candidates)
+
+        questions = []
+        explanations = []
+        for row, (ai, bi, ci, di, si) in enumerate(zip(a.tolist(), b.tolist(), c.tolist(), d.tolist(), s.tolist())):
+            expression = templates[choice[row]][0].format(a=ai, b=bi, c=ci, d=di, s=si)
+            questions.append(f"¿Cuál es el resultado de: {expression}?")
+            explanations.append(f"Resolviendo paso a paso: {expression} = {answers[row]}")
+
+        return ExerciseGenerator._build_batch(
+            rng, answers, distractors, questions, explanations,
+            "Operación Combinada", MathTopic.combined_operations
+        )
+
+    @staticmethod
+    def _batch_linear_equation(rng: np.random.Generator, difficulty: ExerciseDifficulty, n: int) -> List[Dict]:
+        """Versión por lotes de _generate_linear_equation"""
+        randint = ExerciseGenerator._randint
+
+        if difficulty == ExerciseDifficulty.easy:
+            a, x_val = randint(rng, 1, 5, n), randint(rng, 1, 10, n)
+            b = randint(rng, -10, 10, n)
+            c = a * x_val + b
+            equations = [
+                f"{ai}x + {bi} = {ci}" if bi >= 0 else f"{ai}x - {abs(bi)} = {ci}"
+                for ai, bi, ci in zip(a.tolist(), b.tolist(), c.tolist())
+            ]
+
+        elif difficulty == ExerciseDifficulty.medium:
+            a = randint(rng, 2, 8, n)
+            c = randint(rng, 1, a - 1, n)
+            x_val, d = randint(rng, 1, 10, n), randint(rng, -15, 15, n)
+            b = (c - a) * x_val + d
+            equations = [
+                f"{ai}x + {bi} = {ci}x + {di}"
+                for ai, bi, ci, di in zip(a.tolist(), b.tolist(), c.tolist(), d.tolist())
+            ]
+
+        else:  # hard
+            a, b, c, d = randint(rng, 2, 6, n), randint(rng, 1, 8, n), randint(rng, 1, 5, n), randint(rng, 1, 8, n)
+            x_val = randint(rng, 5, 15, n)
+            e = a * (x_val + b) - c * (x_val - d)
+            equations = [
+                f"{ai}(x + {bi}) = {ci}(x - {di}) + {ei}"
+                for ai, bi, ci, di, ei in zip(a.tolist(), b.tolist(), c.tolist(), d.tolist(), e.tolist())
+            ]
+
+        candidates = np.stack([
+            x_val + randint(rng, 1, 3, n),
+            x_val - randint(rng, 1, 3, n),
+            x_val * 2,
+        ], axis=1)
+        distractors = ExerciseGenerator._pick_distractors(x_val, candidates)
+
+        questions = [f"Resuelve para x: {equation}" for equation in equations]
+        explanations = [f"El valor de x es {x}" for x in x_val.tolist()]
+
+        return ExerciseGenerator._build_batch(
+            rng, x_val, distractors, questions, explanations,
+            "Ecuación Lineal", MathTopic.linear_equations
+        )
+
+    @staticmethod
+    def _batch_fractions(rng: np.random.Generator, difficulty: ExerciseDifficulty, n: int) -> List[Dict]:
+        """Versión por lotes de _generate_fractions; las fracciones se codifican como num * 1000 + den"""
+        randint = ExerciseGenerator._randint
+
+        if difficulty == ExerciseDifficulty.easy:
+            den = rng.choice([2, 3, 4, 5, 6], size=n)
+            num1, num2 = randint(rng, 1, den - 1, n), randint(rng, 1, den - 1, n)
+            result_num, result_den = num1 + num2, den
+            questions = [
+                f"Calcula: {n1}/{d} + {n2}/{d}"
+                for n1, n2, d in zip(num1.tolist(), num2.tolist(), den.tolist())
+            ]
+
+        elif difficulty == ExerciseDifficulty.medium:
+            den1 = rng.choice([2, 3, 4, 5], size=n)
+            den2 = rng.choice([2, 3, 4, 5, 6], size=n)
+            same = den1 == den2
+            while same.any():
+                den2[same] = rng.choice([2, 3, 4, 5, 6], size=int(same.sum()))
+                same = den1 == den2
+
+            num1, num2 = randint(rng, 1, den1 - 1, n), randint(rng, 1, den2 - 1, n)
+            common_den = np.lcm(den1, den2)
+            result_num = num1 * (common_den // den1) + num2 * (common_den // den2)
+            result_den = common_den
+            questions = [
+                f"Calcula: {n1}/{d1} + {n2}/{d2}"
+                for n1, d1, n2, d2 in zip(num1.tolist(), den1.tolist(), num2.tolist(), den2.tolist())
+            ]
+
+        else:  # hard
+            num1, den1 = randint(rng, 1, 8, n), randint(rng, 2, 9, n)
+            num2, den2 = randint(rng, 1, 8, n), randint(rng, 2, 9, n)
+            multiply = rng.random(n) < 0.5
+            result_num = np.where(multiply, num1 * num2, num1 * den2)
+            result_den = np.where(multiply, den1 * den2, den1 * num2)
+            questions = [
+                f"Calcula: ({n1}/{d1}) {'×' if m else '÷'} ({n2}/{d2})"
+                for n1, d1, n2, d2, m in zip(num1.tolist(), den1.tolist(), num2.tolist(), den2.tolist(), multiply.tolist())
+            ]
+
+        # Simplificar
+        g = np.gcd(result_num, result_den)
+        result_num, result_den = result_num // g, result_den // g
+
+        answers = result_num * 1000 + result_den
+        # num/(den - 1) solo es válido si el denominador sigue siendo positivo
+        third = np.where(
+            result_num > 1,
+            (result_num - 1) * 1000 + result_den,
+            np.where(result_den > 1, result_num * 1000 + (result_den - 1), answers)
+        )
+        candidates = np.stack([
+            (result_num + 1) * 1000 + result_den,
+            result_num * 1000 + (result_den + 1),
+            third,
+        ], axis=1)
+        distractors = ExerciseGenerator._pick_distractors(answers, candidates)
+
+        formatter = ExerciseGenerator._format_fraction_code
+        explanations = [f"El resultado simplificado es {formatter(code)}" for code in answers.tolist()]
+
+        return ExerciseGenerator._build_batch(
+            rng, answers, distractors, questions, explanations,
+            "Fracciones", MathTopic.fractions, formatter
+        )
+
+    @staticmethod
+    def _format_fraction_code(code: int) -> str:
+        """Convierte una fracción codificada (num * 1000 + den) a texto"""
+        num, den = divmod(code, 1000)
+        return str(num) if den == 1 else f"{num}/{den}"
+
+    @staticmethod
+    def _batch_basic_operations(rng: np.random.Generator, difficulty: ExerciseDifficulty, n: int) -> List[Dict]:
+        """Versión por lotes de _generate_basic_operations (divisiones exactas)"""
+        randint = ExerciseGenerator._randint
+
+        if difficulty == ExerciseDifficulty.easy:
+            ops = np.array(['+', '-', '×'])
+            a, b = randint(rng, 1, 20, n), randint(rng, 1, 20, n)
+            op_index = rng.integers(0, 3, size=n)
+        else:
+            ops = np.array(['+', '-', '×', '÷'])
+            a, b = randint(rng, 10, 50, n), randint(rng, 2, 20, n)
+            op_index = rng.integers(0, 4, size=n)
+
+        # Asegurar división exacta: el dividendo es múltiplo del divisor
+        quotient = randint(rng, 2, 20, n)
+        is_division = op_index == 3
+        a = np.where(is_division, quotient * b, a)
+
+        answers = np.select(
+            [op_index == 0, op_index == 1, op_index == 2],
+            [a + b, a - b, a * b],
+            default=quotient
+        )
+
+        candidates = np.stack([
+            answers + randint(rng, 1, 10, n),
+            answers - randint(rng, 1, 10, n),
+            answers + randint(rng, 11, 20, n),
+        ], axis=1)
+        distractors = ExerciseGenerator._pick_distractors(answers, candidates)
+
+        expressions = [
+            f"{ai} {op} {bi}"
+            for ai, op, bi in zip(a.tolist(), ops[op_index].tolist(), b.tolist())
+        ]
+        questions = [f"¿Cuánto es {expression}?" for expression in expressions]
+        explanations = [f"{expression} = {answer}" for expression, answer in zip(expressions, answers.tolist())]
+
+        return ExerciseGenerator._build_batch(
+            rng, answers, distractors, questions, explanations,
+            "Operación Básica", MathTopic.operations
+        )
+
+    @staticmethod
+    def _batch_percentages(rng: np.random.Generator, difficulty: ExerciseDifficulty, n: int) -> List[Dict]:
+        """Versión por lotes de _generate_percentages"""
+        randint = ExerciseGenerator._randint
+
+        if difficulty == ExerciseDifficulty.easy:
+            percentage = rng.choice([10, 20, 25, 50, 75], size=n)
+            number = randint(rng, 20, 200, n)
+            # Ajustar al siguiente múltiplo que da resultado entero
+            step = 100 // np.gcd(percentage, 100)
+            number = -(-number // step) * step
+            answers = ((number * percentage) // 100).astype(float)
+        else:
+            percentage = randint(rng, 5, 95, n)
+            number = randint(rng, 50, 500, n)
+            answers = np.round(number * percentage / 100, 2)
+
+        candidates = np.stack([
+            np.trunc(answers * 1.1),
+            np.trunc(answers * 0.9),
+            np.trunc(answers + percentage),
+        ], axis=1)
+        distractors = ExerciseGenerator._pick_distractors(answers, candidates)
+
+        formatter = ExerciseGenerator._format_number
+        questions = [
+            f"¿Cuánto es el {p}% de {num}?"
+            for p, num in zip(percentage.tolist(), number.tolist())
+        ]
+        explanations = [
+            f"El {p}% de {num} es {formatter(answer)}"
+            for p, num, answer in zip(percentage.tolist(), number.tolist(), answers.tolist())
+        ]
+
+        return ExerciseGenerator._build_batch(
+            rng, answers, distractors, questions, explanations,
+            "Porcentajes", MathTopic.percentages, formatter
+        )
+
+    @staticmethod
+    def _format_number(value: float) -> str:
+        """Formatea un número como entero si no tiene parte decimal"""
+        return str(int(value) if value == int(value) else round(value, 2))
+
+    @staticmethod
+    def _batch_quadratic_equation(rng: np.random.Generator, n: int) -> List[Dict]:
+        """Versión por lotes de _generate_quadratic_equation"""
+        randint = ExerciseGenerator._randint
+
+        root1, root2 = randint(rng, -5, 10, n), randint(rng, -5, 10, n)
+        b = -(root1 + root2)
+        c = root1 * root2
+        answers = np.minimum(root1, root2)
+
+        candidates = np.stack([
+            np.maximum(root1, root2),
+            answers + randint(rng, 1, 5, n),
+            answers - randint(rng, 1, 5, n),
+        ], axis=1)
+        distractors = ExerciseGenerator._pick_distractors(answers, candidates)
+
+        questions = []
+        explanations = []
+        for r1, r2, bi, ci, answer in zip(root1.tolist(), root2.tolist(), b.tolist(), c.tolist(), answers.tolist()):
+            equation = "x² "
+            equation += f"+ {bi}x " if bi >= 0 else f"- {abs(bi)}x "
+            equation += f"+ {ci} = 0" if ci >= 0 else f"- {abs(ci)} = 0"
+            questions.append(f"Encuentra la solución menor de: {equation}")
+            explanations.append(f"Las raíces son {r1} y {r2}, la menor es {answer}")
+
+        return ExerciseGenerator._build_batch(
+            rng, answers, distractors, questions, explanations,
+            "Ecuación Cuadrática", MathTopic.quadratic_equations
+        )
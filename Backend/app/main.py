@@ -11,8 +11,12 @@ import time
 import os
 from app.config import get_settings
 from app.database import engine, Base
-from app.routers import auth, users, paralelos, teacher, student
+from app.routers import auth, users, paralelos, teacher, student, badges
 from app.routers import settings as settings_router
+from app.services.exercise_pool import practice_pool
+from app.services.rank_index import rank_index
+from app.services import leaderboard, student_stats
+from app.services.scheduler import scheduler
 
 settings = get_settings()
 
@@ -123,6 +127,7 @@ app.include_router(users.router)
 app.include_router(paralelos.router)
 app.include_router(teacher.router)
 app.include_router(student.router)
+app.include_router(badges.router)
 app.include_router(settings_router.router)
 
 # Servir archivos estáticos (avatares, etc.)
@@ -138,6 +143,13 @@ app.mount("/api/files", StaticFiles(directory=UPLOADS_DIR), name="uploads")
 # Evento de inicio
 @app.on_event("startup")
 async def startup_event():
+    # Tareas en segundo plano
+    await practice_pool.start()
+    await student_stats.backfill_missing()
+    await leaderboard.backfill_missing()
+    await rank_index.rebuild()
+    await scheduler.start()
+
     print("=" * 60)
     print("🚀 MathMaster API (FastAPI)")
     print("=" * 60)
@@ -154,3 +166,5 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     print("👋 Apagando MathMaster API...")
+    await practice_pool.stop()
+    await scheduler.stop()
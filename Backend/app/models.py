@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, Integer, Text, ForeignKey, Enum as SQLEnum, DateTime
+from sqlalchemy import Column, String, Boolean, Integer, Text, ForeignKey, Enum as SQLEnum, DateTime, Date, UniqueConstraint, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -117,9 +117,15 @@ class MathTopic(str, enum.Enum):
 # Ejercicios
 class Exercise(Base):
     __tablename__ = "exercises"
+    __table_args__ = (
+        UniqueConstraint("challenge_id", "sequence", name="uq_exercise_challenge_sequence"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     paralelo_id = Column(UUID(as_uuid=True), ForeignKey("paralelos.id"), nullable=True)
+    # Conjunto fijo de un versus: ejercicio en la posición sequence del desafío
+    challenge_id = Column(UUID(as_uuid=True), ForeignKey("challenges.id", ondelete="SET NULL"), nullable=True)
+    sequence = Column(Integer, nullable=True)
     title = Column(String, nullable=False)
     description = Column(Text, nullable=True)
     question = Column(Text, nullable=False)
@@ -145,9 +151,14 @@ class ExerciseAttempt(Base):
     __tablename__ = "exercise_attempts"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    exercise_id = Column(UUID(as_uuid=True), ForeignKey("exercises.id"), nullable=False)
+    exercise_id = Column(UUID(as_uuid=True), ForeignKey("exercises.id"), nullable=True)  # Null en modo sin estado
     student_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     game_session_id = Column(UUID(as_uuid=True), ForeignKey("game_sessions.id"), nullable=True)
+    # Datos del ejercicio en línea (permiten prescindir de la fila en exercises)
+    topic = Column(SQLEnum(MathTopic), nullable=True)
+    difficulty = Column(SQLEnum(ExerciseDifficulty), nullable=True)
+    question = Column(Text, nullable=True)
+    correct_answer = Column(Text, nullable=True)
     student_answer = Column(Text, nullable=False)
     is_correct = Column(Boolean, nullable=False)
     time_taken = Column(Integer, nullable=True)  # En segundos
@@ -185,6 +196,10 @@ class GameSession(Base):
 # Progreso del estudiante por tema
 class StudentTopicProgress(Base):
     __tablename__ = "student_topic_progress"
+    __table_args__ = (
+        # Clave única para el UPSERT del progreso por tema
+        UniqueConstraint("student_id", "topic", name="uq_student_topic_progress"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     student_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
@@ -202,6 +217,89 @@ class StudentTopicProgress(Base):
     student = relationship("User")
 
 
+# Contadores agregados por estudiante (se mantienen en cada respuesta)
+class StudentStats(Base):
+    __tablename__ = "student_stats"
+
+    student_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    total_attempts = Column(Integer, default=0, nullable=False)
+    correct_attempts = Column(Integer, default=0, nullable=False)
+    points_earned = Column(Integer, default=0, nullable=False)  # Suma de puntos ganados en intentos
+    total_score = Column(Integer, default=0, nullable=False)  # Suma de puntajes de sesiones de juego
+    total_sessions = Column(Integer, default=0, nullable=False)
+    best_score = Column(Integer, default=0, nullable=False)  # Mejor puntaje de una sesión
+    current_streak = Column(Integer, default=0, nullable=False)  # Aciertos consecutivos actuales
+    best_streak = Column(Integer, default=0, nullable=False)
+    version = Column(Integer, default=0, nullable=False)  # Se incrementa en cada cambio (invalida caché)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    # Relationships
+    student = relationship("User")
+
+
+# Tabla de posiciones materializada por paralelo (se mantiene al puntuar y al completar metas)
+class ParaleloLeaderboard(Base):
+    __tablename__ = "paralelo_leaderboard"
+    __table_args__ = (
+        Index("ix_paralelo_leaderboard_score", "paralelo_id", "total_score"),
+    )
+
+    paralelo_id = Column(UUID(as_uuid=True), ForeignKey("paralelos.id"), primary_key=True)
+    student_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True, index=True)
+    exercise_score = Column(Integer, default=0, nullable=False)  # Suma de puntajes de sesiones
+    goal_bonus = Column(Integer, default=0, nullable=False)  # Puntos de metas completadas
+    total_score = Column(Integer, default=0, nullable=False)  # exercise_score + goal_bonus
+    exercises_completed = Column(Integer, default=0, nullable=False)
+    correct_answers = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    # Relationships
+    paralelo = relationship("Paralelo")
+    student = relationship("User")
+
+
+# Actividad diaria por estudiante y paralelo (rollup de sesiones de juego, día UTC de inicio de sesión)
+class StudentDailyActivity(Base):
+    __tablename__ = "student_daily_activity"
+    __table_args__ = (
+        Index("ix_student_daily_activity_paralelo_day", "paralelo_id", "day"),
+    )
+
+    student_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    paralelo_id = Column(UUID(as_uuid=True), ForeignKey("paralelos.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    sessions_count = Column(Integer, default=0, nullable=False)
+    exercises_completed = Column(Integer, default=0, nullable=False)
+    correct_answers = Column(Integer, default=0, nullable=False)
+    wrong_answers = Column(Integer, default=0, nullable=False)
+    score = Column(Integer, default=0, nullable=False)
+
+    # Relationships
+    student = relationship("User")
+    paralelo = relationship("Paralelo")
+
+
+# Intentos por paralelo, tema y día (rollup de intentos en sesiones de juego)
+class ParaleloTopicDaily(Base):
+    __tablename__ = "paralelo_topic_daily"
+
+    paralelo_id = Column(UUID(as_uuid=True), ForeignKey("paralelos.id"), primary_key=True)
+    topic = Column(SQLEnum(MathTopic), primary_key=True)
+    day = Column(Date, primary_key=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    correct_answers = Column(Integer, default=0, nullable=False)
+
+
+# Snapshot precalculado del panel de desempeño de un paralelo
+class PerformanceSnapshot(Base):
+    __tablename__ = "performance_snapshots"
+
+    paralelo_id = Column(UUID(as_uuid=True), ForeignKey("paralelos.id"), primary_key=True)
+    period = Column(String, primary_key=True)  # week, month, all
+    payload = Column(Text, nullable=False)  # JSON con la respuesta completa
+    computed_at = Column(DateTime(timezone=True), nullable=False)
+
+
 # Estados de metas
 class GoalStatus(str, enum.Enum):
     active = "active"
@@ -255,6 +353,10 @@ class Goal(Base):
 # Asignacion de metas a estudiantes
 class StudentGoal(Base):
     __tablename__ = "student_goals"
+    __table_args__ = (
+        # Una asignación por (meta, estudiante); permite asignar en bloque con ON CONFLICT DO NOTHING
+        UniqueConstraint("goal_id", "student_id", name="uq_student_goal"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     goal_id = Column(UUID(as_uuid=True), ForeignKey("goals.id"), nullable=False)
@@ -271,6 +373,18 @@ class StudentGoal(Base):
     student = relationship("User")
 
 
+# Tareas periódicas del planificador en segundo plano (una fila por tarea)
+class ScheduledJob(Base):
+    __tablename__ = "scheduled_jobs"
+
+    name = Column(String, primary_key=True)
+    interval_seconds = Column(Integer, nullable=False)
+    next_run_at = Column(DateTime(timezone=True), nullable=False)
+    last_run_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
 # Competencias (Versus) - Enfrentamientos entre paralelos
 class Challenge(Base):
     __tablename__ = "challenges"
@@ -292,6 +406,8 @@ class Challenge(Base):
     # Puntuaciones totales por paralelo
     paralelo1_score = Column(Integer, default=0)
     paralelo2_score = Column(Integer, default=0)
+    # Se incrementa cada vez que cambian los participantes o sus puntajes (invalida el marcador en caché)
+    scoreboard_version = Column(Integer, default=0, nullable=False)
     start_time = Column(DateTime(timezone=True), nullable=True)
     end_time = Column(DateTime(timezone=True), nullable=True)
     is_active = Column(Boolean, default=True)
@@ -360,6 +476,10 @@ class Badge(Base):
 # Insignias de estudiantes
 class StudentBadge(Base):
     __tablename__ = "student_badges"
+    __table_args__ = (
+        # Una insignia por estudiante; el motor de reglas otorga con ON CONFLICT DO NOTHING
+        UniqueConstraint("badge_id", "student_id", name="uq_student_badge"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     badge_id = Column(UUID(as_uuid=True), ForeignKey("badges.id"), nullable=False)
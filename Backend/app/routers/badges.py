@@ -0,0 +1,109 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import Optional
+from uuid import UUID
+from pydantic import BaseModel, Field
+from app.database import get_db
+from app.models import Badge, BadgeCategory, User
+from app.schemas import APIResponse
+from app.auth import require_admin
+from app.services.badge_catalog import badge_catalog, serialize_badge
+
+router = APIRouter(prefix="/api/badges", tags=["Badges"])
+
+
+# Schemas para insignias
+class BadgeCreate(BaseModel):
+    name: str
+    description: Optional[str] = None
+    icon: Optional[str] = None
+    category: BadgeCategory = BadgeCategory.achievement
+    requirement: Optional[str] = None
+    requirement_value: int = Field(default=0, alias="requirementValue")
+    points: int = 10
+
+    class Config:
+        populate_by_name = True
+
+
+class BadgeUpdate(BaseModel):
+    name: Optional[str] = None
+    description: Optional[str] = None
+    icon: Optional[str] = None
+    category: Optional[BadgeCategory] = None
+    requirement: Optional[str] = None
+    requirement_value: Optional[int] = Field(None, alias="requirementValue")
+    points: Optional[int] = None
+    is_active: Optional[bool] = Field(None, alias="isActive")
+
+    class Config:
+        populate_by_name = True
+
+
+@router.post("/", response_model=APIResponse)
+async def create_badge(
+    badge_data: BadgeCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """Crear una insignia"""
+    badge = Badge(
+        name=badge_data.name,
+        description=badge_data.description,
+        icon=badge_data.icon,
+        category=badge_data.category,
+        requirement=badge_data.requirement,
+        requirement_value=badge_data.requirement_value,
+        points=badge_data.points
+    )
+    db.add(badge)
+    badge_catalog.bump_version(db)
+    db.commit()
+    db.refresh(badge)
+    badge_catalog.invalidate()
+
+    return APIResponse(success=True, message="Insignia creada exitosamente", data=serialize_badge(badge))
+
+
+@router.put("/{badge_id}", response_model=APIResponse)
+async def update_badge(
+    badge_id: UUID,
+    badge_data: BadgeUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """Actualizar una insignia"""
+    badge = db.query(Badge).filter(Badge.id == badge_id).first()
+
+    if not badge:
+        raise HTTPException(status_code=404, detail="Insignia no encontrada")
+
+    for field, value in badge_data.model_dump(exclude_unset=True).items():
+        setattr(badge, field, value)
+
+    badge_catalog.bump_version(db)
+    db.commit()
+    db.refresh(badge)
+    badge_catalog.invalidate()
+
+    return APIResponse(success=True, message="Insignia actualizada exitosamente", data=serialize_badge(badge))
+
+
+@router.delete("/{badge_id}", response_model=APIResponse)
+async def delete_badge(
+    badge_id: UUID,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """Desactivar una insignia (se conservan las ya otorgadas)"""
+    badge = db.query(Badge).filter(Badge.id == badge_id).first()
+
+    if not badge:
+        raise HTTPException(status_code=404, detail="Insignia no encontrada")
+
+    badge.is_active = False
+    badge_catalog.bump_version(db)
+    db.commit()
+    badge_catalog.invalidate()
+
+    return APIResponse(success=True, message="Insignia desactivada exitosamente")
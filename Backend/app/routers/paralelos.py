@@ -8,6 +8,8 @@ from app.database import get_db
 from app.models import Paralelo, User, Enrollment, UserRole
 from app.schemas import ParaleloCreate, ParaleloUpdate, APIResponse
 from app.auth import require_admin
+from app.services.rank_index import rank_index
+from app.services import goal_assignment, leaderboard
 
 router = APIRouter(prefix="/api/paralelos", tags=["Paralelos"])
 
@@ -302,6 +304,7 @@ async def assign_students_to_paralelo(
         raise HTTPException(status_code=404, detail="Paralelo no encontrado")
 
     added_count = 0
+    enrolled_ids = []
     for student_id in request.student_ids:
         # Verificar que el estudiante existe y es un estudiante
         student = db.query(User).filter(
@@ -324,6 +327,7 @@ async def assign_students_to_paralelo(
             if not existing_enrollment.is_active:
                 existing_enrollment.is_active = True
                 added_count += 1
+                enrolled_ids.append(student_id)
         else:
             # Crear nuevo enrollment
             new_enrollment = Enrollment(
@@ -333,6 +337,15 @@ async def assign_students_to_paralelo(
             )
             db.add(new_enrollment)
             added_count += 1
+            enrolled_ids.append(student_id)
+
+    db.flush()
+
+    # Asignar en bloque las metas vigentes a los recién inscritos
+    goal_assignment.assign_goals_to_students(db, paralelo_id, enrolled_ids)
+
+    # Filas de la tabla de posiciones de los recién inscritos
+    leaderboard.backfill(db, paralelo_id, enrolled_ids)
 
     # Actualizar contador de estudiantes del paralelo
     student_count = db.query(func.count(Enrollment.id)).filter(
@@ -343,6 +356,9 @@ async def assign_students_to_paralelo(
 
     db.commit()
 
+    for student_id in enrolled_ids:
+        rank_index.add_enrollment(student_id, paralelo_id)
+
     return APIResponse(
         success=True,
         message=f"{added_count} estudiante(s) agregado(s) al paralelo",
@@ -384,6 +400,8 @@ async def remove_student_from_paralelo(
 
     db.commit()
 
+    rank_index.remove_enrollment(student_id, paralelo_id)
+
     return APIResponse(
         success=True,
         message="Estudiante removido del paralelo",
@@ -1,23 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, and_
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import desc, and_, select
+from sqlalchemy.dialects.postgresql import insert
 from typing import Optional
 from uuid import UUID
 from datetime import datetime, timezone
-from app.database import get_db
+from app.database import get_db, get_async_db
 from app.models import (
     User, UserRole, GameSession, Exercise, ExerciseAttempt,
-    StudentTopicProgress, MathTopic, ExerciseDifficulty, Enrollment, Paralelo,
+    StudentTopicProgress, StudentStats, MathTopic, ExerciseDifficulty, Enrollment, Paralelo,
     Goal, StudentGoal, GoalStatus, GoalType,
     Challenge, ChallengeParticipant, ChallengeStatus
 )
 from app import schemas
 from app.schemas import APIResponse
-from app.auth import get_current_user
+from app.auth import (
+    get_current_user, get_current_user_async, get_current_user_from_query,
+    create_exercise_token, decode_exercise_token
+)
+from app.config import get_settings
 from app.exercise_generator import ExerciseGenerator
 from app.ai_recommendations import AIRecommendations
+from app.services.exercise_pool import practice_pool
+from app.services import (
+    student_stats, leaderboard, daily_activity, challenge_scoreboard, challenge_exercises, badge_rules
+)
+from app.services.rank_index import rank_index
+from app.services.live_scoreboard import score_broker, event_stream
+from app.services.badge_catalog import badge_catalog, serialize_badge
+import hashlib
 import json
 import random
+import uuid
+
+settings = get_settings()
 
 router = APIRouter(prefix="/api/student", tags=["Student"])
 
@@ -29,8 +47,19 @@ def require_student(current_user: User = Depends(get_current_user)):
     return current_user
 
 
-def update_student_goals_progress(student_id: UUID, topic: MathTopic, is_correct: bool, db: Session):
-    """Actualizar el progreso de las metas del estudiante despues de cada ejercicio"""
+def require_student_async(current_user: User = Depends(get_current_user_async)):
+    """Verificar que el usuario sea estudiante (endpoints con sesión asíncrona)"""
+    if current_user.role not in [UserRole.student, UserRole.admin]:
+        raise HTTPException(status_code=403, detail="Acceso denegado. Se requiere rol de estudiante")
+    return current_user
+
+
+def update_student_goals_progress(student_id: UUID, topic: MathTopic, is_correct: bool, stats: StudentStats, topic_progress, db: Session):
+    """
+    Actualizar el progreso de las metas del estudiante despues de cada ejercicio.
+    Usa los contadores agregados y el progreso del tema ya actualizado; no hace commit.
+    Retorna los puntos bonus de las metas completadas.
+    """
     now = datetime.now(timezone.utc)
 
     # Obtener metas activas del estudiante
@@ -42,6 +71,8 @@ def update_student_goals_progress(student_id: UUID, topic: MathTopic, is_correct
         Goal.end_date >= now
     ).all()
 
+    completed_bonus = 0
+
     for student_goal in active_goals:
         goal = student_goal.goal
         updated = False
@@ -53,84 +84,68 @@ def update_student_goals_progress(student_id: UUID, topic: MathTopic, is_correct
 
         elif goal.goal_type == GoalType.accuracy:
             # Meta de precision: calcular % de aciertos
-            total_attempts = db.query(func.count(ExerciseAttempt.id)).filter(
-                ExerciseAttempt.student_id == student_id
-            ).scalar() or 0
-            correct_attempts = db.query(func.count(ExerciseAttempt.id)).filter(
-                ExerciseAttempt.student_id == student_id,
-                ExerciseAttempt.is_correct == True
-            ).scalar() or 0
-            if total_attempts > 0:
-                student_goal.current_value = int((correct_attempts / total_attempts) * 100)
+            if stats.total_attempts > 0:
+                student_goal.current_value = int((stats.correct_attempts / stats.total_attempts) * 100)
                 updated = True
 
         elif goal.goal_type == GoalType.points:
-            # Meta de puntos: sumar puntos totales de sesiones
-            total_points = db.query(func.sum(GameSession.total_score)).filter(
-                GameSession.student_id == student_id
-            ).scalar() or 0
-            student_goal.current_value = total_points
+            # Meta de puntos: puntos totales de sesiones
+            student_goal.current_value = stats.total_score
             updated = True
 
         elif goal.goal_type == GoalType.streak:
-            # Meta de racha: calcular respuestas correctas consecutivas
+            # Meta de racha: respuestas correctas consecutivas
             if is_correct:
-                # Obtener ultimos intentos para calcular racha actual
-                recent_attempts = db.query(ExerciseAttempt).filter(
-                    ExerciseAttempt.student_id == student_id
-                ).order_by(ExerciseAttempt.attempted_at.desc()).limit(100).all()
-
-                streak = 0
-                for attempt in recent_attempts:
-                    if attempt.is_correct:
-                        streak += 1
-                    else:
-                        break
-
                 # Solo actualizar si la racha actual es mayor
-                if streak > student_goal.current_value:
-                    student_goal.current_value = streak
+                if stats.current_streak > student_goal.current_value:
+                    student_goal.current_value = stats.current_streak
                     updated = True
 
         elif goal.goal_type == GoalType.topic_mastery:
             # Meta de dominio de tema: verificar si el tema coincide
-            if goal.topic == topic:
-                topic_progress = db.query(StudentTopicProgress).filter(
-                    StudentTopicProgress.student_id == student_id,
-                    StudentTopicProgress.topic == topic
-                ).first()
-                if topic_progress:
-                    # Usar nivel de maestria (0-100)
-                    student_goal.current_value = int(topic_progress.mastery_level * 100)
-                    updated = True
+            if goal.topic == topic and topic_progress is not None:
+                # Usar nivel de maestria (0-100)
+                student_goal.current_value = int(topic_progress.mastery_level * 100)
+                updated = True
 
         # Verificar si la meta fue completada
         if updated and student_goal.current_value >= goal.target_value:
             student_goal.status = GoalStatus.completed
             student_goal.completed_at = now
             student_goal.points_earned = goal.reward_points
+            completed_bonus += goal.reward_points or 0
+
+    # Reflejar el bonus de metas completadas en la tabla de posiciones
+    leaderboard.add_goal_bonus(db, student_id, completed_bonus)
 
     db.flush()
 
+    return completed_bonus
+
 
 @router.post("/game/start", response_model=APIResponse)
 async def start_game_session(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_student)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_student_async)
 ):
     """Iniciar una nueva sesión de juego"""
     # Obtener paralelo del estudiante (si existe)
-    enrollment = db.query(Enrollment).filter(
-        Enrollment.student_id == current_user.id,
-        Enrollment.is_active == True
-    ).first()
+    result = await db.execute(
+        select(Enrollment).where(
+            Enrollment.student_id == current_user.id,
+            Enrollment.is_active == True
+        ).limit(1)
+    )
+    enrollment = result.scalars().first()
 
     paralelo_id = enrollment.paralelo_id if enrollment else None
 
     # Crear nueva sesión
+    started_at = datetime.now(timezone.utc)
     session = GameSession(
         student_id=current_user.id,
         paralelo_id=paralelo_id,
+        started_at=started_at,
         total_score=0,
         exercises_completed=0,
         correct_answers=0,
@@ -139,8 +154,15 @@ async def start_game_session(
     )
 
     db.add(session)
-    db.commit()
-    db.refresh(session)
+
+    def _record_start(sync_db: Session):
+        stats = student_stats.record_session_start(sync_db, current_user.id)
+        daily_activity.record_session_start(sync_db, current_user.id, paralelo_id, started_at.date())
+        return badge_rules.on_session_start(sync_db, current_user.id, stats)
+
+    new_badges = await db.run_sync(_record_start)
+    await db.commit()
+    await db.refresh(session)
 
     return APIResponse(
         success=True,
@@ -148,7 +170,8 @@ async def start_game_session(
         data={
             "session_id": str(session.id),
             "score": 0,
-            "started_at": session.started_at.isoformat()
+            "started_at": session.started_at.isoformat(),
+            "newBadges": new_badges
         }
     )
 
@@ -156,61 +179,108 @@ async def start_game_session(
 @router.get("/game/next-exercise", response_model=APIResponse)
 async def get_next_exercise(
     session_id: UUID,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_student)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_student_async)
 ):
     """Obtener el siguiente ejercicio adaptativo"""
     # Verificar sesión
-    session = db.query(GameSession).filter(
-        GameSession.id == session_id,
-        GameSession.student_id == current_user.id,
-        GameSession.is_active == True
-    ).first()
+    result = await db.execute(
+        select(GameSession).where(
+            GameSession.id == session_id,
+            GameSession.student_id == current_user.id,
+            GameSession.is_active == True
+        )
+    )
+    session = result.scalars().first()
 
     if not session:
         raise HTTPException(status_code=404, detail="Sesión no encontrada o finalizada")
 
     # Obtener progreso del estudiante
-    topic_progress = db.query(StudentTopicProgress).filter(
-        StudentTopicProgress.student_id == current_user.id
-    ).all()
+    result = await db.execute(
+        select(StudentTopicProgress).where(
+            StudentTopicProgress.student_id == current_user.id
+        )
+    )
+    topic_progress = result.scalars().all()
 
     # Determinar qué tema practicar
     selected_topic, difficulty = _select_adaptive_topic(topic_progress, session.total_score)
 
-    # Generar ejercicio
-    exercise_data = ExerciseGenerator.generate_exercise(selected_topic, difficulty, session.total_score)
-
-    # Guardar ejercicio en BD (temporal para esta sesión)
-    # Incluir paralelo_id de la sesión para tracking de progreso
-    exercise = Exercise(
-        title=exercise_data["title"],
-        question=exercise_data["question"],
-        exercise_type="multiple_choice",
-        difficulty=difficulty,
-        topic=selected_topic,
-        correct_answer=exercise_data["correct_answer"],
-        options=exercise_data["options"],
-        points=_calculate_exercise_points(difficulty, session.total_score),
-        is_practice=True,
-        is_active=True,
-        paralelo_id=session.paralelo_id  # Vincular al paralelo del estudiante
-    )
+    if settings.STATELESS_EXERCISES:
+        # Modo sin estado: el ejercicio se genera con una semilla derivada de (sesión, secuencia)
+        # y el token solo lleva los parámetros necesarios para regenerarlo al responder
+        seed = ExerciseGenerator.session_seed(session.id, session.exercises_completed)
+        exercise_data = ExerciseGenerator.generate_exercise(selected_topic, difficulty, session.total_score, seed=seed)
+        possible_points = ExerciseGenerator.exercise_points(difficulty, session.total_score)
+
+        exercise_token = create_exercise_token({
+            "sub": str(current_user.id),
+            "sid": str(session.id),
+            "seq": session.exercises_completed,  # Evita responder dos veces el mismo token
+            "topic": selected_topic.value,
+            "difficulty": difficulty.value,
+            "score": session.total_score  # Puntaje al emitir: determina la dificultad efectiva
+        })
 
-    db.add(exercise)
-    db.commit()
-    db.refresh(exercise)
+        return APIResponse(
+            success=True,
+            data={
+                "exercise_id": None,
+                "exercise_token": exercise_token,
+                "title": exercise_data["title"],
+                "question": exercise_data["question"],
+                "options": json.loads(exercise_data["options"]),
+                "topic": selected_topic.value,
+                "difficulty": difficulty.value,
+                "possible_points": possible_points,
+                "current_score": session.total_score,
+                "exercises_completed": session.exercises_completed
+            }
+        )
+
+    # Servir desde el pool de ejercicios pregenerados (pop en memoria)
+    exercise = practice_pool.pop(selected_topic, difficulty, session.total_score)
+
+    # La fila del ejercicio del pool ya existe: servirlo no escribe en la BD
+    if exercise is None:
+        # Pool vacío para esta combinación: generar y guardar en línea
+        exercise_data = ExerciseGenerator.generate_exercise(selected_topic, difficulty, session.total_score)
+        new_exercise = Exercise(
+            title=exercise_data["title"],
+            question=exercise_data["question"],
+            exercise_type="multiple_choice",
+            difficulty=difficulty,
+            topic=selected_topic,
+            correct_answer=exercise_data["correct_answer"],
+            options=exercise_data["options"],
+            points=ExerciseGenerator.exercise_points(difficulty, session.total_score),
+            is_practice=True,
+            is_active=True,
+            paralelo_id=session.paralelo_id  # Vincular al paralelo del estudiante
+        )
+
+        db.add(new_exercise)
+        await db.commit()
+
+        exercise = {
+            "id": new_exercise.id,
+            "title": new_exercise.title,
+            "question": new_exercise.question,
+            "options": new_exercise.options,
+            "points": new_exercise.points
+        }
 
     return APIResponse(
         success=True,
         data={
-            "exercise_id": str(exercise.id),
-            "title": exercise.title,
-            "question": exercise.question,
-            "options": json.loads(exercise.options) if exercise.options else [],
-            "topic": exercise.topic.value,
-            "difficulty": exercise.difficulty.value,
-            "possible_points": exercise.points,
+            "exercise_id": str(exercise["id"]),
+            "title": exercise["title"],
+            "question": exercise["question"],
+            "options": json.loads(exercise["options"]) if exercise["options"] else [],
+            "topic": selected_topic.value,
+            "difficulty": difficulty.value,
+            "possible_points": exercise["points"],
             "current_score": session.total_score,
             "exercises_completed": session.exercises_completed
         }
@@ -220,38 +290,79 @@ async def get_next_exercise(
 @router.post("/game/submit-answer", response_model=APIResponse)
 async def submit_answer(
     request: schemas.SubmitAnswerRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_student)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_student_async)
 ):
-    """Verificar respuesta y actualizar puntuación"""
-    # Verificar sesión
-    session = db.query(GameSession).filter(
-        GameSession.id == request.session_id,
-        GameSession.student_id == current_user.id,
-        GameSession.is_active == True
-    ).first()
+    """Verificar respuesta y actualizar puntuación (una sola transacción)"""
+    # Verificar sesión y cargar el ejercicio (si viene por id) en la misma consulta
+    # Sin exercise_id (modo sin estado) el LEFT JOIN no encuentra fila y el ejercicio queda en None
+    result = await db.execute(
+        select(GameSession, Exercise)
+        .outerjoin(Exercise, Exercise.id == request.exercise_id)
+        .where(
+            GameSession.id == request.session_id,
+            GameSession.student_id == current_user.id,
+            GameSession.is_active == True
+        )
+    )
+    row = result.first()
 
-    if not session:
+    if not row:
         raise HTTPException(status_code=404, detail="Sesión no encontrada")
 
-    # Obtener ejercicio
-    exercise = db.query(Exercise).filter(Exercise.id == request.exercise_id).first()
+    session, stored_exercise = row
+
+    if request.exercise_token:
+        # Modo sin estado: el ejercicio se verifica en memoria desde el token firmado
+        payload = decode_exercise_token(request.exercise_token)
+
+        if (payload.get("sid") != str(session.id)
+                or payload.get("sub") != str(current_user.id)
+                or payload.get("seq") != session.exercises_completed):
+            raise HTTPException(status_code=400, detail="Ejercicio inválido o ya respondido")
+
+        # Regenerar el ejercicio con la misma semilla para recuperar la respuesta correcta
+        topic = MathTopic(payload["topic"])
+        difficulty = ExerciseDifficulty(payload["difficulty"])
+        exercise_data = ExerciseGenerator.generate_exercise(
+            topic,
+            difficulty,
+            payload["score"],
+            seed=ExerciseGenerator.session_seed(session.id, payload["seq"])
+        )
 
-    if not exercise:
-        raise HTTPException(status_code=404, detail="Ejercicio no encontrado")
+        exercise = {
+            "id": None,
+            "topic": topic,
+            "difficulty": difficulty,
+            "question": exercise_data["question"],
+            "correct_answer": exercise_data["correct_answer"]
+        }
+    else:
+        if not stored_exercise:
+            raise HTTPException(status_code=404, detail="Ejercicio no encontrado")
+
+        exercise = {
+            "id": stored_exercise.id,
+            "topic": stored_exercise.topic,
+            "difficulty": stored_exercise.difficulty,
+            "question": stored_exercise.question,
+            "correct_answer": stored_exercise.correct_answer
+        }
 
     # Verificar respuesta
-    is_correct = request.answer.strip() == exercise.correct_answer.strip()
+    is_correct = request.answer.strip() == exercise["correct_answer"].strip()
 
     # Calcular puntos
     points_earned, points_lost = ExerciseGenerator.calculate_points(
-        exercise.difficulty,
+        exercise["difficulty"],
         is_correct,
         request.time_taken,
         session.total_score
     )
 
     # Actualizar sesión
+    previous_score = session.total_score
     session.exercises_completed += 1
 
     if is_correct:
@@ -263,47 +374,100 @@ async def submit_answer(
 
     # Guardar intento
     attempt = ExerciseAttempt(
-        exercise_id=exercise.id,
+        exercise_id=exercise["id"],
         student_id=current_user.id,
         game_session_id=session.id,
         student_answer=request.answer,
         is_correct=is_correct,
         time_taken=request.time_taken,
         points_earned=points_earned if is_correct else 0,
-        points_lost=points_lost if not is_correct else 0
+        points_lost=points_lost if not is_correct else 0,
+        topic=exercise["topic"],
+        difficulty=exercise["difficulty"],
+        question=exercise["question"],
+        correct_answer=exercise["correct_answer"]
     )
 
     db.add(attempt)
 
-    # Actualizar progreso del tema
-    AIRecommendations.update_topic_progress(
-        str(current_user.id),
-        exercise.topic,
-        is_correct,
-        db
-    )
+    def _update_progress(sync_db: Session):
+        # Actualizar contadores agregados del estudiante
+        stats = student_stats.record_attempt(
+            sync_db,
+            current_user.id,
+            is_correct,
+            points_earned if is_correct else 0,
+            score_delta=session.total_score - previous_score,
+            session_score=session.total_score
+        )
 
-    # Actualizar progreso de metas del estudiante
-    update_student_goals_progress(
-        current_user.id,
-        exercise.topic,
-        is_correct,
-        db
-    )
+        # Insignias cuyas reglas dependen de los contadores que acaban de cambiar
+        new_badges = badge_rules.on_attempt(
+            sync_db, current_user.id, stats, is_correct, session.total_score - previous_score
+        )
 
-    db.commit()
+        leaderboard.record_game_answer(
+            sync_db,
+            current_user.id,
+            session.total_score - previous_score,
+            is_correct
+        )
+
+        # Rollup diario (día UTC de inicio de la sesión)
+        daily_activity.record_answer(
+            sync_db,
+            current_user.id,
+            session.paralelo_id,
+            session.started_at.astimezone(timezone.utc).date(),
+            is_correct,
+            session.total_score - previous_score,
+            topic=exercise["topic"],
+            attempted_on=datetime.now(timezone.utc).date()
+        )
+
+        # Actualizar progreso del tema (UPSERT, sin commit intermedio)
+        topic_progress = AIRecommendations.update_topic_progress(
+            str(current_user.id),
+            exercise["topic"],
+            is_correct,
+            sync_db
+        )
+
+        # Actualizar progreso de metas del estudiante
+        goal_bonus = update_student_goals_progress(
+            current_user.id,
+            exercise["topic"],
+            is_correct,
+            stats,
+            topic_progress,
+            sync_db
+        )
+
+        return goal_bonus, new_badges
+
+    # Los helpers de progreso son síncronos; run_sync los ejecuta sin bloquear el event loop
+    goal_bonus, new_badges = await db.run_sync(_update_progress)
+
+    # Único commit de la petición
+    await db.commit()
+
+    # Índice de posiciones en memoria: solo después de confirmar la transacción
+    rank_index.apply_delta(current_user.id, session.total_score - previous_score + goal_bonus)
+    student_stats.summary_cache.invalidate(current_user.id)
+    AIRecommendations.invalidate_class_recommendations(current_user.id)
 
     return APIResponse(
         success=True,
         data={
             "is_correct": is_correct,
-            "correct_answer": exercise.correct_answer,
+            "correct_answer": exercise["correct_answer"],
             "points_earned": points_earned,
             "points_lost": points_lost,
             "new_score": session.total_score,
-            "explanation": f"{'¡Correcto!' if is_correct else 'Incorrecto.'} La respuesta es {exercise.correct_answer}",
+            "explanation": f"{'¡Correcto!' if is_correct else 'Incorrecto.'} La respuesta es {exercise['correct_answer']}",
             "total_correct": session.correct_answers,
-            "total_wrong": session.wrong_answers
+            "total_wrong": session.wrong_answers,
+            "newBadges": new_badges
         }
     )
 
@@ -311,14 +475,17 @@ async def submit_answer(
 @router.post("/game/end", response_model=APIResponse)
 async def end_game_session(
     request: schemas.EndGameRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_student)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_student_async)
 ):
     """Finalizar sesión de juego"""
-    session = db.query(GameSession).filter(
-        GameSession.id == request.session_id,
-        GameSession.student_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(GameSession).where(
+            GameSession.id == request.session_id,
+            GameSession.student_id == current_user.id
+        )
+    )
+    session = result.scalars().first()
 
     if not session:
         raise HTTPException(status_code=404, detail="Sesión no encontrada")
@@ -326,7 +493,7 @@ async def end_game_session(
     session.is_active = False
     session.ended_at = datetime.now(timezone.utc)
 
-    db.commit()
+    await db.commit()
 
     # Calcular estadísticas finales
     accuracy = (session.correct_answers / session.exercises_completed * 100) if session.exercises_completed > 0 else 0
@@ -350,27 +517,37 @@ async def get_student_stats(
     db: Session = Depends(get_db),
     current_user: User = Depends(require_student)
 ):
-    """Obtener estadísticas del estudiante"""
-    # Estadísticas generales
-    all_attempts = db.query(ExerciseAttempt).filter(
-        ExerciseAttempt.student_id == current_user.id
-    ).all()
-
-    total_attempts = len(all_attempts)
-    correct_attempts = sum(1 for a in all_attempts if a.is_correct)
-    total_points = sum(a.points_earned for a in all_attempts)
-
-    # Sesiones de juego
-    sessions = db.query(GameSession).filter(
-        GameSession.student_id == current_user.id
-    ).all()
-
-    total_sessions = len(sessions)
-    total_score = sum(s.total_score for s in sessions)
-    best_score = max([s.total_score for s in sessions]) if sessions else 0
+    """Obtener estadísticas del estudiante (solo lectura)"""
+    # Estadísticas generales (contadores agregados; su versión invalida la caché)
+    stats = student_stats.read_student_stats(db, current_user.id)
+
+    if stats is not None:
+        cached = student_stats.summary_cache.get(current_user.id, stats.version)
+        if cached is not None:
+            return APIResponse(success=True, data=cached)
+
+    # Sin fila de contadores el estudiante aún no tiene historial
+    total_attempts = stats.total_attempts if stats else 0
+    correct_attempts = stats.correct_attempts if stats else 0
+
+    general = {
+        "total_attempts": total_attempts,
+        "correct_attempts": correct_attempts,
+        "accuracy": round((correct_attempts / total_attempts * 100) if total_attempts > 0 else 0, 1),
+        "total_points": stats.points_earned if stats else 0,
+        "total_sessions": stats.total_sessions if stats else 0,
+        "total_score": stats.total_score if stats else 0,
+        "best_score": stats.best_score if stats else 0
+    }
 
-    # Progreso por tema
-    topic_progress = db.query(StudentTopicProgress).filter(
+    # Progreso por tema (solo las columnas necesarias)
+    topic_progress = db.query(
+        StudentTopicProgress.topic,
+        StudentTopicProgress.mastery_level,
+        StudentTopicProgress.total_attempts,
+        StudentTopicProgress.correct_attempts,
+        StudentTopicProgress.needs_improvement
+    ).filter(
         StudentTopicProgress.student_id == current_user.id
     ).all()
 
@@ -387,21 +564,14 @@ async def get_student_stats(
             "needs_improvement": progress.needs_improvement
         })
 
-    return APIResponse(
-        success=True,
-        data={
-            "general": {
-                "total_attempts": total_attempts,
-                "correct_attempts": correct_attempts,
-                "accuracy": round((correct_attempts / total_attempts * 100) if total_attempts > 0 else 0, 1),
-                "total_points": total_points,
-                "total_sessions": total_sessions,
-                "total_score": total_score,
-                "best_score": best_score
-            },
-            "topics": topics_data
-        }
-    )
+    data = {
+        "general": general,
+        "topics": topics_data
+    }
+    if stats is not None:
+        student_stats.summary_cache.set(current_user.id, stats.version, data)
+
+    return APIResponse(success=True, data=data)
 
 
 @router.get("/ranking", response_model=APIResponse)
@@ -423,56 +593,23 @@ async def get_ranking(
 
         paralelo_id = enrollment.paralelo_id
 
-    # Obtener estudiantes del paralelo
-    enrollments = db.query(Enrollment).filter(
-        Enrollment.paralelo_id == paralelo_id,
-        Enrollment.is_active == True
-    ).all()
-
-    student_ids = [e.student_id for e in enrollments]
+    # Tabla de posiciones materializada (ya ordenada por total_score = ejercicios + bonus de metas)
+    rows = leaderboard.get_paralelo_leaderboard(db, paralelo_id)
 
-    # Obtener puntuación total de cada estudiante
     ranking_data = []
-
-    for student_id in student_ids:
-        student = db.query(User).filter(User.id == student_id).first()
-
-        # Calcular puntuación de ejercicios
-        sessions = db.query(GameSession).filter(
-            GameSession.student_id == student_id
-        ).all()
-
-        exercise_score = sum(s.total_score for s in sessions)
-        total_exercises = sum(s.exercises_completed for s in sessions)
-        correct_answers = sum(s.correct_answers for s in sessions)
-
-        # Calcular puntos bonus de metas completadas
-        goal_bonus = db.query(func.coalesce(func.sum(StudentGoal.points_earned), 0)).filter(
-            StudentGoal.student_id == student_id,
-            StudentGoal.status == GoalStatus.completed
-        ).scalar() or 0
-
-        # Total combinado para ordenar
-        total_score = exercise_score + goal_bonus
-
+    for idx, row in enumerate(rows):
         ranking_data.append({
-            "student_id": str(student.id),
-            "name": f"{student.first_name} {student.last_name}",
-            "total_score": total_score,
-            "exercise_score": exercise_score,
-            "goal_bonus": goal_bonus,
-            "exercises_completed": total_exercises,
-            "correct_answers": correct_answers,
-            "is_current_user": student.id == current_user.id
+            "student_id": str(row.student_id),
+            "name": f"{row.first_name} {row.last_name}",
+            "total_score": row.total_score,
+            "exercise_score": row.exercise_score,
+            "goal_bonus": row.goal_bonus,
+            "exercises_completed": row.exercises_completed,
+            "correct_answers": row.correct_answers,
+            "is_current_user": row.student_id == current_user.id,
+            "rank": idx + 1
         })
 
-    # Ordenar por puntuación
-    ranking_data.sort(key=lambda x: x["total_score"], reverse=True)
-
-    # Agregar posición
-    for idx, student in enumerate(ranking_data):
-        student["rank"] = idx + 1
-
     # Obtener información del paralelo
     paralelo = db.query(Paralelo).filter(Paralelo.id == paralelo_id).first()
 
@@ -489,6 +626,104 @@ async def get_ranking(
     )
 
 
+def _resolve_rank_scope(scope: str, paralelo_id: Optional[UUID], current_user: User, db: Session) -> Optional[UUID]:
+    """Determinar el paralelo del ranking (None = ranking global)"""
+    if scope == "global":
+        return None
+
+    if paralelo_id:
+        return paralelo_id
+
+    enrollment = db.query(Enrollment).filter(
+        Enrollment.student_id == current_user.id,
+        Enrollment.is_active == True
+    ).first()
+
+    if not enrollment:
+        raise HTTPException(status_code=404, detail="No estás inscrito en ningún paralelo")
+
+    return enrollment.paralelo_id
+
+
+def _serialize_rank_entries(entries: list, current_user: User, db: Session) -> list:
+    """Agregar nombres a las entradas (posición, id, puntaje) del índice con una sola consulta"""
+    student_ids = [student_id for _, student_id, _ in entries]
+    names = {
+        user_id: f"{first_name} {last_name}"
+        for user_id, first_name, last_name in db.query(User.id, User.first_name, User.last_name).filter(
+            User.id.in_(student_ids)
+        ).all()
+    } if student_ids else {}
+
+    return [
+        {
+            "rank": rank,
+            "student_id": str(student_id),
+            "name": names.get(student_id, ""),
+            "total_score": score,
+            "is_current_user": student_id == current_user.id
+        }
+        for rank, student_id, score in entries
+    ]
+
+
+@router.get("/ranking/my-rank", response_model=APIResponse)
+async def get_my_rank(
+    scope: str = "paralelo",
+    paralelo_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_student)
+):
+    """Obtener la posición del estudiante (scope: paralelo o global)"""
+    target_paralelo = _resolve_rank_scope(scope, paralelo_id, current_user, db)
+    result = rank_index.rank(current_user.id, target_paralelo)
+
+    if result is None:
+        raise HTTPException(status_code=404, detail="No apareces en este ranking")
+
+    rank, score, total = result
+
+    return APIResponse(
+        success=True,
+        data={
+            "rank": rank,
+            "total_score": score,
+            "total_students": total,
+            "paralelo_id": str(target_paralelo) if target_paralelo else None
+        }
+    )
+
+
+@router.get("/ranking/top", response_model=APIResponse)
+async def get_ranking_top(
+    k: int = 10,
+    scope: str = "paralelo",
+    paralelo_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_student)
+):
+    """Obtener los k primeros del ranking"""
+    target_paralelo = _resolve_rank_scope(scope, paralelo_id, current_user, db)
+    entries = rank_index.top(max(1, min(k, 100)), target_paralelo)
+
+    return APIResponse(success=True, data=_serialize_rank_entries(entries, current_user, db))
+
+
+@router.get("/ranking/neighbors", response_model=APIResponse)
+async def get_ranking_neighbors(
+    k: int = 3,
+    scope: str = "paralelo",
+    paralelo_id: Optional[UUID] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_student)
+):
+    """Obtener los k estudiantes por encima y por debajo del estudiante"""
+    target_paralelo = _resolve_rank_scope(scope, paralelo_id, current_user, db)
+    entries = rank_index.neighbors(current_user.id, max(1, min(k, 50)), target_paralelo)
+
+    return APIResponse(success=True, data=_serialize_rank_entries(entries, current_user, db))
+
+
 @router.get("/recommendations", response_model=APIResponse)
 async def get_recommendations(
     db: Session = Depends(get_db),
@@ -542,25 +777,6 @@ def _select_adaptive_topic(topic_progress: list, current_score: int) -> tuple:
     return (topic, difficulty)
 
 
-def _calculate_exercise_points(difficulty: ExerciseDifficulty, current_score: int) -> int:
-    """Calcula cuántos puntos vale un ejercicio"""
-    base_points = {
-        ExerciseDifficulty.easy: 10,
-        ExerciseDifficulty.medium: 20,
-        ExerciseDifficulty.hard: 35
-    }
-
-    points = base_points.get(difficulty, 10)
-
-    # Aumentar valor de puntos con score alto
-    if current_score > 500:
-        points = int(points * 1.3)
-    elif current_score > 200:
-        points = int(points * 1.15)
-
-    return points
-
-
 # ==================== ENDPOINTS DE DESAFIOS ====================
 
 @router.get("/challenges", response_model=APIResponse)
@@ -602,7 +818,22 @@ async def get_challenges(
         # Versus finalizados
         query = query.filter(Challenge.status == ChallengeStatus.completed)
 
-    challenges = query.order_by(desc(Challenge.created_at)).all()
+    challenges = query.options(
+        joinedload(Challenge.paralelo1),
+        joinedload(Challenge.paralelo2)
+    ).order_by(desc(Challenge.created_at)).all()
+
+    # Participaciones del estudiante en todos los versus listados
+    my_participations = {
+        p.challenge_id: p
+        for p in db.query(ChallengeParticipant).filter(
+            ChallengeParticipant.challenge_id.in_([c.id for c in challenges]),
+            ChallengeParticipant.student_id == current_user.id
+        ).all()
+    } if challenges else {}
+
+    # Marcadores compartidos (caché por versus)
+    scoreboards = challenge_scoreboard.get_scoreboards(db, challenges)
 
     # Nombre del tema
     topic_names = {
@@ -627,10 +858,7 @@ async def get_challenges(
         is_paralelo1 = str(challenge.paralelo1_id) == str(my_paralelo_id)
 
         # Verificar si el estudiante ya se unio
-        my_participation = db.query(ChallengeParticipant).filter(
-            ChallengeParticipant.challenge_id == challenge.id,
-            ChallengeParticipant.student_id == current_user.id
-        ).first()
+        my_participation = my_participations.get(challenge.id)
         has_joined = my_participation is not None
 
         # Determinar ganador
@@ -638,38 +866,26 @@ async def get_challenges(
         if challenge.winner_paralelo_id:
             is_winner_paralelo = str(challenge.winner_paralelo_id) == str(my_paralelo_id)
 
-        # Obtener participantes por paralelo
-        participants_paralelo1 = db.query(ChallengeParticipant).filter(
-            ChallengeParticipant.challenge_id == challenge.id,
-            ChallengeParticipant.paralelo_id == challenge.paralelo1_id
-        ).order_by(desc(ChallengeParticipant.score)).all()
-
-        participants_paralelo2 = db.query(ChallengeParticipant).filter(
-            ChallengeParticipant.challenge_id == challenge.id,
-            ChallengeParticipant.paralelo_id == challenge.paralelo2_id
-        ).order_by(desc(ChallengeParticipant.score)).all()
-
-        # Construir datos de participantes del paralelo 1
-        p1_data = []
-        for p in participants_paralelo1:
-            student = p.student
-            p1_data.append({
-                "name": f"{student.first_name} {student.last_name}",
-                "score": p.score,
-                "isMe": p.student_id == current_user.id,
-                "hasFinished": p.has_finished
-            })
-
-        # Construir datos de participantes del paralelo 2
-        p2_data = []
-        for p in participants_paralelo2:
-            student = p.student
-            p2_data.append({
-                "name": f"{student.first_name} {student.last_name}",
-                "score": p.score,
-                "isMe": p.student_id == current_user.id,
-                "hasFinished": p.has_finished
-            })
+        # Participantes por paralelo desde el marcador
+        scoreboard = scoreboards[challenge.id]
+        p1_data = [
+            {
+                "name": entry["name"],
+                "score": entry["score"],
+                "isMe": entry["studentId"] == current_user.id,
+                "hasFinished": entry["hasFinished"]
+            }
+            for entry in scoreboard["paralelo1"]
+        ]
+        p2_data = [
+            {
+                "name": entry["name"],
+                "score": entry["score"],
+                "isMe": entry["studentId"] == current_user.id,
+                "hasFinished": entry["hasFinished"]
+            }
+            for entry in scoreboard["paralelo2"]
+        ]
 
         challenges_data.append({
             "id": str(challenge.id),
@@ -688,7 +904,7 @@ async def get_challenges(
                 "isMyParalelo": is_paralelo1,
                 "isWinner": str(challenge.winner_paralelo_id) == str(challenge.paralelo1_id) if challenge.winner_paralelo_id else False,
                 "participants": p1_data,
-                "participantCount": len(participants_paralelo1)
+                "participantCount": len(p1_data)
             },
             "paralelo2": {
                 "id": str(paralelo2.id) if paralelo2 else None,
@@ -697,7 +913,7 @@ async def get_challenges(
                 "isMyParalelo": not is_paralelo1,
                 "isWinner": str(challenge.winner_paralelo_id) == str(challenge.paralelo2_id) if challenge.winner_paralelo_id else False,
                 "participants": p2_data,
-                "participantCount": len(participants_paralelo2)
+                "participantCount": len(p2_data)
             },
             "hasJoined": has_joined,
             "isWinnerParalelo": is_winner_paralelo,
@@ -758,11 +974,70 @@ async def join_challenge(
         paralelo_id=student_paralelo_id
     )
     db.add(participant)
+    challenge_scoreboard.bump_version(db, challenge_id)
     db.commit()
 
     return APIResponse(success=True, message="Te has unido al versus exitosamente")
 
 
+@router.get("/challenges/{challenge_id}/live")
+async def challenge_live_scores(
+    challenge_id: UUID,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_from_query)
+):
+    """
+    Marcador en vivo de un versus por Server-Sent Events.
+    El token va en la query (?token=...) porque EventSource no permite cabeceras.
+    """
+    if current_user.role not in [UserRole.student, UserRole.admin]:
+        raise HTTPException(status_code=403, detail="Acceso denegado. Se requiere rol de estudiante")
+
+    challenge = db.query(Challenge).filter(
+        Challenge.id == challenge_id,
+        Challenge.is_active == True
+    ).first()
+
+    if not challenge:
+        raise HTTPException(status_code=404, detail="Versus no encontrado")
+
+    # Solo estudiantes de los paralelos que compiten
+    enrolled = db.query(Enrollment.id).filter(
+        Enrollment.student_id == current_user.id,
+        Enrollment.is_active == True,
+        Enrollment.paralelo_id.in_([challenge.paralelo1_id, challenge.paralelo2_id])
+    ).first()
+
+    if not enrolled:
+        raise HTTPException(status_code=403, detail="Tu paralelo no participa en este versus")
+
+    # Suscribirse antes de leer el estado inicial: lo publicado mientras se arma el snapshot
+    # queda en la cola (los eventos traen valores absolutos, repetir uno no altera el marcador)
+    queue = score_broker.subscribe(challenge_id)
+    try:
+        db.refresh(challenge)
+        scoreboard = challenge_scoreboard.get_scoreboards(db, [challenge])[challenge.id]
+        initial = {
+            "status": challenge.status.value,
+            "paralelo1Score": challenge.paralelo1_score or 0,
+            "paralelo2Score": challenge.paralelo2_score or 0,
+            "participants": {
+                side: [{**entry, "studentId": str(entry["studentId"])} for entry in entries]
+                for side, entries in scoreboard.items()
+            }
+        }
+    except Exception:
+        score_broker.unsubscribe(challenge_id, queue)
+        raise
+
+    return StreamingResponse(
+        event_stream(challenge_id, queue, initial, request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/challenges/{challenge_id}/exercise", response_model=APIResponse)
 async def get_challenge_exercise(
     challenge_id: UUID,
@@ -793,6 +1068,7 @@ async def get_challenge_exercise(
         if not participant.has_finished:
             participant.has_finished = True
             participant.finished_at = datetime.now(timezone.utc)
+            challenge_scoreboard.bump_version(db, challenge_id)
             db.commit()
         return APIResponse(
             success=True,
@@ -804,41 +1080,26 @@ async def get_challenge_exercise(
             }
         )
 
-    # Generar ejercicio
-    topic = challenge.topic if challenge.topic else random.choice(list(MathTopic))
-    difficulty = challenge.difficulty if challenge.difficulty else ExerciseDifficulty.medium
-
-    exercise_data = ExerciseGenerator.generate_exercise(topic, difficulty, participant.score)
-
-    # Guardar ejercicio
-    exercise = Exercise(
-        title=exercise_data["title"],
-        question=exercise_data["question"],
-        exercise_type="multiple_choice",
-        difficulty=difficulty,
-        topic=topic,
-        correct_answer=exercise_data["correct_answer"],
-        options=exercise_data["options"],
-        points=_calculate_exercise_points(difficulty, 0),
-        is_practice=False,
-        is_active=True
-    )
+    # Siguiente ejercicio del conjunto fijo del versus (lectura en caché)
+    exercise = challenge_exercises.get_exercise(db, challenge, participant.exercises_completed)
 
-    db.add(exercise)
-    db.commit()
-    db.refresh(exercise)
+    if exercise is None:
+        raise HTTPException(status_code=404, detail="Ejercicio del versus no encontrado")
+
+    topic = exercise["topic"]
+    difficulty = exercise["difficulty"]
 
     return APIResponse(
         success=True,
         data={
             "finished": False,
-            "exercise_id": str(exercise.id),
-            "title": exercise.title,
-            "question": exercise.question,
-            "options": json.loads(exercise.options) if exercise.options else [],
-            "topic": exercise.topic.value,
-            "difficulty": exercise.difficulty.value,
-            "possible_points": exercise.points,
+            "exercise_id": str(exercise["id"]),
+            "title": exercise["title"],
+            "question": exercise["question"],
+            "options": json.loads(exercise["options"]) if exercise["options"] else [],
+            "topic": topic.value,
+            "difficulty": difficulty.value,
+            "possible_points": ExerciseGenerator.exercise_points(difficulty, 0),
             "current_exercise": participant.exercises_completed + 1,
             "total_exercises": challenge.num_exercises,
             "current_score": participant.score
@@ -872,79 +1133,94 @@ async def submit_challenge_answer(
     if not challenge:
         raise HTTPException(status_code=400, detail="El versus no esta activo")
 
-    # Obtener ejercicio
-    exercise = db.query(Exercise).filter(Exercise.id == request.exercise_id).first()
+    if participant.exercises_completed >= challenge.num_exercises:
+        raise HTTPException(status_code=400, detail="Ya completaste todos los ejercicios del versus")
 
-    if not exercise:
-        raise HTTPException(status_code=404, detail="Ejercicio no encontrado")
+    # Solo se acepta el siguiente ejercicio del conjunto fijo del versus (lectura en caché)
+    exercise = challenge_exercises.get_exercise(db, challenge, participant.exercises_completed)
+
+    if exercise is None or exercise["id"] != request.exercise_id:
+        raise HTTPException(status_code=400, detail="El ejercicio no es el siguiente del versus")
 
     # Verificar respuesta
-    is_correct = request.answer.strip() == exercise.correct_answer.strip()
+    is_correct = request.answer.strip() == exercise["correct_answer"].strip()
 
     # Calcular puntos
     points_earned, points_lost = ExerciseGenerator.calculate_points(
-        exercise.difficulty,
+        exercise["difficulty"],
         is_correct,
         request.time_taken,
         participant.score
     )
 
-    # Actualizar participacion del estudiante
-    participant.exercises_completed += 1
-    participant.time_taken += request.time_taken
-
-    points_to_add = 0
-    if is_correct:
-        participant.correct_answers += 1
-        participant.score += points_earned
-        points_to_add = points_earned
-    else:
-        participant.wrong_answers += 1
-
-    # IMPORTANTE: Actualizar puntuacion del paralelo en el versus
-    student_paralelo_id = participant.paralelo_id
-    if student_paralelo_id:
-        if str(challenge.paralelo1_id) == str(student_paralelo_id):
-            challenge.paralelo1_score = (challenge.paralelo1_score or 0) + points_to_add
-        elif str(challenge.paralelo2_id) == str(student_paralelo_id):
-            challenge.paralelo2_score = (challenge.paralelo2_score or 0) + points_to_add
+    points_to_add = points_earned if is_correct else 0
 
-    # Verificar si termino
-    if participant.exercises_completed >= challenge.num_exercises:
-        participant.has_finished = True
-        participant.finished_at = datetime.now(timezone.utc)
+    # Participación con UPDATE atómico condicionado a la posición: de dos envíos simultáneos
+    # del mismo ejercicio solo uno cambia la fila, el otro es un duplicado
+    participant = challenge_scoreboard.record_answer(
+        db, participant.id, participant.exercises_completed, challenge.num_exercises,
+        is_correct, points_to_add, request.time_taken
+    )
+    if participant is None:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="La respuesta a este ejercicio ya fue registrada")
 
     # Guardar intento
     attempt = ExerciseAttempt(
-        exercise_id=exercise.id,
+        exercise_id=exercise["id"],
         student_id=current_user.id,
         student_answer=request.answer,
         is_correct=is_correct,
         time_taken=request.time_taken,
         points_earned=points_earned if is_correct else 0,
-        points_lost=points_lost if not is_correct else 0
+        points_lost=points_lost if not is_correct else 0,
+        topic=exercise["topic"],
+        difficulty=exercise["difficulty"],
+        question=exercise["question"],
+        correct_answer=exercise["correct_answer"]
     )
 
     db.add(attempt)
+    stats = student_stats.record_attempt(db, current_user.id, is_correct, points_earned if is_correct else 0)
+    new_badges = badge_rules.on_attempt(db, current_user.id, stats, is_correct)
+
+    # Puntaje del paralelo con UPDATE atómico (sin leer-modificar-escribir)
+    paralelo1_score, paralelo2_score = challenge_scoreboard.add_paralelo_points(
+        db, challenge, participant.paralelo_id, points_to_add
+    )
     db.commit()
-    db.refresh(challenge)
+    student_stats.summary_cache.invalidate(current_user.id)
+
+    # Publicar el cambio a los marcadores en vivo
+    score_broker.publish(challenge_id, {
+        "paralelo1Score": paralelo1_score,
+        "paralelo2Score": paralelo2_score,
+        "studentId": str(current_user.id),
+        "name": f"{current_user.first_name} {current_user.last_name}",
+        "paraleloId": str(participant.paralelo_id) if participant.paralelo_id else None,
+        "score": participant.score,
+        "pointsEarned": points_to_add,
+        "exercisesCompleted": participant.exercises_completed,
+        "hasFinished": participant.has_finished
+    })
 
     # Obtener puntuaciones actualizadas
     return APIResponse(
         success=True,
         data={
             "is_correct": is_correct,
-            "correct_answer": exercise.correct_answer,
+            "correct_answer": exercise["correct_answer"],
             "points_earned": points_earned if is_correct else 0,
             "points_lost": points_lost if not is_correct else 0,
             "new_score": participant.score,
             "exercises_completed": participant.exercises_completed,
             "total_exercises": challenge.num_exercises,
             "has_finished": participant.has_finished,
-            "explanation": f"La respuesta correcta es: {exercise.correct_answer}",
+            "explanation": f"La respuesta correcta es: {exercise['correct_answer']}",
             # Scores de paralelos actualizados
-            "paralelo1Score": challenge.paralelo1_score or 0,
-            "paralelo2Score": challenge.paralelo2_score or 0
+            "paralelo1Score": paralelo1_score,
+            "paralelo2Score": paralelo2_score,
+            "newBadges": new_badges
         }
     )
 
@@ -980,41 +1256,61 @@ async def get_student_goals(
     else:
         query = query.filter(Goal.paralelo_id == None)
 
-    goals = query.order_by(desc(Goal.created_at)).all()
-
-    goals_data = []
-    for goal in goals:
-        # Buscar o crear StudentGoal
-        student_goal = db.query(StudentGoal).filter(
-            StudentGoal.goal_id == goal.id,
+    # Metas con la asignación del estudiante (LEFT JOIN: None si aún no existe)
+    rows = query.outerjoin(
+        StudentGoal, and_(
+            StudentGoal.goal_id == Goal.id,
             StudentGoal.student_id == current_user.id
-        ).first()
-
-        if not student_goal:
-            # Crear registro para este estudiante si la meta esta dentro del periodo
-            if goal.start_date <= now <= goal.end_date:
-                student_goal = StudentGoal(
-                    goal_id=goal.id,
-                    student_id=current_user.id,
-                    current_value=0,
-                    status=GoalStatus.active
-                )
-                db.add(student_goal)
-                db.flush()
+        )
+    ).add_entity(StudentGoal).order_by(desc(Goal.created_at)).all()
+
+    # Crear en un solo UPSERT las asignaciones faltantes de metas dentro de su periodo
+    missing_goal_ids = [
+        goal.id for goal, student_goal in rows
+        if student_goal is None and goal.start_date <= now <= goal.end_date
+    ]
+    if missing_goal_ids:
+        stmt = insert(StudentGoal).values([
+            {
+                "id": uuid.uuid4(),
+                "goal_id": goal_id,
+                "student_id": current_user.id,
+                "current_value": 0,
+                "status": GoalStatus.active,
+                "points_earned": 0
+            }
+            for goal_id in missing_goal_ids
+        ])
+        # DO UPDATE sin cambios para que RETURNING incluya también las creadas en paralelo
+        created = {
+            student_goal.goal_id: student_goal
+            for student_goal in db.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[StudentGoal.goal_id, StudentGoal.student_id],
+                    set_={"goal_id": stmt.excluded.goal_id}
+                ).returning(StudentGoal)
+            ).scalars().all()
+        }
+        rows = [
+            (goal, student_goal if student_goal is not None else created.get(goal.id))
+            for goal, student_goal in rows
+        ]
 
+    goals_data = []
+    for goal, student_goal in rows:
         if student_goal:
-            # Verificar si expiro
-            if goal.end_date < now and student_goal.status == GoalStatus.active:
-                student_goal.status = GoalStatus.expired
-                db.flush()
+            # La expiración la marca el planificador en segundo plano; aquí solo se refleja
+            goal_status = student_goal.status
+            if goal.end_date < now and goal_status == GoalStatus.active:
+                goal_status = GoalStatus.expired
 
             # Filtrar por status si se especifica
             if status:
-                if status == "active" and student_goal.status != GoalStatus.active:
+                if status == "active" and goal_status != GoalStatus.active:
                     continue
-                elif status == "completed" and student_goal.status != GoalStatus.completed:
+                elif status == "completed" and goal_status != GoalStatus.completed:
                     continue
-                elif status == "expired" and student_goal.status != GoalStatus.expired:
+                elif status == "expired" and goal_status != GoalStatus.expired:
                     continue
 
             # Nombre del tipo de meta
@@ -1055,79 +1351,79 @@ async def get_student_goals(
                 "rewardPoints": goal.reward_points,
                 "startDate": goal.start_date.isoformat(),
                 "endDate": goal.end_date.isoformat(),
-                "status": student_goal.status.value,
+                "status": goal_status.value,
                 "completedAt": student_goal.completed_at.isoformat() if student_goal.completed_at else None,
                 "pointsEarned": student_goal.points_earned or 0
             })
 
-    db.commit()
+    if missing_goal_ids:
+        db.commit()
 
     return APIResponse(success=True, data=goals_data)
 
 
 # ==================== ENDPOINTS DE INSIGNIAS ====================
 
+def _etag_response(request: Request, response: Response, etag: str, payload: APIResponse):
+    """Responder 304 si el cliente ya tiene la versión indicada por el ETag"""
+    # no-cache: el navegador revalida siempre con If-None-Match y reutiliza su copia ante un 304
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return payload
+
+
 @router.get("/badges/all", response_model=APIResponse)
 async def get_all_badges(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_student)
 ):
-    """Obtener todas las insignias disponibles"""
-    from app.models import Badge
-
-    # Obtener todas las insignias activas
-    badges = db.query(Badge).filter(Badge.is_active == True).all()
+    """Obtener todas las insignias disponibles (catálogo en memoria, ETag por versión)"""
+    version, badges = badge_catalog.current(db)
 
-    badges_data = []
-    for badge in badges:
-        badges_data.append({
-            "id": str(badge.id),
-            "name": badge.name,
-            "description": badge.description,
-            "icon": badge.icon,
-            "category": badge.category.value if badge.category else "general",
-            "rarity": "common",  # Por defecto
-            "requirement": badge.requirement,
-            "requirementValue": badge.requirement_value,
-            "points": badge.points
-        })
-
-    return APIResponse(success=True, data=badges_data)
+    return _etag_response(
+        request, response, f'W/"badges-{version}"',
+        APIResponse(success=True, data=badges)
+    )
 
 
 @router.get("/badges", response_model=APIResponse)
 async def get_student_badges(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_student)
 ):
     """Obtener solo las insignias que el estudiante ha desbloqueado"""
     from app.models import Badge, StudentBadge
 
-    # Obtener las insignias que el estudiante tiene
-    student_badges = db.query(StudentBadge).filter(
-        StudentBadge.student_id == current_user.id
-    ).all()
+    # Insignias del estudiante con su insignia en una sola consulta
+    rows = db.query(StudentBadge, Badge).join(
+        Badge, Badge.id == StudentBadge.badge_id
+    ).filter(
+        StudentBadge.student_id == current_user.id,
+        Badge.is_active == True
+    ).order_by(StudentBadge.earned_at).all()
 
     badges_data = []
-    for student_badge in student_badges:
-        badge = student_badge.badge
-        if badge and badge.is_active:
-            badges_data.append({
-                "id": str(student_badge.id),
-                "badgeId": str(badge.id),
-                "name": badge.name,
-                "description": badge.description,
-                "icon": badge.icon,
-                "category": badge.category.value if badge.category else "general",
-                "rarity": "common",  # Por defecto
-                "requirement": badge.requirement,
-                "requirementValue": badge.requirement_value,
-                "points": badge.points,
-                "isEquipped": student_badge.is_equipped,
-                "earnedAt": student_badge.earned_at.isoformat() if student_badge.earned_at else None
-            })
+    for student_badge, badge in rows:
+        badges_data.append({
+            **serialize_badge(badge),
+            "id": str(student_badge.id),
+            "badgeId": str(badge.id),
+            "isEquipped": student_badge.is_equipped,
+            "earnedAt": student_badge.earned_at.isoformat() if student_badge.earned_at else None
+        })
 
-    return APIResponse(success=True, data=badges_data)
+    # ETag del contenido: la misma lista (incluida la insignia equipada) devuelve 304
+    digest = hashlib.sha1(json.dumps(badges_data, sort_keys=True).encode()).hexdigest()
+    return _etag_response(
+        request, response, f'W/"student-badges-{digest}"',
+        APIResponse(success=True, data=badges_data)
+    )
 
 
 @router.post("/badges/{badge_id}/equip", response_model=APIResponse)
@@ -1207,68 +1503,15 @@ async def check_achievements(
     db: Session = Depends(get_db),
     current_user: User = Depends(require_student)
 ):
-    """Verificar y otorgar insignias pendientes basadas en el progreso del estudiante"""
-    from app.models import Badge, StudentBadge, GameSession
-
-    new_badges = []
-
-    # Obtener todas las insignias activas que el estudiante NO tiene
-    existing_badge_ids = db.query(StudentBadge.badge_id).filter(
-        StudentBadge.student_id == current_user.id
-    ).all()
-    existing_ids = [str(b[0]) for b in existing_badge_ids]
-
-    available_badges = db.query(Badge).filter(
-        Badge.is_active == True,
-        ~Badge.id.in_([UUID(id) for id in existing_ids]) if existing_ids else True
-    ).all()
-
-    # Obtener estadisticas del estudiante
-    total_sessions = db.query(func.count(GameSession.id)).filter(
-        GameSession.student_id == current_user.id
-    ).scalar() or 0
-
-    total_correct = db.query(func.sum(GameSession.correct_answers)).filter(
-        GameSession.student_id == current_user.id
-    ).scalar() or 0
-
-    total_exercises = db.query(func.sum(GameSession.total_questions)).filter(
-        GameSession.student_id == current_user.id
-    ).scalar() or 0
-
-    # Verificar cada insignia
-    for badge in available_badges:
-        earned = False
-        requirement = badge.requirement
-        value = badge.requirement_value or 0
-
-        if requirement == "first_exercise" and total_exercises >= 1:
-            earned = True
-        elif requirement == "exercises_count" and total_exercises >= value:
-            earned = True
-        elif requirement == "correct_streak" and total_correct >= value:
-            earned = True
-        elif requirement == "sessions_count" and total_sessions >= value:
-            earned = True
-
-        if earned:
-            # Otorgar la insignia
-            new_student_badge = StudentBadge(
-                student_id=current_user.id,
-                badge_id=badge.id,
-                is_equipped=False
-            )
-            db.add(new_student_badge)
-            new_badges.append({
-                "id": str(badge.id),
-                "name": badge.name,
-                "description": badge.description,
-                "icon": badge.icon,
-                "rarity": "common"
-            })
-
-    if new_badges:
-        db.commit()
+    """
+    Verificar insignias pendientes. Las insignias se otorgan al responder; aquí solo se
+    recuperan las que el estudiante ya cumplía antes de existir (contadores de student_stats).
+    """
+    stats = student_stats.get_student_stats(db, current_user.id)
+    new_badges = badge_rules.check_all(db, current_user.id, stats)
+
+    # Confirma las insignias nuevas y, la primera vez, los contadores reconstruidos
+    db.commit()
 
     return APIResponse(success=True, data={"newBadges": new_badges})
 
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
 from fastapi.responses import StreamingResponse, FileResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 import os
 import uuid as uuid_lib
 import shutil
@@ -21,10 +21,16 @@ from app.models import (
     User, Paralelo, Enrollment, Exercise, ExerciseAttempt, UserRole,
     Goal, StudentGoal, GoalStatus, GoalType, MathTopic,
     Challenge, ChallengeParticipant, ChallengeStatus, ExerciseDifficulty,
-    GameSession
+    GameSession, StudentDailyActivity
 )
 from app.schemas import APIResponse
 from app.auth import get_current_user
+from app.ai_recommendations import AIRecommendations
+from app.services import (
+    leaderboard, daily_activity, performance_snapshots, challenge_exercises, challenge_scoreboard,
+    goal_assignment
+)
+from app.services.rank_index import rank_index
 
 
 # ============= Schemas para Goals =============
@@ -95,54 +101,64 @@ async def get_my_paralelos(
     current_user: User = Depends(require_teacher)
 ):
     """Obtener todos los paralelos del profesor actual"""
-    paralelos = db.query(Paralelo).filter(
+    # Estudiantes activos inscritos por paralelo
+    enrollment_counts = db.query(
+        Enrollment.paralelo_id,
+        func.count(Enrollment.id).label("active_students")
+    ).filter(
+        Enrollment.is_active == True
+    ).group_by(Enrollment.paralelo_id).subquery()
+
+    paralelos = db.query(
+        Paralelo,
+        func.coalesce(enrollment_counts.c.active_students, 0)
+    ).outerjoin(
+        enrollment_counts, enrollment_counts.c.paralelo_id == Paralelo.id
+    ).filter(
         Paralelo.teacher_id == current_user.id,
         Paralelo.is_active == True
     ).order_by(Paralelo.created_at.desc()).all()
 
-    paralelos_data = []
-    for paralelo in paralelos:
-        # Contar estudiantes activos inscritos
-        active_students = db.query(func.count(Enrollment.id)).filter(
-            Enrollment.paralelo_id == paralelo.id,
-            Enrollment.is_active == True
-        ).scalar()
-
-        # Obtener IDs de estudiantes inscritos
-        student_ids = [e.student_id for e in db.query(Enrollment.student_id).filter(
-            Enrollment.paralelo_id == paralelo.id,
-            Enrollment.is_active == True
-        ).all()]
+    # Actividad de los estudiantes inscritos, agregada por paralelo en una sola consulta
+    activity = {
+        row.paralelo_id: row
+        for row in db.query(
+            StudentDailyActivity.paralelo_id,
+            func.sum(StudentDailyActivity.sessions_count).label("sessions"),
+            func.sum(StudentDailyActivity.exercises_completed).label("exercises"),
+            func.sum(StudentDailyActivity.correct_answers).label("correct"),
+            func.sum(StudentDailyActivity.wrong_answers).label("wrong"),
+            func.count(func.distinct(StudentDailyActivity.student_id)).label("students_with_activity")
+        ).join(
+            Enrollment, and_(
+                Enrollment.paralelo_id == StudentDailyActivity.paralelo_id,
+                Enrollment.student_id == StudentDailyActivity.student_id,
+                Enrollment.is_active == True
+            )
+        ).join(
+            Paralelo, Paralelo.id == StudentDailyActivity.paralelo_id
+        ).filter(
+            Paralelo.teacher_id == current_user.id,
+            Paralelo.is_active == True
+        ).group_by(StudentDailyActivity.paralelo_id).all()
+    }
 
-        # Contar ejercicios completados por los estudiantes del paralelo
-        total_exercises_completed = 0
-        total_correct = 0
-        total_sessions = 0
+    paralelos_data = []
+    for paralelo, active_students in paralelos:
+        row = activity.get(paralelo.id)
+        total_sessions = int(row.sessions or 0) if row else 0
+        total_exercises_completed = int(row.exercises or 0) if row else 0
+        total_correct = int(row.correct or 0) if row else 0
+        total_wrong = int(row.wrong or 0) if row else 0
+
+        # Calcular precisión promedio
         avg_accuracy = 0
+        if total_correct + total_wrong > 0:
+            avg_accuracy = round((total_correct / (total_correct + total_wrong)) * 100, 1)
 
-        if student_ids:
-            # Obtener sesiones de juego del paralelo
-            sessions = db.query(GameSession).filter(
-                GameSession.paralelo_id == paralelo.id,
-                GameSession.student_id.in_(student_ids)
-            ).all()
-
-            total_sessions = len(sessions)
-            total_exercises_completed = sum(s.exercises_completed or 0 for s in sessions)
-            total_correct = sum(s.correct_answers or 0 for s in sessions)
-            total_wrong = sum(s.wrong_answers or 0 for s in sessions)
-
-            # Calcular precisión promedio
-            if total_correct + total_wrong > 0:
-                avg_accuracy = round((total_correct / (total_correct + total_wrong)) * 100, 1)
-
-        # Calcular progreso basado en actividad
         # Progreso = porcentaje de estudiantes que han practicado al menos una vez
         if active_students > 0:
-            students_with_activity = db.query(func.count(func.distinct(GameSession.student_id))).filter(
-                GameSession.paralelo_id == paralelo.id,
-                GameSession.student_id.in_(student_ids) if student_ids else False
-            ).scalar() or 0
+            students_with_activity = row.students_with_activity if row else 0
             progress = round((students_with_activity / active_students) * 100, 1)
         else:
             progress = 0
@@ -267,21 +283,7 @@ async def get_student_detailed_stats(
         if not paralelo:
             raise HTTPException(status_code=404, detail="Paralelo no encontrado o no tienes acceso")
 
-        # Obtener sesiones del estudiante en este paralelo
-        sessions = db.query(GameSession).filter(
-            GameSession.student_id == student_id,
-            GameSession.paralelo_id == paralelo_id
-        ).all()
-        session_ids = [s.id for s in sessions]
-
-        # Filtrar intentos por las sesiones del paralelo
-        if session_ids:
-            attempts_query = db.query(ExerciseAttempt).filter(
-                ExerciseAttempt.student_id == student_id,
-                ExerciseAttempt.game_session_id.in_(session_ids)
-            )
-        else:
-            attempts_query = db.query(ExerciseAttempt).filter(False)  # No hay sesiones
+        paralelo_ids = [paralelo_id]
     else:
         # Obtener todos los paralelos del profesor
         teacher_paralelos = db.query(Paralelo.id).filter(
@@ -289,93 +291,90 @@ async def get_student_detailed_stats(
         ).all()
         paralelo_ids = [p[0] for p in teacher_paralelos]
 
-        # Obtener sesiones del estudiante en paralelos del profesor
-        sessions = db.query(GameSession).filter(
+    # Intentos del estudiante en sesiones de los paralelos (todo se agrega en SQL)
+    def attempts_query(*columns):
+        return db.query(*columns).join(
+            GameSession, GameSession.id == ExerciseAttempt.game_session_id
+        ).filter(
+            ExerciseAttempt.student_id == student_id,
             GameSession.student_id == student_id,
             GameSession.paralelo_id.in_(paralelo_ids)
-        ).all()
-        session_ids = [s.id for s in sessions]
-
-        if session_ids:
-            attempts_query = db.query(ExerciseAttempt).filter(
-                ExerciseAttempt.student_id == student_id,
-                ExerciseAttempt.game_session_id.in_(session_ids)
-            )
-        else:
-            attempts_query = db.query(ExerciseAttempt).filter(False)
-
-    all_attempts = attempts_query.order_by(desc(ExerciseAttempt.attempted_at)).all()
+        )
 
     # Estadísticas generales
-    total_attempts = len(all_attempts)
-    correct_attempts = sum(1 for a in all_attempts if a.is_correct)
+    total_attempts, correct_attempts, avg_time, total_points = attempts_query(
+        func.count(ExerciseAttempt.id),
+        func.count(ExerciseAttempt.id).filter(ExerciseAttempt.is_correct == True),
+        func.avg(ExerciseAttempt.time_taken).filter(ExerciseAttempt.time_taken > 0),
+        func.coalesce(func.sum(ExerciseAttempt.points_earned), 0)
+    ).one()
+
     incorrect_attempts = total_attempts - correct_attempts
     accuracy = (correct_attempts / total_attempts * 100) if total_attempts > 0 else 0
+    avg_time = float(avg_time or 0)
+
+    # Análisis por hora del día: horas más activas
+    hour = func.extract("hour", ExerciseAttempt.attempted_at)
+    peak_hours = [
+        {"hour": int(attempt_hour), "attempts": count}
+        for attempt_hour, count in attempts_query(hour, func.count(ExerciseAttempt.id))
+        .group_by(hour)
+        .order_by(func.count(ExerciseAttempt.id).desc())
+        .limit(3)
+        .all()
+    ]
 
-    # Tiempo promedio
-    attempts_with_time = [a for a in all_attempts if a.time_taken]
-    avg_time = sum(a.time_taken for a in attempts_with_time) / len(attempts_with_time) if attempts_with_time else 0
-
-    # Puntos totales
-    total_points = sum(a.points_earned for a in all_attempts)
-
-    # Análisis por hora del día
-    hour_distribution = {}
-    for attempt in all_attempts:
-        hour = attempt.attempted_at.hour
-        if hour not in hour_distribution:
-            hour_distribution[hour] = 0
-        hour_distribution[hour] += 1
-
-    # Encontrar horas más activas
-    if hour_distribution:
-        most_active_hours = sorted(hour_distribution.items(), key=lambda x: x[1], reverse=True)[:3]
-        peak_hours = [{"hour": h, "attempts": c} for h, c in most_active_hours]
-    else:
-        peak_hours = []
-
-    # Últimos 10 intentos con detalles
-    recent_attempts = []
-    for attempt in all_attempts[:10]:
-        exercise = attempt.exercise
-        recent_attempts.append({
-            "id": str(attempt.id),
-            "exerciseTitle": exercise.title,
-            "question": exercise.question,
-            "studentAnswer": attempt.student_answer,
-            "correctAnswer": exercise.correct_answer,
-            "isCorrect": attempt.is_correct,
-            "timeTaken": attempt.time_taken,
-            "pointsEarned": attempt.points_earned,
-            "attemptedAt": attempt.attempted_at.isoformat(),
-            "difficulty": exercise.difficulty.value
-        })
+    # Últimos 10 intentos con detalles (los intentos en modo sin estado no tienen fila en exercises)
+    recent_rows = attempts_query(
+        ExerciseAttempt.id,
+        ExerciseAttempt.student_answer,
+        ExerciseAttempt.is_correct,
+        ExerciseAttempt.time_taken,
+        ExerciseAttempt.points_earned,
+        ExerciseAttempt.attempted_at,
+        ExerciseAttempt.topic,
+        func.coalesce(Exercise.question, ExerciseAttempt.question).label("question"),
+        func.coalesce(Exercise.correct_answer, ExerciseAttempt.correct_answer).label("correct_answer"),
+        func.coalesce(Exercise.difficulty, ExerciseAttempt.difficulty).label("difficulty"),
+        Exercise.title
+    ).outerjoin(
+        Exercise, Exercise.id == ExerciseAttempt.exercise_id
+    ).order_by(desc(ExerciseAttempt.attempted_at)).limit(10).all()
+
+    recent_attempts = [
+        {
+            "id": str(row.id),
+            "exerciseTitle": row.title or (AIRecommendations._get_topic_name(row.topic) if row.topic else ""),
+            "question": row.question,
+            "studentAnswer": row.student_answer,
+            "correctAnswer": row.correct_answer,
+            "isCorrect": row.is_correct,
+            "timeTaken": row.time_taken,
+            "pointsEarned": row.points_earned,
+            "attemptedAt": row.attempted_at.isoformat(),
+            "difficulty": row.difficulty.value if row.difficulty else None
+        }
+        for row in recent_rows
+    ]
 
     # Progreso en los últimos 7 días
     seven_days_ago = datetime.now(timezone.utc) - timedelta(days=7)
-    recent_attempts_by_day = {}
-
-    for attempt in all_attempts:
-        # Convertir a timezone-aware si es necesario
-        attempt_time = attempt.attempted_at
-        if attempt_time.tzinfo is None:
-            attempt_time = attempt_time.replace(tzinfo=timezone.utc)
-        if attempt_time >= seven_days_ago:
-            day = attempt.attempted_at.date().isoformat()
-            if day not in recent_attempts_by_day:
-                recent_attempts_by_day[day] = {"total": 0, "correct": 0}
-            recent_attempts_by_day[day]["total"] += 1
-            if attempt.is_correct:
-                recent_attempts_by_day[day]["correct"] += 1
+    day = func.date_trunc("day", ExerciseAttempt.attempted_at)
 
     progress_chart = [
         {
-            "date": day,
-            "total": data["total"],
-            "correct": data["correct"],
-            "accuracy": round((data["correct"] / data["total"] * 100) if data["total"] > 0 else 0, 1)
+            "date": attempt_day.date().isoformat(),
+            "total": total,
+            "correct": correct,
+            "accuracy": round((correct / total * 100) if total > 0 else 0, 1)
         }
-        for day, data in sorted(recent_attempts_by_day.items())
+        for attempt_day, total, correct in attempts_query(
+            day,
+            func.count(ExerciseAttempt.id),
+            func.count(ExerciseAttempt.id).filter(ExerciseAttempt.is_correct == True)
+        ).filter(
+            ExerciseAttempt.attempted_at >= seven_days_ago
+        ).group_by(day).order_by(day).all()
     ]
 
     # Recomendaciones basadas en el rendimiento
@@ -463,23 +462,31 @@ async def get_goals(
         elif status == "expired":
             query = query.filter(Goal.end_date < now)
 
-    goals = query.order_by(desc(Goal.created_at)).all()
+    # Asignados, completados y progreso promedio (tope 100%) por meta en un solo GROUP BY
+    progress = func.least(StudentGoal.current_value * 100.0 / func.nullif(Goal.target_value, 0), 100)
+    goal_stats = db.query(
+        StudentGoal.goal_id,
+        func.count(StudentGoal.id).label("total_assigned"),
+        func.count(StudentGoal.id).filter(StudentGoal.status == GoalStatus.completed).label("completed_count"),
+        func.avg(progress).label("avg_progress")
+    ).join(
+        Goal, Goal.id == StudentGoal.goal_id
+    ).filter(
+        Goal.teacher_id == current_user.id
+    ).group_by(StudentGoal.goal_id).subquery()
+
+    rows = query.outerjoin(
+        goal_stats, goal_stats.c.goal_id == Goal.id
+    ).add_columns(
+        func.coalesce(goal_stats.c.total_assigned, 0),
+        func.coalesce(goal_stats.c.completed_count, 0),
+        func.coalesce(goal_stats.c.avg_progress, 0)
+    ).options(
+        joinedload(Goal.paralelo)
+    ).order_by(desc(Goal.created_at)).all()
 
     goals_data = []
-    for goal in goals:
-        # Contar estudiantes asignados y completados
-        student_goals = db.query(StudentGoal).filter(StudentGoal.goal_id == goal.id).all()
-        total_assigned = len(student_goals)
-        completed_count = sum(1 for sg in student_goals if sg.status == GoalStatus.completed)
-
-        # Calcular progreso promedio
-        if student_goals:
-            avg_progress = sum(
-                min((sg.current_value / goal.target_value) * 100, 100) for sg in student_goals
-            ) / len(student_goals)
-        else:
-            avg_progress = 0
-
+    for goal, total_assigned, completed_count, avg_progress in rows:
         # Determinar estado visual
         now = datetime.now()
         if goal.end_date.replace(tzinfo=None) < now:
@@ -505,7 +512,7 @@ async def get_goals(
             "status": visual_status,
             "totalAssigned": total_assigned,
             "completedCount": completed_count,
-            "avgProgress": round(avg_progress, 1),
+            "avgProgress": round(float(avg_progress), 1),
             "createdAt": goal.created_at.isoformat()
         })
 
@@ -548,39 +555,14 @@ async def create_goal(
     db.add(new_goal)
     db.flush()
 
-    # Asignar a todos los estudiantes del paralelo o de todos los paralelos del profesor
-    if goal_data.paralelo_id:
-        enrollments = db.query(Enrollment).filter(
-            Enrollment.paralelo_id == goal_data.paralelo_id,
-            Enrollment.is_active == True
-        ).all()
-    else:
-        # Obtener todos los paralelos del profesor
-        teacher_paralelos = db.query(Paralelo.id).filter(
-            Paralelo.teacher_id == current_user.id
-        ).all()
-        paralelo_ids = [p[0] for p in teacher_paralelos]
-        enrollments = db.query(Enrollment).filter(
-            Enrollment.paralelo_id.in_(paralelo_ids),
-            Enrollment.is_active == True
-        ).all()
-
-    # Crear asignaciones para cada estudiante
-    student_ids_added = set()
-    for enrollment in enrollments:
-        if enrollment.student_id not in student_ids_added:
-            student_goal = StudentGoal(
-                goal_id=new_goal.id,
-                student_id=enrollment.student_id
-            )
-            db.add(student_goal)
-            student_ids_added.add(enrollment.student_id)
+    # Asignar en bloque a los estudiantes del paralelo o de todos los paralelos del profesor
+    assigned_count = goal_assignment.assign_goal(db, new_goal)
 
     db.commit()
 
     return APIResponse(
         success=True,
-        message=f"Meta creada y asignada a {len(student_ids_added)} estudiantes",
+        message=f"Meta creada y asignada a {assigned_count} estudiantes",
         data={"id": str(new_goal.id)}
     )
 
@@ -635,19 +617,30 @@ async def delete_goal(
     if not goal:
         raise HTTPException(status_code=404, detail="Meta no encontrada")
 
+    # Quitar de la tabla de posiciones el bonus ya otorgado por esta meta
+    removed_bonuses = leaderboard.remove_goal_bonus(db, goal.id)
+
     db.delete(goal)
     db.commit()
 
+    for student_id, points in removed_bonuses.items():
+        rank_index.apply_delta(student_id, -points)
+
     return APIResponse(success=True, message="Meta eliminada correctamente")
 
 
 @router.get("/goals/{goal_id}/students", response_model=APIResponse)
 async def get_goal_students(
     goal_id: UUID,
+    limit: int = 50,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_teacher)
 ):
-    """Obtener el progreso de estudiantes en una meta"""
+    """
+    Obtener el progreso de estudiantes en una meta, paginado por keyset
+    (orden: progreso descendente; cursor = "valor_actual:id" del último elemento).
+    """
     goal = db.query(Goal).filter(
         Goal.id == goal_id,
         Goal.teacher_id == current_user.id
@@ -656,12 +649,36 @@ async def get_goal_students(
     if not goal:
         raise HTTPException(status_code=404, detail="Meta no encontrada")
 
-    student_goals = db.query(StudentGoal).filter(StudentGoal.goal_id == goal_id).all()
+    limit = max(1, min(limit, 200))
+
+    query = db.query(StudentGoal, User).join(
+        User, User.id == StudentGoal.student_id
+    ).filter(StudentGoal.goal_id == goal_id)
+
+    if cursor:
+        try:
+            value, last_id = cursor.split(":", 1)
+            value, last_id = int(value), UUID(last_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+        query = query.filter(or_(
+            StudentGoal.current_value < value,
+            and_(StudentGoal.current_value == value, StudentGoal.id > last_id)
+        ))
+
+    rows = query.order_by(
+        StudentGoal.current_value.desc(), StudentGoal.id
+    ).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1][0]
+        next_cursor = f"{last.current_value}:{last.id}"
 
     students_data = []
-    for sg in student_goals:
-        student = sg.student
-        progress = min((sg.current_value / goal.target_value) * 100, 100)
+    for sg, student in rows:
+        progress = min((sg.current_value / goal.target_value) * 100, 100) if goal.target_value > 0 else 0
 
         students_data.append({
             "id": str(sg.id),
@@ -685,7 +702,8 @@ async def get_goal_students(
             "targetValue": goal.target_value,
             "rewardPoints": goal.reward_points
         },
-        "students": students_data
+        "students": students_data,
+        "nextCursor": next_cursor
     })
 
 
@@ -940,8 +958,11 @@ async def start_challenge(
     if paralelo1_count == 0 or paralelo2_count == 0:
         raise HTTPException(status_code=400, detail="Ambos paralelos deben tener al menos un participante")
 
+    # Conjunto fijo de ejercicios, igual para todos los participantes
+    challenge_exercises.generate_set(db, challenge)
+
     challenge.status = ChallengeStatus.active
-    challenge.start_time = datetime.now()
+    challenge.start_time = datetime.now(timezone.utc)
     db.commit()
 
     return APIResponse(success=True, message="Competencia iniciada")
@@ -962,30 +983,8 @@ async def end_challenge(
     if not challenge:
         raise HTTPException(status_code=404, detail="Competencia no encontrada")
 
-    challenge.status = ChallengeStatus.completed
-    challenge.end_time = datetime.now()
-
-    # Calcular puntuaciones totales por paralelo
-    paralelo1_score = db.query(func.sum(ChallengeParticipant.score)).filter(
-        ChallengeParticipant.challenge_id == challenge_id,
-        ChallengeParticipant.paralelo_id == challenge.paralelo1_id
-    ).scalar() or 0
-
-    paralelo2_score = db.query(func.sum(ChallengeParticipant.score)).filter(
-        ChallengeParticipant.challenge_id == challenge_id,
-        ChallengeParticipant.paralelo_id == challenge.paralelo2_id
-    ).scalar() or 0
-
-    challenge.paralelo1_score = paralelo1_score
-    challenge.paralelo2_score = paralelo2_score
-
-    # Determinar paralelo ganador
-    if paralelo1_score > paralelo2_score:
-        challenge.winner_paralelo_id = challenge.paralelo1_id
-    elif paralelo2_score > paralelo1_score:
-        challenge.winner_paralelo_id = challenge.paralelo2_id
-    # Si es empate, no hay ganador (winner_paralelo_id queda null)
-
+    # Puntuaciones totales por paralelo y ganador
+    challenge_scoreboard.finalize_challenge(db, challenge)
     db.commit()
 
     winner_name = challenge.winner_paralelo.name if challenge.winner_paralelo else "Empate"
@@ -993,8 +992,8 @@ async def end_challenge(
         success=True,
         message=f"Competencia finalizada. Ganador: {winner_name}",
         data={
-            "paralelo1Score": paralelo1_score,
-            "paralelo2Score": paralelo2_score,
+            "paralelo1Score": challenge.paralelo1_score,
+            "paralelo2Score": challenge.paralelo2_score,
             "winnerParaleloId": str(challenge.winner_paralelo_id) if challenge.winner_paralelo_id else None
         }
     )
@@ -1026,70 +1025,71 @@ async def get_teacher_ranking(
 
     paralelo_ids = [p.id for p in paralelos]
 
-    # Obtener estudiantes inscritos
-    enrollments = db.query(Enrollment).filter(
+    # Obtener estudiantes inscritos con el nombre de su paralelo (una consulta)
+    student_rows = db.query(User, Paralelo.name).join(
+        Enrollment, Enrollment.student_id == User.id
+    ).join(
+        Paralelo, Paralelo.id == Enrollment.paralelo_id
+    ).filter(
         Enrollment.paralelo_id.in_(paralelo_ids),
         Enrollment.is_active == True
     ).all()
 
-    student_ids = list(set([e.student_id for e in enrollments]))
+    students = {}
+    for student, paralelo_name in student_rows:
+        students.setdefault(student.id, (student, paralelo_name))
 
-    # Filtro de tiempo
+    student_ids = list(students.keys())
+
+    # Filtro de tiempo (por día, sobre el rollup diario): los últimos 7 o 30 días contando hoy
+    today = datetime.now(timezone.utc).date()
     if period == "week":
-        time_filter = datetime.now() - timedelta(days=7)
+        since = today - timedelta(days=7)
     elif period == "month":
-        time_filter = datetime.now() - timedelta(days=30)
+        since = today - timedelta(days=30)
     else:
-        time_filter = None
-
-    ranking_data = []
-    for student_id in student_ids:
-        student = db.query(User).filter(User.id == student_id).first()
-        if not student:
-            continue
+        since = None
 
-        # Obtener sesiones de juego
-        sessions_query = db.query(GameSession).filter(
-            GameSession.student_id == student_id,
-            GameSession.paralelo_id.in_(paralelo_ids)
-        )
-
-        if time_filter:
-            sessions_query = sessions_query.filter(GameSession.started_at >= time_filter)
-
-        sessions = sessions_query.all()
+    activity_filters = [
+        StudentDailyActivity.student_id.in_(student_ids),
+        StudentDailyActivity.paralelo_id.in_(paralelo_ids)
+    ]
+    if since:
+        activity_filters.append(StudentDailyActivity.day > since)
+
+    # Totales del periodo: SUM/GROUP BY sobre el rollup
+    totals = {
+        row.student_id: row
+        for row in db.query(
+            StudentDailyActivity.student_id,
+            func.sum(StudentDailyActivity.sessions_count).label("sessions"),
+            func.sum(StudentDailyActivity.score).label("score"),
+            func.sum(StudentDailyActivity.exercises_completed).label("exercises"),
+            func.sum(StudentDailyActivity.correct_answers).label("correct"),
+            func.sum(StudentDailyActivity.wrong_answers).label("wrong")
+        ).filter(*activity_filters).group_by(StudentDailyActivity.student_id).all()
+    } if student_ids else {}
+
+    # Días con actividad para calcular la racha (días consecutivos)
+    active_days = {}
+    if student_ids:
+        for activity_student_id, day in db.query(
+            StudentDailyActivity.student_id,
+            StudentDailyActivity.day
+        ).filter(*activity_filters).distinct().all():
+            active_days.setdefault(activity_student_id, []).append(day)
+
+    streaks = daily_activity.day_streaks(active_days, today)
 
-        total_score = sum(s.total_score for s in sessions)
-        total_exercises = sum(s.exercises_completed for s in sessions)
-        total_correct = sum(s.correct_answers for s in sessions)
-        total_wrong = sum(s.wrong_answers for s in sessions)
+    ranking_data = []
+    for student_id, (student, paralelo_name) in students.items():
+        row = totals.get(student_id)
+        total_score = int(row.score or 0) if row else 0
+        total_exercises = int(row.exercises or 0) if row else 0
+        total_correct = int(row.correct or 0) if row else 0
+        total_wrong = int(row.wrong or 0) if row else 0
         accuracy = (total_correct / (total_correct + total_wrong) * 100) if (total_correct + total_wrong) > 0 else 0
 
-        # Obtener paralelo del estudiante
-        student_enrollment = db.query(Enrollment).filter(
-            Enrollment.student_id == student_id,
-            Enrollment.paralelo_id.in_(paralelo_ids),
-            Enrollment.is_active == True
-        ).first()
-
-        paralelo_name = ""
-        if student_enrollment:
-            paralelo = db.query(Paralelo).filter(Paralelo.id == student_enrollment.paralelo_id).first()
-            paralelo_name = paralelo.name if paralelo else ""
-
-        # Calcular racha (días consecutivos)
-        streak = 0
-        if sessions:
-            sorted_sessions = sorted(sessions, key=lambda x: x.started_at, reverse=True)
-            current_date = datetime.now().date()
-            for session in sorted_sessions:
-                session_date = session.started_at.date()
-                if session_date == current_date or session_date == current_date - timedelta(days=1):
-                    streak += 1
-                    current_date = session_date
-                else:
-                    break
-
         ranking_data.append({
             "studentId": str(student.id),
             "firstName": student.first_name,
@@ -1101,8 +1101,8 @@ async def get_teacher_ranking(
             "correctAnswers": total_correct,
             "wrongAnswers": total_wrong,
             "accuracy": round(accuracy, 1),
-            "streak": streak,
-            "sessionsCount": len(sessions)
+            "streak": streaks.get(student_id, 0),
+            "sessionsCount": int(row.sessions or 0) if row else 0
         })
 
     # Ordenar por puntaje total
@@ -1347,116 +1347,10 @@ async def get_paralelo_performance(
     if not paralelo:
         raise HTTPException(status_code=404, detail="Paralelo no encontrado")
 
-    # Obtener estudiantes
-    enrollments = db.query(Enrollment).filter(
-        Enrollment.paralelo_id == paralelo_id,
-        Enrollment.is_active == True
-    ).all()
-
-    student_ids = [e.student_id for e in enrollments]
+    # Servido desde el snapshot precalculado (solo lectura; isStale si superó el TTL)
+    data = performance_snapshots.get_performance(db, paralelo_id, period)
 
-    # Filtro de tiempo
-    if period == "week":
-        time_filter = datetime.now() - timedelta(days=7)
-    elif period == "month":
-        time_filter = datetime.now() - timedelta(days=30)
-    else:
-        time_filter = None
-
-    # Estadisticas generales
-    sessions_query = db.query(GameSession).filter(
-        GameSession.student_id.in_(student_ids),
-        GameSession.paralelo_id == paralelo_id
-    )
-    if time_filter:
-        sessions_query = sessions_query.filter(GameSession.started_at >= time_filter)
-
-    sessions = sessions_query.all()
-
-    total_exercises = sum(s.exercises_completed for s in sessions)
-    total_correct = sum(s.correct_answers for s in sessions)
-    total_wrong = sum(s.wrong_answers for s in sessions)
-    average_accuracy = (total_correct / (total_correct + total_wrong) * 100) if (total_correct + total_wrong) > 0 else 0
-    average_score = sum(s.total_score for s in sessions) / len(student_ids) if student_ids else 0
-
-    # Estudiantes activos (con sesiones en el periodo)
-    active_student_ids = set(s.student_id for s in sessions)
-
-    # Desempeno por tema
-    topic_stats = {}
-    attempts_query = db.query(ExerciseAttempt).filter(
-        ExerciseAttempt.student_id.in_(student_ids)
-    )
-    if time_filter:
-        attempts_query = attempts_query.filter(ExerciseAttempt.attempted_at >= time_filter)
-
-    attempts = attempts_query.all()
-    for attempt in attempts:
-        exercise = db.query(Exercise).filter(Exercise.id == attempt.exercise_id).first()
-        if exercise and exercise.topic:
-            topic = exercise.topic.value
-            if topic not in topic_stats:
-                topic_stats[topic] = {"correct": 0, "total": 0}
-            topic_stats[topic]["total"] += 1
-            if attempt.is_correct:
-                topic_stats[topic]["correct"] += 1
-
-    topic_performance = []
-    for topic, stats in topic_stats.items():
-        accuracy = (stats["correct"] / stats["total"] * 100) if stats["total"] > 0 else 0
-        topic_performance.append({
-            "topic": topic,
-            "accuracy": round(accuracy, 1),
-            "attempts": stats["total"]
-        })
-    topic_performance.sort(key=lambda x: x["attempts"], reverse=True)
-
-    # Top estudiantes
-    top_students = []
-    for student_id in student_ids:
-        student = db.query(User).filter(User.id == student_id).first()
-        student_sessions = [s for s in sessions if s.student_id == student_id]
-        total_score = sum(s.total_score for s in student_sessions)
-        correct = sum(s.correct_answers for s in student_sessions)
-        wrong = sum(s.wrong_answers for s in student_sessions)
-        accuracy = (correct / (correct + wrong) * 100) if (correct + wrong) > 0 else 0
-        top_students.append({
-            "name": f"{student.first_name} {student.last_name}",
-            "score": total_score,
-            "accuracy": round(accuracy, 1)
-        })
-    top_students.sort(key=lambda x: x["score"], reverse=True)
-
-    # Estudiantes que necesitan ayuda (accuracy < 60%)
-    needs_help = [s for s in top_students if s["accuracy"] < 60]
-
-    # Actividad semanal
-    weekly_progress = []
-    days = ["Lun", "Mar", "Mie", "Jue", "Vie", "Sab", "Dom"]
-    today = datetime.now()
-    for i in range(7):
-        day = today - timedelta(days=6-i)
-        day_sessions = [s for s in sessions if s.started_at.date() == day.date()]
-        exercises = sum(s.exercises_completed for s in day_sessions)
-        weekly_progress.append({
-            "day": days[day.weekday()],
-            "exercises": exercises
-        })
-
-    return APIResponse(success=True, data={
-        "general": {
-            "totalStudents": len(student_ids),
-            "activeStudents": len(active_student_ids),
-            "totalExercises": total_exercises,
-            "averageAccuracy": round(average_accuracy, 1),
-            "averageScore": round(average_score, 1),
-            "trend": "up" if average_accuracy > 50 else "down"
-        },
-        "topicPerformance": topic_performance[:5],
-        "topStudents": top_students[:3],
-        "needsHelp": needs_help[:3],
-        "weeklyProgress": weekly_progress
-    })
+    return APIResponse(success=True, data=data)
 
 
 # ============= REPORTES PDF =============
@@ -146,7 +146,8 @@ class SettingBulkUpdate(BaseModel):
 # ============= Student Game Schemas =============
 class SubmitAnswerRequest(BaseModel):
     session_id: UUID
-    exercise_id: UUID
+    exercise_id: Optional[UUID] = None
+    exercise_token: Optional[str] = None  # Modo sin estado (STATELESS_EXERCISES)
     answer: str
     time_taken: int
 
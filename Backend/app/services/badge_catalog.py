@@ -0,0 +1,92 @@
+"""
+Catálogo en memoria de las insignias activas.
+La versión del catálogo se guarda en la tabla settings y la incrementan las escrituras del
+administrador; cada proceso la consulta como máximo cada VERSION_CHECK_SECONDS y solo recarga
+las insignias cuando cambió.
+"""
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import cast, Integer, Text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.models import Badge, Setting, SettingType
+
+VERSION_KEY = "badges_catalog_version"
+VERSION_CHECK_SECONDS = 30
+
+
+def serialize_badge(badge: Badge) -> Dict:
+    """Formato de una insignia en las respuestas de la API"""
+    return {
+        "id": str(badge.id),
+        "name": badge.name,
+        "description": badge.description,
+        "icon": badge.icon,
+        "category": badge.category.value if badge.category else "general",
+        "rarity": "common",  # Por defecto
+        "requirement": badge.requirement,
+        "requirementValue": badge.requirement_value,
+        "points": badge.points
+    }
+
+
+class BadgeCatalog:
+    """Insignias activas serializadas, compartidas por el proceso y validadas por versión"""
+
+    def __init__(self):
+        self._version: Optional[int] = None
+        self._badges: Optional[List[Dict]] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self, db: Session) -> Tuple[int, List[Dict]]:
+        """Versión y lista de insignias activas (sin consultas mientras la versión esté verificada)"""
+        # Las consultas se hacen fuera del lock: con AsyncSession.run_sync cada consulta
+        # cede el event loop y otra petición podría bloquearlo esperando el lock
+        with self._lock:
+            version, badges, checked_at = self._version, self._badges, self._checked_at
+        if badges is not None and time.monotonic() - checked_at < VERSION_CHECK_SECONDS:
+            return version, badges
+
+        current_version = self._read_version(db)
+        if badges is None or current_version != version:
+            badges = [
+                serialize_badge(badge)
+                for badge in db.query(Badge).filter(Badge.is_active == True).all()
+            ]
+
+        with self._lock:
+            self._version, self._badges = current_version, badges
+            self._checked_at = time.monotonic()
+        return current_version, badges
+
+    def bump_version(self, db: Session) -> None:
+        """Incrementar la versión tras una escritura de insignias (se confirma con el llamador)"""
+        stmt = insert(Setting).values(
+            id=uuid.uuid4(),
+            key=VERSION_KEY,
+            value="1",
+            type=SettingType.number,
+            category="system",
+            description="Versión del catálogo de insignias (se incrementa al modificarlas)"
+        )
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[Setting.key],
+            set_={"value": cast(cast(Setting.value, Integer) + 1, Text)}
+        ))
+
+    def invalidate(self) -> None:
+        """Forzar que este proceso vuelva a leer la versión (llamar después del commit)"""
+        with self._lock:
+            self._checked_at = 0.0
+
+    @staticmethod
+    def _read_version(db: Session) -> int:
+        value = db.query(Setting.value).filter(Setting.key == VERSION_KEY).scalar()
+        return int(value) if value else 0
+
+
+# Instancia del proceso
+badge_catalog = BadgeCatalog()
@@ -0,0 +1,135 @@
+"""
+Motor de reglas de insignias.
+Las insignias activas se indexan por tipo de requisito y se evalúan contra los contadores
+de student_stats cuando ocurre un evento (intento o inicio de sesión); solo se revisan
+las reglas afectadas por ese evento.
+"""
+import threading
+import uuid
+from typing import Dict, List, Optional
+from uuid import UUID
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.models import StudentBadge, StudentStats
+from app.services.badge_catalog import badge_catalog
+
+ATTEMPT = "attempt"
+SESSION = "session"
+
+# requisito -> (contador de StudentStats que se compara, evento que lo modifica)
+RULES = {
+    "first_exercise": ("total_attempts", ATTEMPT),
+    "exercises_count": ("total_attempts", ATTEMPT),
+    "correct_count": ("correct_attempts", ATTEMPT),
+    "correct_streak": ("best_streak", ATTEMPT),
+    "total_score": ("total_score", ATTEMPT),
+    "sessions_count": ("total_sessions", SESSION),
+}
+
+class BadgeRuleIndex:
+    """Insignias activas agrupadas por evento; se reconstruye cuando cambia la versión del catálogo"""
+
+    def __init__(self):
+        self._by_event: Dict[str, List[Dict]] = {}
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def rules_for(self, db: Session, event: str) -> List[Dict]:
+        # El catálogo consulta la base fuera de cualquier lock; aquí el lock solo
+        # protege el intercambio del índice ya construido
+        version, badges = badge_catalog.current(db)
+        with self._lock:
+            if version == self._version:
+                return self._by_event.get(event, [])
+
+        by_event = self._build(badges)
+        with self._lock:
+            self._by_event, self._version = by_event, version
+        return by_event.get(event, [])
+
+    @staticmethod
+    def _build(badges: List[Dict]) -> Dict[str, List[Dict]]:
+        by_event: Dict[str, List[Dict]] = {}
+        for badge in badges:
+            if badge["requirement"] not in RULES:
+                continue
+            counter, event = RULES[badge["requirement"]]
+            by_event.setdefault(event, []).append({
+                "id": UUID(badge["id"]),
+                "counter": counter,
+                # "first_exercise" se cumple con el primer intento aunque no tenga valor
+                "threshold": max(badge["requirementValue"] or 0, 1),
+                "data": {
+                    "id": badge["id"],
+                    "name": badge["name"],
+                    "description": badge["description"],
+                    "icon": badge["icon"],
+                    "rarity": "common"
+                }
+            })
+        return by_event
+
+
+rule_index = BadgeRuleIndex()
+
+
+def on_attempt(db: Session, student_id: UUID, stats: StudentStats, is_correct: bool, score_delta: int = 0) -> List[Dict]:
+    """Evaluar las reglas de intentos tras record_attempt; no hace commit"""
+    # Valores antes del intento (los contadores solo crecen por este evento)
+    previous = {
+        "total_attempts": stats.total_attempts - 1,
+        "correct_attempts": stats.correct_attempts - (1 if is_correct else 0),
+        "total_score": stats.total_score - score_delta,
+        # La mejor racha solo sube si la racha actual acaba de alcanzarla
+        "best_streak": stats.best_streak - (1 if is_correct and stats.current_streak == stats.best_streak else 0),
+    }
+    return _award_crossed(db, student_id, stats, previous, rule_index.rules_for(db, ATTEMPT))
+
+
+def on_session_start(db: Session, student_id: UUID, stats: StudentStats) -> List[Dict]:
+    """Evaluar las reglas de sesiones tras record_session_start; no hace commit"""
+    previous = {"total_sessions": stats.total_sessions - 1}
+    return _award_crossed(db, student_id, stats, previous, rule_index.rules_for(db, SESSION))
+
+
+def check_all(db: Session, student_id: UUID, stats: StudentStats) -> List[Dict]:
+    """
+    Evaluar todas las reglas contra los contadores actuales (recupera insignias
+    creadas después de que el estudiante ya cumplía el requisito). No hace commit.
+    """
+    earned = {
+        row[0] for row in db.query(StudentBadge.badge_id).filter(StudentBadge.student_id == student_id).all()
+    }
+    candidates = [
+        rule
+        for event in (ATTEMPT, SESSION)
+        for rule in rule_index.rules_for(db, event)
+        if rule["id"] not in earned and getattr(stats, rule["counter"]) >= rule["threshold"]
+    ]
+    return _award(db, student_id, candidates)
+
+
+def _award_crossed(db: Session, student_id: UUID, stats: StudentStats, previous: Dict[str, int], rules: List[Dict]) -> List[Dict]:
+    """Otorgar solo las reglas cuyo umbral se cruzó con este evento (sin consultas si no hay ninguna)"""
+    crossed = [
+        rule for rule in rules
+        if previous[rule["counter"]] < rule["threshold"] <= getattr(stats, rule["counter"])
+    ]
+    return _award(db, student_id, crossed)
+
+
+def _award(db: Session, student_id: UUID, rules: List[Dict]) -> List[Dict]:
+    if not rules:
+        return []
+
+    # ON CONFLICT DO NOTHING: RETURNING solo trae las insignias realmente nuevas
+    awarded = set(db.execute(
+        insert(StudentBadge).values([
+            {"id": uuid.uuid4(), "badge_id": rule["id"], "student_id": student_id, "is_equipped": False}
+            for rule in rules
+        ]).on_conflict_do_nothing(
+            index_elements=[StudentBadge.badge_id, StudentBadge.student_id]
+        ).returning(StudentBadge.badge_id)
+    ).scalars().all())
+
+    return [rule["data"] for rule in rules if rule["id"] in awarded]
@@ -0,0 +1,83 @@
+"""Cachés en memoria por proceso (LRU acotado): por versión y por tiempo de vida"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable, Optional
+
+
+class VersionedCache:
+    """
+    Guarda un valor junto con la versión de los datos con que se calculó.
+    Una lectura con otra versión se considera un fallo y el llamador recalcula.
+    """
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: Any) -> Optional[Any]:
+        """Obtener el valor si fue calculado con la misma versión"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: Hashable, version: Any, value: Any):
+        """Guardar un valor calculado con la versión indicada"""
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        """Eliminar una entrada"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class TTLCache:
+    """
+    Guarda un valor durante ttl_seconds junto con las etiquetas de los datos que usa
+    (por ejemplo, los estudiantes del paralelo) para invalidarlo por etiqueta.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int = 1000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Obtener el valor si no ha vencido"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] >= self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[2]
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[Hashable] = ()):
+        """Guardar un valor con las etiquetas que lo invalidan"""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), frozenset(tags), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        """Eliminar una entrada"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_tag(self, tag: Hashable):
+        """Eliminar todas las entradas que dependen de la etiqueta"""
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if tag in entry[1]]:
+                del self._entries[key]
@@ -0,0 +1,113 @@
+"""
+Conjunto fijo de ejercicios por versus: se genera una sola vez al iniciar la competencia
+(inserción masiva) y todos los participantes reciben las mismas preguntas por índice.
+Los versus iniciados antes de existir los conjuntos los reciben en upgrade_schema.py.
+"""
+import random
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Optional
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.models import Exercise, ExerciseType, Challenge, ChallengeStatus, MathTopic, ExerciseDifficulty
+from app.exercise_generator import ExerciseGenerator
+from app.services.cache import VersionedCache
+
+# Ejercicios de cada versus en orden; el conjunto no cambia una vez generado
+exercise_set_cache = VersionedCache(max_entries=500)
+
+
+def generate_set(db: Session, challenge: Challenge) -> None:
+    """
+    Generar e insertar en bloque los num_exercises ejercicios del versus (sin commit).
+    Con tema mixto cada posición recibe un tema al azar; la dificultad es la del versus,
+    sin ajuste por puntaje, para que sea la misma para todos.
+    """
+    difficulty = challenge.difficulty or ExerciseDifficulty.medium
+    if challenge.topic:
+        topics = [challenge.topic] * challenge.num_exercises
+    else:
+        topics = [random.choice(list(MathTopic)) for _ in range(challenge.num_exercises)]
+
+    # Una llamada a generate_batch por tema
+    positions = defaultdict(list)
+    for sequence, topic in enumerate(topics):
+        positions[topic].append(sequence)
+
+    rows = []
+    for topic, sequences in positions.items():
+        generated = ExerciseGenerator.generate_batch(topic, difficulty, len(sequences))
+        for sequence, exercise_data in zip(sequences, generated):
+            rows.append({
+                "id": uuid.uuid4(),
+                "challenge_id": challenge.id,
+                "sequence": sequence,
+                "title": exercise_data["title"],
+                "question": exercise_data["question"],
+                "exercise_type": ExerciseType.multiple_choice,
+                "difficulty": difficulty,
+                "topic": topic,
+                "correct_answer": exercise_data["correct_answer"],
+                "options": exercise_data["options"],
+                "points": ExerciseGenerator.BASE_POINTS.get(difficulty, 10),
+                "is_practice": False,
+                "is_active": True
+            })
+
+    # Si otra petición ya generó el conjunto, se conserva el existente
+    db.execute(
+        insert(Exercise).on_conflict_do_nothing(index_elements=[Exercise.challenge_id, Exercise.sequence]),
+        rows
+    )
+
+
+def get_exercise(db: Session, challenge: Challenge, index: int) -> Optional[Dict]:
+    """Ejercicio en la posición indicada, leído de la caché del conjunto (nunca escribe)"""
+    exercises = exercise_set_cache.get(challenge.id, challenge.num_exercises)
+    if exercises is None:
+        exercises = _load_set(db, challenge)
+        # Un conjunto incompleto (versus iniciado antes de los conjuntos fijos y sin correr
+        # upgrade_schema.py) no se guarda en caché, así se lee completo tras generarlo
+        if len(exercises) == challenge.num_exercises:
+            exercise_set_cache.set(challenge.id, challenge.num_exercises, exercises)
+
+    if index >= len(exercises):
+        return None
+    return exercises[index]
+
+
+def generate_missing_sets(db: Session) -> int:
+    """Generar el conjunto de los versus activos que no lo tienen completo (sin commit)"""
+    set_sizes = db.query(
+        Exercise.challenge_id, func.count(Exercise.id).label("exercises")
+    ).filter(Exercise.challenge_id != None).group_by(Exercise.challenge_id).subquery()
+
+    challenges = db.query(Challenge).outerjoin(
+        set_sizes, set_sizes.c.challenge_id == Challenge.id
+    ).filter(
+        Challenge.status == ChallengeStatus.active,
+        func.coalesce(set_sizes.c.exercises, 0) < Challenge.num_exercises
+    ).all()
+
+    for challenge in challenges:
+        generate_set(db, challenge)
+
+    return len(challenges)
+
+
+def _load_set(db: Session, challenge: Challenge) -> List[Dict]:
+    return [
+        {
+            "id": exercise.id,
+            "title": exercise.title,
+            "question": exercise.question,
+            "options": exercise.options,
+            "correct_answer": exercise.correct_answer,
+            "topic": exercise.topic,
+            "difficulty": exercise.difficulty
+        }
+        for exercise in db.query(Exercise).filter(
+            Exercise.challenge_id == challenge.id
+        ).order_by(Exercise.sequence).all()
+    ]
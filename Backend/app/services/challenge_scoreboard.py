@@ -0,0 +1,168 @@
+"""Marcador de participantes por versus, compartido entre los estudiantes que lo consultan"""
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+from sqlalchemy import func, update, case, or_, and_
+from sqlalchemy.orm import Session, joinedload
+from app.models import Challenge, ChallengeParticipant, ChallengeStatus
+from app.services.cache import VersionedCache
+
+# Marcador por versus, válido mientras no cambie Challenge.scoreboard_version
+scoreboard_cache = VersionedCache(max_entries=1000)
+
+
+def bump_version(db: Session, challenge_id: UUID) -> None:
+    """Marcar el marcador como desactualizado (se confirma junto con la transacción del llamador)"""
+    db.query(Challenge).filter(Challenge.id == challenge_id).update(
+        {Challenge.scoreboard_version: Challenge.scoreboard_version + 1},
+        synchronize_session=False
+    )
+
+
+def record_answer(
+    db: Session,
+    participant_id: UUID,
+    expected_sequence: int,
+    num_exercises: int,
+    is_correct: bool,
+    points: int,
+    time_taken: int
+) -> Optional[ChallengeParticipant]:
+    """
+    Registrar la respuesta al ejercicio expected_sequence con un UPDATE atómico condicionado
+    a que sea el siguiente de la participación. Devuelve None si ninguna fila cambió: la
+    respuesta ya estaba registrada (envío duplicado o concurrente) o el versus ya terminó.
+    """
+    finishes = ChallengeParticipant.exercises_completed + 1 >= num_exercises
+    values = {
+        "exercises_completed": ChallengeParticipant.exercises_completed + 1,
+        "time_taken": ChallengeParticipant.time_taken + time_taken,
+        "score": ChallengeParticipant.score + points,
+        "has_finished": or_(ChallengeParticipant.has_finished, finishes),
+        "finished_at": case(
+            (and_(ChallengeParticipant.finished_at == None, finishes), datetime.now(timezone.utc)),
+            else_=ChallengeParticipant.finished_at
+        ),
+    }
+    if is_correct:
+        values["correct_answers"] = ChallengeParticipant.correct_answers + 1
+    else:
+        values["wrong_answers"] = ChallengeParticipant.wrong_answers + 1
+
+    return db.execute(
+        update(ChallengeParticipant)
+        .where(
+            ChallengeParticipant.id == participant_id,
+            ChallengeParticipant.exercises_completed == expected_sequence,
+            ChallengeParticipant.exercises_completed < num_exercises
+        )
+        .values(**values)
+        .returning(ChallengeParticipant)
+        .execution_options(populate_existing=True)
+    ).scalars().first()
+
+
+def add_paralelo_points(
+    db: Session,
+    challenge: Challenge,
+    paralelo_id: Optional[UUID],
+    points: int
+) -> Tuple[int, int]:
+    """
+    Sumar puntos al paralelo con UPDATE ... SET score = score + :pts e invalidar el marcador.
+    Conviene ejecutarlo justo antes del commit para retener el bloqueo de la fila el menor tiempo.
+    Devuelve los puntajes actualizados de ambos paralelos.
+    """
+    values = {"scoreboard_version": Challenge.scoreboard_version + 1}
+    if paralelo_id and points:
+        if paralelo_id == challenge.paralelo1_id:
+            values["paralelo1_score"] = func.coalesce(Challenge.paralelo1_score, 0) + points
+        elif paralelo_id == challenge.paralelo2_id:
+            values["paralelo2_score"] = func.coalesce(Challenge.paralelo2_score, 0) + points
+
+    paralelo1_score, paralelo2_score = db.execute(
+        update(Challenge)
+        .where(Challenge.id == challenge.id)
+        .values(**values)
+        .returning(Challenge.paralelo1_score, Challenge.paralelo2_score)
+        .execution_options(synchronize_session=False)
+    ).one()
+
+    return paralelo1_score or 0, paralelo2_score or 0
+
+
+def finalize_challenge(db: Session, challenge: Challenge) -> None:
+    """
+    Cerrar un versus: puntajes finales desde las participaciones y paralelo ganador.
+    Usado por el profesor y por el planificador; no hace commit.
+    """
+    totals = dict(
+        db.query(
+            ChallengeParticipant.paralelo_id,
+            func.coalesce(func.sum(ChallengeParticipant.score), 0)
+        ).filter(
+            ChallengeParticipant.challenge_id == challenge.id
+        ).group_by(ChallengeParticipant.paralelo_id).all()
+    )
+    paralelo1_score = int(totals.get(challenge.paralelo1_id, 0))
+    paralelo2_score = int(totals.get(challenge.paralelo2_id, 0))
+
+    challenge.status = ChallengeStatus.completed
+    challenge.end_time = datetime.now(timezone.utc)
+    challenge.paralelo1_score = paralelo1_score
+    challenge.paralelo2_score = paralelo2_score
+
+    # Determinar paralelo ganador (empate: sin ganador)
+    if paralelo1_score > paralelo2_score:
+        challenge.winner_paralelo_id = challenge.paralelo1_id
+    elif paralelo2_score > paralelo1_score:
+        challenge.winner_paralelo_id = challenge.paralelo2_id
+    else:
+        challenge.winner_paralelo_id = None
+
+
+def get_scoreboards(db: Session, challenges: Iterable[Challenge]) -> Dict[UUID, Dict[str, List[Dict]]]:
+    """
+    Marcadores de varios versus: los vigentes salen de la caché y los demás
+    se cargan con una sola consulta (participantes con su estudiante).
+    """
+    scoreboards = {}
+    missing = {}
+    for challenge in challenges:
+        cached = scoreboard_cache.get(challenge.id, challenge.scoreboard_version)
+        if cached is not None:
+            scoreboards[challenge.id] = cached
+        else:
+            missing[challenge.id] = challenge
+
+    if not missing:
+        return scoreboards
+
+    participants = db.query(ChallengeParticipant).options(
+        joinedload(ChallengeParticipant.student)
+    ).filter(
+        ChallengeParticipant.challenge_id.in_(list(missing))
+    ).order_by(ChallengeParticipant.score.desc()).all()
+
+    for challenge_id, challenge in missing.items():
+        scoreboards[challenge_id] = {"paralelo1": [], "paralelo2": []}
+
+    for p in participants:
+        challenge = missing[p.challenge_id]
+        if p.paralelo_id == challenge.paralelo1_id:
+            side = "paralelo1"
+        elif p.paralelo_id == challenge.paralelo2_id:
+            side = "paralelo2"
+        else:
+            continue
+        scoreboards[p.challenge_id][side].append({
+            "studentId": p.student_id,
+            "name": f"{p.student.first_name} {p.student.last_name}",
+            "score": p.score,
+            "hasFinished": p.has_finished
+        })
+
+    for challenge_id, challenge in missing.items():
+        scoreboard_cache.set(challenge_id, challenge.scoreboard_version, scoreboards[challenge_id])
+
+    return scoreboards
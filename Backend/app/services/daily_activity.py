@@ -0,0 +1,168 @@
+"""
+Rollups diarios para rankings y paneles por periodo:
+- student_daily_activity: (estudiante, paralelo, día)
+- paralelo_topic_daily: (paralelo, tema, día)
+"""
+from datetime import date, timedelta
+from typing import Dict, Iterable, Optional
+from uuid import UUID
+from sqlalchemy import func, cast, Date, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.models import StudentDailyActivity, ParaleloTopicDaily, GameSession, ExerciseAttempt, Exercise, MathTopic
+
+
+def record_session_start(db: Session, student_id: UUID, paralelo_id: Optional[UUID], day: date) -> None:
+    """Sumar una sesión al día en que inicia"""
+    if not paralelo_id:
+        return
+
+    _upsert(
+        db, StudentDailyActivity,
+        {"student_id": student_id, "paralelo_id": paralelo_id, "day": day},
+        sessions_count=1
+    )
+
+
+def record_answer(
+    db: Session,
+    student_id: UUID,
+    paralelo_id: Optional[UUID],
+    day: date,
+    is_correct: bool,
+    score_delta: int,
+    topic: Optional[MathTopic] = None,
+    attempted_on: Optional[date] = None
+) -> None:
+    """
+    Sumar una respuesta al día de inicio de su sesión (igual que los totales por sesión)
+    y al rollup por tema del día en que se respondió.
+    """
+    if not paralelo_id:
+        return
+
+    _upsert(
+        db, StudentDailyActivity,
+        {"student_id": student_id, "paralelo_id": paralelo_id, "day": day},
+        exercises_completed=1,
+        correct_answers=1 if is_correct else 0,
+        wrong_answers=0 if is_correct else 1,
+        score=score_delta
+    )
+
+    if topic:
+        _upsert(
+            db, ParaleloTopicDaily,
+            {"paralelo_id": paralelo_id, "topic": topic, "day": attempted_on or day},
+            attempts=1,
+            correct_answers=1 if is_correct else 0
+        )
+
+
+def _upsert(db: Session, model, key: Dict, **increments) -> None:
+    """INSERT ... ON CONFLICT DO UPDATE sumando los incrementos a la fila existente"""
+    stmt = insert(model).values(**key, **increments)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[getattr(model, column) for column in key],
+        set_={
+            column: getattr(model, column) + getattr(stmt.excluded, column)
+            for column in increments
+        }
+    )
+    db.execute(stmt)
+
+
+def day_streaks(active_days: Dict[UUID, Iterable[date]], today: date) -> Dict[UUID, int]:
+    """
+    Racha de días consecutivos con actividad por estudiante.
+    La racha sigue vigente si el último día activo es hoy o ayer.
+    """
+    streaks = {}
+    for student_id, days in active_days.items():
+        days = set(days)
+        current = today if today in days else today - timedelta(days=1)
+        streak = 0
+        while current in days:
+            streak += 1
+            current -= timedelta(days=1)
+        streaks[student_id] = streak
+    return streaks
+
+
+def backfill(db: Session) -> int:
+    """
+    Reconstruir los rollups completos desde game_sessions y exercise_attempts (reemplaza los valores existentes).
+    Bloquea ambas tablas durante la reconstrucción: las respuestas que ya sumaron en los rollups
+    terminan antes de leer el historial y las nuevas esperan al commit, así no se pierden incrementos.
+    Las lecturas de los paneles siguen funcionando mientras tanto.
+    """
+    db.execute(text("LOCK TABLE student_daily_activity, paralelo_topic_daily IN EXCLUSIVE MODE"))
+
+    day = cast(func.timezone("UTC", GameSession.started_at), Date)
+
+    rows = db.query(
+        GameSession.student_id,
+        GameSession.paralelo_id,
+        day.label("day"),
+        func.count(GameSession.id),
+        func.coalesce(func.sum(GameSession.exercises_completed), 0),
+        func.coalesce(func.sum(GameSession.correct_answers), 0),
+        func.coalesce(func.sum(GameSession.wrong_answers), 0),
+        func.coalesce(func.sum(GameSession.total_score), 0)
+    ).filter(
+        GameSession.paralelo_id != None
+    ).group_by(GameSession.student_id, GameSession.paralelo_id, day).all()
+
+    values = [
+        {
+            "student_id": student_id,
+            "paralelo_id": paralelo_id,
+            "day": activity_day,
+            "sessions_count": sessions_count,
+            "exercises_completed": exercises,
+            "correct_answers": correct,
+            "wrong_answers": wrong,
+            "score": score
+        }
+        for student_id, paralelo_id, activity_day, sessions_count, exercises, correct, wrong, score in rows
+    ]
+
+    # Intentos por tema: solo los de sesiones de juego con paralelo
+    # (los intentos antiguos no tienen el tema en línea y se toma del ejercicio)
+    attempt_day = cast(func.timezone("UTC", ExerciseAttempt.attempted_at), Date)
+    attempt_topic = func.coalesce(ExerciseAttempt.topic, Exercise.topic)
+    topic_rows = db.query(
+        GameSession.paralelo_id,
+        attempt_topic.label("topic"),
+        attempt_day.label("day"),
+        func.count(ExerciseAttempt.id),
+        func.count(ExerciseAttempt.id).filter(ExerciseAttempt.is_correct == True)
+    ).join(
+        GameSession, GameSession.id == ExerciseAttempt.game_session_id
+    ).outerjoin(
+        Exercise, Exercise.id == ExerciseAttempt.exercise_id
+    ).filter(
+        GameSession.paralelo_id != None,
+        attempt_topic != None
+    ).group_by(GameSession.paralelo_id, attempt_topic, attempt_day).all()
+
+    topic_values = [
+        {
+            "paralelo_id": paralelo_id,
+            "topic": topic,
+            "day": activity_day,
+            "attempts": attempts,
+            "correct_answers": correct
+        }
+        for paralelo_id, topic, activity_day, attempts, correct in topic_rows
+    ]
+
+    db.query(StudentDailyActivity).delete(synchronize_session=False)
+    db.query(ParaleloTopicDaily).delete(synchronize_session=False)
+    if values:
+        db.execute(insert(StudentDailyActivity), values)
+    if topic_values:
+        db.execute(insert(ParaleloTopicDaily), topic_values)
+    db.commit()
+
+    return len(values) + len(topic_values)
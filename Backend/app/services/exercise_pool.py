@@ -0,0 +1,174 @@
+"""Pool de ejercicios pregenerados por tema, dificultad y banda de puntaje"""
+import asyncio
+import threading
+import time
+import uuid
+from bisect import bisect_right
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+from sqlalchemy import exists, func, insert
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models import Exercise, ExerciseAttempt, ExerciseType, MathTopic, ExerciseDifficulty
+from app.exercise_generator import ExerciseGenerator
+
+settings = get_settings()
+
+# Límites inferiores de las bandas de puntaje: dentro de una banda no cambian ni la dificultad
+# efectiva (_adjust_difficulty_by_score: 100, 300, 600) ni los puntos (exercise_points: >200, >500)
+SCORE_BANDS = (0, 100, 201, 300, 501, 600)
+
+PoolKey = Tuple[MathTopic, ExerciseDifficulty, int]
+
+
+class ExercisePool:
+    """
+    Cola acotada de ejercicios listos para servir por (tema, dificultad, banda de puntaje).
+    Los ejercicios se generan e insertan por lotes en segundo plano, así servir uno no escribe
+    en la BD. Un ejercicio con más de EXERCISE_POOL_MAX_AGE_SECONDS en la cola ya no se sirve;
+    las filas que nadie respondió (p. ej. las de un proceso reiniciado) las borra la tarea
+    cleanup_pooled_exercises del planificador.
+    """
+
+    def __init__(self, is_practice: bool, size: int, refill_threshold: int, max_age_seconds: int):
+        self.is_practice = is_practice
+        self.size = size
+        self.refill_threshold = refill_threshold
+        self.max_age_seconds = max_age_seconds
+        # Cada elemento es (instante de inserción, fila del ejercicio)
+        self._queues: Dict[PoolKey, Deque[Tuple[float, Dict]]] = {}
+        self._lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def score_band(score: int) -> int:
+        """Índice de la banda de puntaje a la que pertenece un puntaje"""
+        return max(bisect_right(SCORE_BANDS, score) - 1, 0)
+
+    def pop(self, topic: MathTopic, difficulty: ExerciseDifficulty, score: int) -> Optional[Dict]:
+        """Obtiene un ejercicio listo o None si la cola está vacía"""
+        key = (topic, difficulty, self.score_band(score))
+        with self._lock:
+            queue = self._queues.setdefault(key, deque())
+
+        # Los ejercicios vencidos se descartan (su fila la borra la limpieza)
+        exercise = None
+        oldest = time.monotonic() - self.max_age_seconds
+        while exercise is None:
+            try:
+                inserted_at, row = queue.popleft()
+            except IndexError:
+                break
+            if inserted_at >= oldest:
+                exercise = row
+
+        if len(queue) <= self.refill_threshold:
+            self._request_refill()
+
+        return exercise
+
+    def _request_refill(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self):
+        """Inicia la tarea de relleno en segundo plano"""
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Detiene la tarea de relleno"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            try:
+                # La generación por lotes se hace fuera del event loop
+                await asyncio.to_thread(self._refill)
+            except Exception as e:
+                print(f"❌ Error al rellenar el pool de ejercicios: {str(e)}")
+                await asyncio.sleep(5)
+
+    def _refill(self):
+        """Rellena con un lote generado e insertado en bloque todas las colas por debajo del umbral"""
+        with self._lock:
+            pending = [
+                (key, queue) for key, queue in self._queues.items()
+                if len(queue) <= self.refill_threshold
+            ]
+
+        if not pending:
+            return
+
+        batches = []
+        for (topic, difficulty, band), queue in pending:
+            # Misma dificultad efectiva y puntos que el camino sin pool para la banda de puntaje
+            band_score = SCORE_BANDS[band]
+            effective_difficulty = ExerciseGenerator._adjust_difficulty_by_score(difficulty, band_score)
+            generated = ExerciseGenerator.generate_batch(topic, effective_difficulty, self.size - len(queue))
+            points = ExerciseGenerator.exercise_points(difficulty, band_score)
+
+            batches.append((queue, [
+                {
+                    "id": uuid.uuid4(),
+                    "title": exercise_data["title"],
+                    "question": exercise_data["question"],
+                    "exercise_type": ExerciseType.multiple_choice,
+                    "difficulty": difficulty,
+                    "topic": topic,
+                    "correct_answer": exercise_data["correct_answer"],
+                    "options": exercise_data["options"],
+                    "points": points,
+                    "is_practice": self.is_practice,
+                    "is_active": True
+                }
+                for exercise_data in generated
+            ]))
+
+        rows = [row for _, batch in batches for row in batch]
+        if not rows:
+            return
+
+        # Un solo INSERT para todas las colas; se encolan cuando las filas ya existen
+        db = SessionLocal()
+        try:
+            db.execute(insert(Exercise), rows)
+            db.commit()
+        finally:
+            db.close()
+
+        inserted_at = time.monotonic()
+        for queue, batch in batches:
+            queue.extend((inserted_at, row) for row in batch)
+
+
+def cleanup_pooled_exercises(db: Session) -> int:
+    """
+    Borrar los ejercicios de práctica sin intentos que ya no se pueden servir ni responder:
+    más del doble de EXERCISE_POOL_MAX_AGE_SECONDS de antigüedad. No hace commit.
+    """
+    max_age = func.make_interval(0, 0, 0, 0, 0, 0, 2 * settings.EXERCISE_POOL_MAX_AGE_SECONDS)
+    return db.query(Exercise).filter(
+        Exercise.is_practice == True,
+        Exercise.challenge_id == None,
+        Exercise.created_at < func.now() - max_age,
+        ~exists().where(ExerciseAttempt.exercise_id == Exercise.id)
+    ).delete(synchronize_session=False)
+
+
+practice_pool = ExercisePool(
+    is_practice=True,
+    size=settings.EXERCISE_POOL_SIZE,
+    refill_threshold=settings.EXERCISE_POOL_REFILL_THRESHOLD,
+    max_age_seconds=settings.EXERCISE_POOL_MAX_AGE_SECONDS
+)
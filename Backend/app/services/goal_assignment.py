@@ -0,0 +1,76 @@
+"""Asignación masiva de metas a estudiantes (INSERT ... SELECT con deduplicación en SQL)"""
+from typing import Iterable
+from uuid import UUID
+from sqlalchemy import func, select, and_, or_, literal
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.models import Goal, StudentGoal, Enrollment, Paralelo
+
+
+def assign_goal(db: Session, goal: Goal) -> int:
+    """
+    Asignar una meta a los estudiantes activos de su paralelo, o de todos los paralelos
+    del profesor si la meta es general. No hace commit; devuelve las asignaciones creadas.
+    """
+    if goal.paralelo_id:
+        scope = Enrollment.paralelo_id == goal.paralelo_id
+    else:
+        scope = Paralelo.teacher_id == goal.teacher_id
+
+    # Un estudiante inscrito en varios paralelos del profesor aparece una sola vez
+    pairs = select(
+        literal(goal.id).label("goal_id"),
+        Enrollment.student_id
+    ).join(
+        Paralelo, Paralelo.id == Enrollment.paralelo_id
+    ).where(
+        Enrollment.is_active == True,
+        scope
+    ).distinct()
+
+    return _insert_assignments(db, pairs)
+
+
+def assign_goals_to_students(db: Session, paralelo_id: UUID, student_ids: Iterable[UUID]) -> int:
+    """
+    Asignar a estudiantes recién inscritos las metas vigentes de su paralelo y las generales
+    del profesor del paralelo. No hace commit; devuelve las asignaciones creadas.
+    """
+    student_ids = list(student_ids)
+    if not student_ids:
+        return 0
+
+    pairs = select(
+        Goal.id.label("goal_id"),
+        Enrollment.student_id
+    ).join(
+        Paralelo, Paralelo.id == Enrollment.paralelo_id
+    ).join(
+        Goal, or_(
+            Goal.paralelo_id == Enrollment.paralelo_id,
+            and_(Goal.paralelo_id == None, Goal.teacher_id == Paralelo.teacher_id)
+        )
+    ).where(
+        Enrollment.paralelo_id == paralelo_id,
+        Enrollment.student_id.in_(student_ids),
+        Enrollment.is_active == True,
+        Goal.is_active == True,
+        Goal.end_date >= func.now()
+    ).distinct()
+
+    return _insert_assignments(db, pairs)
+
+
+def _insert_assignments(db: Session, pairs) -> int:
+    """
+    INSERT ... SELECT (id, goal_id, student_id) ignorando las asignaciones que ya existen.
+    pairs es un SELECT DISTINCT (goal_id, student_id); el id se genera fuera de él para que
+    el DISTINCT compare solo la clave.
+    """
+    pairs = pairs.subquery()
+    rows = select(func.gen_random_uuid(), pairs.c.goal_id, pairs.c.student_id)
+    stmt = insert(StudentGoal).from_select(
+        [StudentGoal.id, StudentGoal.goal_id, StudentGoal.student_id],
+        rows
+    ).on_conflict_do_nothing(index_elements=[StudentGoal.goal_id, StudentGoal.student_id])
+    return db.execute(stmt).rowcount
@@ -0,0 +1,188 @@
+"""
+Tabla de posiciones materializada por paralelo (tabla paralelo_leaderboard).
+Los puntajes son globales del estudiante (todas sus sesiones y metas), igual que el
+ranking original; se replican en una fila por cada paralelo donde está inscrito.
+"""
+import asyncio
+from typing import Dict, List, Optional, Sequence
+from uuid import UUID
+from sqlalchemy import func, update, select, and_, exists
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models import (
+    ParaleloLeaderboard, Enrollment, User, GameSession, StudentGoal, GoalStatus, StudentStats
+)
+
+
+def record_game_answer(db: Session, student_id: UUID, score_delta: int, is_correct: bool) -> None:
+    """Aplicar el resultado de una respuesta del juego en todas las filas del estudiante"""
+    db.execute(
+        update(ParaleloLeaderboard)
+        .where(ParaleloLeaderboard.student_id == student_id)
+        .values(
+            exercise_score=ParaleloLeaderboard.exercise_score + score_delta,
+            total_score=ParaleloLeaderboard.total_score + score_delta,
+            exercises_completed=ParaleloLeaderboard.exercises_completed + 1,
+            correct_answers=ParaleloLeaderboard.correct_answers + (1 if is_correct else 0)
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def add_goal_bonus(db: Session, student_id: UUID, points: int) -> None:
+    """Sumar puntos de metas completadas"""
+    if not points:
+        return
+
+    db.execute(
+        update(ParaleloLeaderboard)
+        .where(ParaleloLeaderboard.student_id == student_id)
+        .values(
+            goal_bonus=ParaleloLeaderboard.goal_bonus + points,
+            total_score=ParaleloLeaderboard.total_score + points
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def remove_goal_bonus(db: Session, goal_id: UUID) -> Dict[UUID, int]:
+    """
+    Restar el bonus de una meta que se va a eliminar (antes de borrar sus StudentGoal).
+    Retorna los puntos restados por estudiante.
+    """
+    bonuses = dict(
+        db.query(
+            StudentGoal.student_id,
+            func.coalesce(func.sum(StudentGoal.points_earned), 0)
+        ).filter(
+            StudentGoal.goal_id == goal_id,
+            StudentGoal.status == GoalStatus.completed
+        ).group_by(StudentGoal.student_id).all()
+    )
+
+    for student_id, points in bonuses.items():
+        if points:
+            add_goal_bonus(db, student_id, -points)
+
+    return bonuses
+
+
+def get_paralelo_leaderboard(db: Session, paralelo_id: UUID) -> List:
+    """
+    Estudiantes activos del paralelo ordenados por puntaje (una consulta indexada, sin escrituras).
+    Las filas se crean al inscribir y al iniciar el proceso; si aún falta alguna cuenta como 0.
+    """
+    total_score = func.coalesce(ParaleloLeaderboard.total_score, 0)
+    return db.execute(
+        select(
+            User.id.label("student_id"),
+            User.first_name,
+            User.last_name,
+            total_score.label("total_score"),
+            func.coalesce(ParaleloLeaderboard.exercise_score, 0).label("exercise_score"),
+            func.coalesce(ParaleloLeaderboard.goal_bonus, 0).label("goal_bonus"),
+            func.coalesce(ParaleloLeaderboard.exercises_completed, 0).label("exercises_completed"),
+            func.coalesce(ParaleloLeaderboard.correct_answers, 0).label("correct_answers")
+        )
+        .select_from(Enrollment)
+        .join(User, User.id == Enrollment.student_id)
+        .outerjoin(
+            ParaleloLeaderboard,
+            and_(
+                ParaleloLeaderboard.paralelo_id == Enrollment.paralelo_id,
+                ParaleloLeaderboard.student_id == Enrollment.student_id
+            )
+        )
+        .where(
+            Enrollment.paralelo_id == paralelo_id,
+            Enrollment.is_active == True
+        )
+        .order_by(total_score.desc(), Enrollment.enrolled_at)
+    ).all()
+
+
+def backfill(db: Session, paralelo_id: Optional[UUID] = None, student_ids: Optional[Sequence[UUID]] = None) -> int:
+    """
+    Crear las filas faltantes de las inscripciones activas (todas, o las del paralelo y
+    estudiantes indicados) con un solo INSERT ... SELECT ... ON CONFLICT DO NOTHING.
+    No hace commit: el llamador confirma en la misma transacción.
+
+    Antes bloquea los contadores de esos estudiantes: una respuesta en curso actualiza
+    student_stats antes que la tabla de posiciones, así que termina antes de que se lean
+    los totales o espera a que las filas existan, y ningún incremento se pierde.
+    """
+    missing = [
+        Enrollment.is_active == True,
+        ~exists().where(
+            ParaleloLeaderboard.paralelo_id == Enrollment.paralelo_id,
+            ParaleloLeaderboard.student_id == Enrollment.student_id
+        )
+    ]
+    if paralelo_id:
+        missing.append(Enrollment.paralelo_id == paralelo_id)
+    if student_ids is not None:
+        if not student_ids:
+            return 0
+        missing.append(Enrollment.student_id.in_(student_ids))
+
+    db.execute(
+        select(StudentStats.student_id)
+        .where(StudentStats.student_id.in_(select(Enrollment.student_id).where(*missing)))
+        .order_by(StudentStats.student_id)
+        .with_for_update()
+    ).all()
+
+    sessions = select(
+        GameSession.student_id,
+        func.sum(GameSession.total_score).label("score"),
+        func.sum(GameSession.exercises_completed).label("exercises"),
+        func.sum(GameSession.correct_answers).label("correct")
+    ).group_by(GameSession.student_id).subquery()
+
+    bonuses = select(
+        StudentGoal.student_id,
+        func.sum(StudentGoal.points_earned).label("bonus")
+    ).where(
+        StudentGoal.status == GoalStatus.completed
+    ).group_by(StudentGoal.student_id).subquery()
+
+    exercise_score = func.coalesce(sessions.c.score, 0)
+    goal_bonus = func.coalesce(bonuses.c.bonus, 0)
+
+    rows = select(
+        Enrollment.paralelo_id,
+        Enrollment.student_id,
+        exercise_score,
+        goal_bonus,
+        exercise_score + goal_bonus,
+        func.coalesce(sessions.c.exercises, 0),
+        func.coalesce(sessions.c.correct, 0)
+    ).select_from(Enrollment).outerjoin(
+        sessions, sessions.c.student_id == Enrollment.student_id
+    ).outerjoin(
+        bonuses, bonuses.c.student_id == Enrollment.student_id
+    ).where(*missing)
+
+    result = db.execute(
+        insert(ParaleloLeaderboard).from_select(
+            ["paralelo_id", "student_id", "exercise_score", "goal_bonus", "total_score",
+             "exercises_completed", "correct_answers"],
+            rows
+        ).on_conflict_do_nothing()
+    )
+    return result.rowcount
+
+
+async def backfill_missing():
+    """Crear al iniciar las filas que falten (inscripciones anteriores a la tabla o hechas por scripts)"""
+    await asyncio.to_thread(_backfill_missing)
+
+
+def _backfill_missing():
+    db = SessionLocal()
+    try:
+        backfill(db)
+        db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,71 @@
+"""
+Canal de eventos en vivo de los versus (Server-Sent Events).
+El broker es en memoria y por proceso; expone solo subscribe/unsubscribe/publish
+para poder reemplazarlo por un broker compartido (p. ej. Redis pub/sub) más adelante.
+"""
+import asyncio
+import json
+from typing import Dict, Set
+from uuid import UUID
+
+# Eventos pendientes por suscriptor; si un cliente lento llena su cola se descarta el más antiguo
+SUBSCRIBER_QUEUE_SIZE = 100
+# Comentario SSE periódico para mantener viva la conexión a través de proxies
+HEARTBEAT_SECONDS = 15
+
+
+class ScoreBroker:
+    """Pub/sub en memoria: una cola por conexión, agrupadas por versus"""
+
+    def __init__(self):
+        self._subscribers: Dict[UUID, Set[asyncio.Queue]] = {}
+
+    def subscribe(self, challenge_id: UUID) -> asyncio.Queue:
+        """Registrar una conexión y devolver su cola de eventos"""
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(challenge_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, challenge_id: UUID, queue: asyncio.Queue):
+        """Eliminar una conexión"""
+        queues = self._subscribers.get(challenge_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[challenge_id]
+
+    def publish(self, challenge_id: UUID, event: Dict):
+        """Enviar un evento a todas las conexiones del versus (no bloquea)"""
+        message = json.dumps(event)
+        for queue in self._subscribers.get(challenge_id, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    def subscriber_count(self, challenge_id: UUID) -> int:
+        return len(self._subscribers.get(challenge_id, ()))
+
+
+async def event_stream(challenge_id: UUID, queue: asyncio.Queue, initial: Dict, request):
+    """
+    Generador SSE: estado inicial y luego los eventos publicados hasta que el cliente se
+    desconecta. La cola se suscribe antes de leer el estado inicial para no perder eventos.
+    """
+    try:
+        yield f"event: snapshot\ndata: {json.dumps(initial)}\n\n"
+        while True:
+            if await request.is_disconnected():
+                break
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: score\ndata: {message}\n\n"
+    finally:
+        score_broker.unsubscribe(challenge_id, queue)
+
+
+# Instancia del proceso
+score_broker = ScoreBroker()
@@ -0,0 +1,218 @@
+"""
+Snapshots precalculados del panel de desempeño por paralelo.
+Se construyen desde los rollups diarios (student_daily_activity y paralelo_topic_daily).
+Solo los escribe la tarea refresh_performance_snapshots del planificador, para los paralelos
+con actividad reciente y los snapshots que superaron PERFORMANCE_SNAPSHOT_TTL_SECONDS;
+la lectura del panel nunca escribe.
+"""
+import json
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Optional
+from uuid import UUID
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.models import (
+    User, Enrollment, StudentDailyActivity, ParaleloTopicDaily, PerformanceSnapshot
+)
+
+settings = get_settings()
+
+PERIODS = ("week", "month", "all")
+DAY_NAMES = ["Lun", "Mar", "Mie", "Jue", "Vie", "Sab", "Dom"]
+
+
+def normalize_period(period: str) -> str:
+    """Cualquier periodo desconocido equivale a todo el historial"""
+    return period if period in PERIODS else "all"
+
+
+def get_performance(db: Session, paralelo_id: UUID, period: str) -> Dict:
+    """
+    Leer el snapshot del paralelo sin escribir: uno vencido se sirve marcado con isStale
+    (lo reconstruye el planificador) y, si todavía no existe, se calcula sin guardarlo.
+    """
+    period = normalize_period(period)
+
+    snapshot = db.query(PerformanceSnapshot).filter(
+        PerformanceSnapshot.paralelo_id == paralelo_id,
+        PerformanceSnapshot.period == period
+    ).first()
+
+    if snapshot is None:
+        return {**build_performance(db, paralelo_id, period), "isStale": False}
+
+    max_age = timedelta(seconds=settings.PERFORMANCE_SNAPSHOT_TTL_SECONDS)
+    is_stale = snapshot.computed_at < datetime.now(timezone.utc) - max_age
+    return {**json.loads(snapshot.payload), "isStale": is_stale}
+
+
+def _store_snapshot(db: Session, paralelo_id: UUID, period: str) -> Dict:
+    """Reconstruir el snapshot y guardarlo sin confirmar la transacción"""
+    payload = build_performance(db, paralelo_id, period)
+
+    stmt = insert(PerformanceSnapshot).values(
+        paralelo_id=paralelo_id,
+        period=period,
+        payload=json.dumps(payload),
+        computed_at=datetime.now(timezone.utc)
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[PerformanceSnapshot.paralelo_id, PerformanceSnapshot.period],
+        set_={"payload": stmt.excluded.payload, "computed_at": stmt.excluded.computed_at}
+    ))
+
+    return payload
+
+
+def _period_start(period: str, today: date) -> Optional[date]:
+    """Día anterior al periodo: los últimos 7 o 30 días contando hoy son los posteriores"""
+    if period == "week":
+        return today - timedelta(days=7)
+    elif period == "month":
+        return today - timedelta(days=30)
+    return None
+
+
+def build_performance(db: Session, paralelo_id: UUID, period: str) -> Dict:
+    """Calcular el panel completo con consultas agrupadas sobre los rollups"""
+    today = datetime.now(timezone.utc).date()
+    since = _period_start(period, today)
+
+    # Estudiantes inscritos
+    students = db.query(User.id, User.first_name, User.last_name).join(
+        Enrollment, Enrollment.student_id == User.id
+    ).filter(
+        Enrollment.paralelo_id == paralelo_id,
+        Enrollment.is_active == True
+    ).all()
+    student_ids = [student.id for student in students]
+
+    activity_filters = [
+        StudentDailyActivity.paralelo_id == paralelo_id,
+        StudentDailyActivity.student_id.in_(student_ids)
+    ]
+    if since:
+        activity_filters.append(StudentDailyActivity.day > since)
+
+    # Totales por estudiante en el periodo
+    per_student = {
+        row.student_id: row
+        for row in db.query(
+            StudentDailyActivity.student_id,
+            func.sum(StudentDailyActivity.sessions_count).label("sessions"),
+            func.sum(StudentDailyActivity.score).label("score"),
+            func.sum(StudentDailyActivity.exercises_completed).label("exercises"),
+            func.sum(StudentDailyActivity.correct_answers).label("correct"),
+            func.sum(StudentDailyActivity.wrong_answers).label("wrong")
+        ).filter(*activity_filters).group_by(StudentDailyActivity.student_id).all()
+    } if student_ids else {}
+
+    total_exercises = sum(int(row.exercises or 0) for row in per_student.values())
+    total_correct = sum(int(row.correct or 0) for row in per_student.values())
+    total_wrong = sum(int(row.wrong or 0) for row in per_student.values())
+    total_score = sum(int(row.score or 0) for row in per_student.values())
+    average_accuracy = (total_correct / (total_correct + total_wrong) * 100) if (total_correct + total_wrong) > 0 else 0
+    average_score = total_score / len(student_ids) if student_ids else 0
+
+    # Estudiantes activos (con sesiones en el periodo)
+    active_students = sum(1 for row in per_student.values() if row.sessions)
+
+    # Desempeño por tema
+    topic_query = db.query(
+        ParaleloTopicDaily.topic,
+        func.sum(ParaleloTopicDaily.attempts).label("attempts"),
+        func.sum(ParaleloTopicDaily.correct_answers).label("correct")
+    ).filter(ParaleloTopicDaily.paralelo_id == paralelo_id)
+    if since:
+        topic_query = topic_query.filter(ParaleloTopicDaily.day > since)
+
+    topic_performance = [
+        {
+            "topic": row.topic.value,
+            "accuracy": round((row.correct / row.attempts * 100) if row.attempts else 0, 1),
+            "attempts": int(row.attempts)
+        }
+        for row in topic_query.group_by(ParaleloTopicDaily.topic).order_by(
+            func.sum(ParaleloTopicDaily.attempts).desc()
+        ).limit(5).all()
+    ]
+
+    # Top estudiantes
+    top_students = []
+    for student in students:
+        row = per_student.get(student.id)
+        correct = int(row.correct or 0) if row else 0
+        wrong = int(row.wrong or 0) if row else 0
+        accuracy = (correct / (correct + wrong) * 100) if (correct + wrong) > 0 else 0
+        top_students.append({
+            "name": f"{student.first_name} {student.last_name}",
+            "score": int(row.score or 0) if row else 0,
+            "accuracy": round(accuracy, 1)
+        })
+    top_students.sort(key=lambda x: x["score"], reverse=True)
+
+    # Estudiantes que necesitan ayuda (accuracy < 60%)
+    needs_help = [s for s in top_students if s["accuracy"] < 60]
+
+    # Actividad de los últimos 7 días
+    week_start = today - timedelta(days=6)
+    exercises_by_day = dict(
+        db.query(
+            StudentDailyActivity.day,
+            func.sum(StudentDailyActivity.exercises_completed)
+        ).filter(
+            StudentDailyActivity.paralelo_id == paralelo_id,
+            StudentDailyActivity.student_id.in_(student_ids),
+            StudentDailyActivity.day >= week_start
+        ).group_by(StudentDailyActivity.day).all()
+    ) if student_ids else {}
+
+    weekly_progress = []
+    for i in range(7):
+        day = week_start + timedelta(days=i)
+        weekly_progress.append({
+            "day": DAY_NAMES[day.weekday()],
+            "exercises": int(exercises_by_day.get(day, 0) or 0)
+        })
+
+    return {
+        "general": {
+            "totalStudents": len(student_ids),
+            "activeStudents": active_students,
+            "totalExercises": total_exercises,
+            "averageAccuracy": round(average_accuracy, 1),
+            "averageScore": round(average_score, 1),
+            "trend": "up" if average_accuracy > 50 else "down"
+        },
+        "topicPerformance": topic_performance,
+        "topStudents": top_students[:3],
+        "needsHelp": needs_help[:3],
+        "weeklyProgress": weekly_progress
+    }
+
+
+def refresh_active_snapshots(db: Session) -> int:
+    """
+    Reconstruir los snapshots de los paralelos con actividad desde ayer y los que superaron
+    PERFORMANCE_SNAPSHOT_TTL_SECONDS (sus periodos se desplazan aunque no haya actividad).
+    La ejecuta el planificador bajo su advisory lock (un solo worker) y confirma al terminar.
+    """
+    since = datetime.now(timezone.utc).date() - timedelta(days=1)
+    stale_before = datetime.now(timezone.utc) - timedelta(seconds=settings.PERFORMANCE_SNAPSHOT_TTL_SECONDS)
+    paralelo_ids = {
+        row[0] for row in db.query(StudentDailyActivity.paralelo_id).filter(
+            StudentDailyActivity.day >= since
+        ).distinct().all()
+    } | {
+        row[0] for row in db.query(PerformanceSnapshot.paralelo_id).filter(
+            PerformanceSnapshot.computed_at < stale_before
+        ).distinct().all()
+    }
+
+    for paralelo_id in paralelo_ids:
+        for period in PERIODS:
+            _store_snapshot(db, paralelo_id, period)
+
+    return len(paralelo_ids)
@@ -0,0 +1,167 @@
+"""
+Índice de posiciones en memoria (SortedList) por paralelo y global.
+Permite consultar la posición de un estudiante, el top-k y los vecinos en O(log n).
+Cada proceso mantiene su propio índice: se reconstruye desde la BD al iniciar y se
+actualiza desde las rutas que puntúan (después del commit).
+"""
+import asyncio
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+from uuid import UUID
+from sortedcontainers import SortedList
+from sqlalchemy import func
+from app.database import SessionLocal
+from app.models import User, UserRole, Enrollment, GameSession, StudentGoal, GoalStatus
+
+
+class RankIndex:
+    """Puntaje total (ejercicios + bonus de metas) ordenado de mayor a menor"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._scores: Dict[UUID, int] = {}
+        self._paralelos_by_student: Dict[UUID, Set[UUID]] = {}
+        # Entradas (-puntaje, id) para que el orden ascendente sea de mayor a menor puntaje
+        self._global = SortedList()
+        self._by_paralelo: Dict[UUID, SortedList] = {}
+
+    async def rebuild(self):
+        """Reconstruir el índice desde la base de datos"""
+        await asyncio.to_thread(self._rebuild)
+
+    def _rebuild(self):
+        db = SessionLocal()
+        try:
+            student_ids = [
+                row[0] for row in db.query(User.id).filter(
+                    User.role == UserRole.student,
+                    User.is_active == True
+                ).all()
+            ]
+
+            session_scores = dict(
+                db.query(GameSession.student_id, func.coalesce(func.sum(GameSession.total_score), 0))
+                .group_by(GameSession.student_id).all()
+            )
+            goal_bonuses = dict(
+                db.query(StudentGoal.student_id, func.coalesce(func.sum(StudentGoal.points_earned), 0))
+                .filter(StudentGoal.status == GoalStatus.completed)
+                .group_by(StudentGoal.student_id).all()
+            )
+            enrollments = db.query(Enrollment.student_id, Enrollment.paralelo_id).filter(
+                Enrollment.is_active == True
+            ).all()
+        finally:
+            db.close()
+
+        scores = {
+            student_id: session_scores.get(student_id, 0) + goal_bonuses.get(student_id, 0)
+            for student_id in student_ids
+        }
+
+        paralelos_by_student: Dict[UUID, Set[UUID]] = {}
+        by_paralelo: Dict[UUID, SortedList] = {}
+        for student_id, paralelo_id in enrollments:
+            if student_id not in scores:
+                continue
+            if paralelo_id in paralelos_by_student.setdefault(student_id, set()):
+                continue
+            paralelos_by_student[student_id].add(paralelo_id)
+            by_paralelo.setdefault(paralelo_id, SortedList()).add((-scores[student_id], student_id))
+
+        with self._lock:
+            self._scores = scores
+            self._paralelos_by_student = paralelos_by_student
+            self._global = SortedList((-score, student_id) for student_id, score in scores.items())
+            self._by_paralelo = by_paralelo
+
+    def apply_delta(self, student_id: UUID, delta: int):
+        """Sumar (o restar) puntos al total de un estudiante"""
+        if not delta:
+            return
+
+        with self._lock:
+            old_score = self._scores.get(student_id)
+            if old_score is None:
+                self._scores[student_id] = delta
+                self._global.add((-delta, student_id))
+                return
+
+            new_score = old_score + delta
+            self._scores[student_id] = new_score
+            self._move(self._global, student_id, old_score, new_score)
+            for paralelo_id in self._paralelos_by_student.get(student_id, ()):
+                self._move(self._by_paralelo[paralelo_id], student_id, old_score, new_score)
+
+    def add_enrollment(self, student_id: UUID, paralelo_id: UUID):
+        """Registrar la inscripción de un estudiante en un paralelo"""
+        with self._lock:
+            paralelos = self._paralelos_by_student.setdefault(student_id, set())
+            if paralelo_id in paralelos:
+                return
+            paralelos.add(paralelo_id)
+
+            if student_id not in self._scores:
+                self._scores[student_id] = 0
+                self._global.add((0, student_id))
+
+            self._by_paralelo.setdefault(paralelo_id, SortedList()).add((-self._scores[student_id], student_id))
+
+    def remove_enrollment(self, student_id: UUID, paralelo_id: UUID):
+        """Quitar a un estudiante del índice de un paralelo"""
+        with self._lock:
+            paralelos = self._paralelos_by_student.get(student_id)
+            if not paralelos or paralelo_id not in paralelos:
+                return
+            paralelos.discard(paralelo_id)
+            self._by_paralelo[paralelo_id].discard((-self._scores[student_id], student_id))
+
+    def rank(self, student_id: UUID, paralelo_id: Optional[UUID] = None) -> Optional[Tuple[int, int, int]]:
+        """
+        Retorna (posición, puntaje, total de estudiantes) o None si no está en el ranking del
+        paralelo. En el global, un estudiante que aún no está en el índice (registrado después
+        de reconstruirlo y sin puntos) ocupa el último lugar con 0 puntos.
+        """
+        with self._lock:
+            entries = self._entries(paralelo_id)
+            score = self._scores.get(student_id)
+            if paralelo_id is None and score is None:
+                return len(entries) + 1, 0, len(entries) + 1
+            if score is None or (-score, student_id) not in entries:
+                return None
+            return entries.index((-score, student_id)) + 1, score, len(entries)
+
+    def top(self, k: int, paralelo_id: Optional[UUID] = None) -> List[Tuple[int, UUID, int]]:
+        """Retorna los k primeros como (posición, id, puntaje)"""
+        with self._lock:
+            entries = self._entries(paralelo_id)
+            return [(idx + 1, student_id, -neg_score) for idx, (neg_score, student_id) in enumerate(entries[:k])]
+
+    def neighbors(self, student_id: UUID, k: int, paralelo_id: Optional[UUID] = None) -> List[Tuple[int, UUID, int]]:
+        """Retorna el estudiante y hasta k posiciones por encima y por debajo"""
+        with self._lock:
+            entries = self._entries(paralelo_id)
+            score = self._scores.get(student_id)
+            if score is None or (-score, student_id) not in entries:
+                return []
+
+            position = entries.index((-score, student_id))
+            start = max(0, position - k)
+            return [
+                (start + offset + 1, entry_id, -neg_score)
+                for offset, (neg_score, entry_id) in enumerate(entries[start:position + k + 1])
+            ]
+
+    def _entries(self, paralelo_id: Optional[UUID]) -> SortedList:
+        if paralelo_id is None:
+            return self._global
+        return self._by_paralelo.get(paralelo_id, SortedList())
+
+    @staticmethod
+    def _move(entries: SortedList, student_id: UUID, old_score: int, new_score: int):
+        entries.discard((-old_score, student_id))
+        entries.add((-new_score, student_id))
+
+
+# Instancia del proceso
+rank_index = RankIndex()
@@ -0,0 +1,155 @@
+"""
+Planificador de tareas periódicas en segundo plano.
+El estado de cada tarea vive en la tabla scheduled_jobs; antes de ejecutar una tarea se toma
+un advisory lock de PostgreSQL, así que con varios workers solo uno la ejecuta.
+"""
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Optional
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models import ScheduledJob, Challenge, ChallengeStatus, Goal, StudentGoal, GoalStatus
+from app.services import challenge_scoreboard, exercise_pool, performance_snapshots
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def end_expired_challenges(db: Session) -> int:
+    """Finalizar los versus activos cuyo tiempo límite ya venció"""
+    deadline = Challenge.start_time + func.make_interval(0, 0, 0, 0, 0, Challenge.time_limit)
+    challenges = db.query(Challenge).filter(
+        Challenge.status == ChallengeStatus.active,
+        Challenge.time_limit != None,
+        Challenge.start_time != None,
+        deadline <= func.now()
+    ).with_for_update(skip_locked=True).all()
+
+    for challenge in challenges:
+        challenge_scoreboard.finalize_challenge(db, challenge)
+
+    return len(challenges)
+
+
+def expire_goals(db: Session) -> int:
+    """Marcar como vencidas, en un solo UPDATE, las metas activas cuya fecha de fin pasó"""
+    expired_goal_ids = select(Goal.id).where(Goal.end_date < func.now())
+    return db.query(StudentGoal).filter(
+        StudentGoal.status == GoalStatus.active,
+        StudentGoal.goal_id.in_(expired_goal_ids)
+    ).update({StudentGoal.status: GoalStatus.expired}, synchronize_session=False)
+
+
+# Tareas registradas: nombre -> (intervalo en segundos, función que recibe la sesión)
+JOBS: Dict[str, tuple] = {
+    "end_expired_challenges": (settings.CHALLENGE_DEADLINE_JOB_SECONDS, end_expired_challenges),
+    "expire_goals": (settings.GOAL_EXPIRY_JOB_SECONDS, expire_goals),
+    "refresh_performance_snapshots": (
+        settings.PERFORMANCE_REFRESH_INTERVAL_SECONDS, performance_snapshots.refresh_active_snapshots
+    ),
+    "cleanup_pooled_exercises": (
+        settings.EXERCISE_POOL_CLEANUP_JOB_SECONDS, exercise_pool.cleanup_pooled_exercises
+    ),
+}
+
+
+def _lock_key(name: str) -> int:
+    """Clave estable de 64 bits con signo para pg_try_advisory_xact_lock"""
+    digest = hashlib.sha256(f"scheduler:{name}".encode()).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
+
+
+class Scheduler:
+    """Tarea asyncio que ejecuta las tareas vencidas de scheduled_jobs fuera del event loop"""
+
+    def __init__(self, tick_seconds: int):
+        self.tick_seconds = tick_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Inicia el planificador"""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Detiene el planificador"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.to_thread(self._run_due)
+            except Exception:
+                logger.exception("Error en el planificador")
+            await asyncio.sleep(self.tick_seconds)
+
+    def _run_due(self):
+        db = SessionLocal()
+        try:
+            self._register_jobs(db)
+            for name, (interval_seconds, job) in JOBS.items():
+                self._run_job(db, name, interval_seconds, job)
+        finally:
+            db.close()
+
+    @staticmethod
+    def _register_jobs(db: Session):
+        """Crear las filas de las tareas nuevas (primera ejecución inmediata)"""
+        now = datetime.now(timezone.utc)
+        db.execute(
+            insert(ScheduledJob).on_conflict_do_nothing(index_elements=[ScheduledJob.name]),
+            [
+                {"name": name, "interval_seconds": interval_seconds, "next_run_at": now}
+                for name, (interval_seconds, _) in JOBS.items()
+            ]
+        )
+        db.commit()
+
+    @staticmethod
+    def _run_job(db: Session, name: str, interval_seconds: int, job: Callable[[Session], int]):
+        # El lock de transacción se libera solo con el commit o rollback
+        locked = db.execute(select(func.pg_try_advisory_xact_lock(_lock_key(name)))).scalar()
+        if not locked:
+            db.rollback()
+            return
+
+        now = datetime.now(timezone.utc)
+        scheduled = db.query(ScheduledJob).filter(
+            ScheduledJob.name == name,
+            ScheduledJob.next_run_at <= now
+        ).first()
+        if scheduled is None:
+            db.rollback()
+            return
+
+        # La tarea corre en un SAVEPOINT: si falla se deshace solo su trabajo y el lock
+        # sigue tomado mientras se guarda el error
+        try:
+            with db.begin_nested():
+                affected = job(db)
+            scheduled.last_error = None
+        except Exception as e:
+            logger.exception("Error en la tarea %s", name)
+            scheduled.last_error = str(e)
+            affected = 0
+
+        scheduled.interval_seconds = interval_seconds
+        scheduled.last_run_at = now
+        scheduled.next_run_at = now + timedelta(seconds=interval_seconds)
+        db.commit()
+
+        if affected:
+            logger.info("Tarea %s: %s registros actualizados", name, affected)
+
+# Instancia del proceso
+scheduler = Scheduler(settings.SCHEDULER_TICK_SECONDS)
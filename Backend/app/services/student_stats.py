@@ -0,0 +1,210 @@
+"""Contadores agregados por estudiante (tabla student_stats)"""
+import asyncio
+from typing import Optional, Sequence
+from uuid import UUID
+from sqlalchemy import func, update, select, case, exists
+from sqlalchemy.dialects.postgresql import insert, array_agg, aggregate_order_by
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models import StudentStats, ExerciseAttempt, GameSession, User, UserRole
+from app.services.cache import VersionedCache
+
+# Resumen de /stats por estudiante, válido mientras no cambie StudentStats.version
+summary_cache = VersionedCache(max_entries=5000)
+
+
+def get_student_stats(db: Session, student_id: UUID) -> StudentStats:
+    """Obtener los contadores del estudiante, reconstruyéndolos si aún no existen"""
+    stats = db.query(StudentStats).filter(StudentStats.student_id == student_id).first()
+    if stats is None:
+        stats = backfill_student_stats(db, student_id)
+    return stats
+
+
+def read_student_stats(db: Session, student_id: UUID) -> Optional[StudentStats]:
+    """
+    Leer los contadores sin escribir (rutas GET). Las filas se crean al iniciar el proceso
+    y con la primera respuesta o sesión; sin fila el estudiante no tiene historial.
+    """
+    return db.query(StudentStats).filter(StudentStats.student_id == student_id).first()
+
+
+def record_attempt(
+    db: Session,
+    student_id: UUID,
+    is_correct: bool,
+    points_earned: int,
+    score_delta: int = 0,
+    session_score: Optional[int] = None
+) -> StudentStats:
+    """
+    Registrar un intento en los contadores con un UPDATE atómico.
+    score_delta y session_score solo aplican a intentos de sesiones de juego.
+    """
+    values = {
+        "total_attempts": StudentStats.total_attempts + 1,
+        "points_earned": StudentStats.points_earned + points_earned,
+        "total_score": StudentStats.total_score + score_delta,
+        "version": StudentStats.version + 1,
+    }
+
+    if is_correct:
+        values["correct_attempts"] = StudentStats.correct_attempts + 1
+        values["current_streak"] = StudentStats.current_streak + 1
+        values["best_streak"] = func.greatest(StudentStats.best_streak, StudentStats.current_streak + 1)
+    else:
+        values["current_streak"] = 0
+
+    if session_score is not None:
+        values["best_score"] = func.greatest(StudentStats.best_score, session_score)
+
+    return _increment(db, student_id, values)
+
+
+def record_session_start(db: Session, student_id: UUID) -> StudentStats:
+    """Registrar una nueva sesión de juego en los contadores"""
+    return _increment(db, student_id, {
+        "total_sessions": StudentStats.total_sessions + 1,
+        "version": StudentStats.version + 1
+    })
+
+
+def _increment(db: Session, student_id: UUID, values: dict) -> StudentStats:
+    """
+    UPDATE atómico de los contadores. Si el estudiante aún no tiene fila se crea desde el
+    historial, que ya incluye este evento tras el flush; si otra transacción la creó antes
+    (sin ver este evento), el incremento se aplica sobre esa fila.
+    """
+    stmt = (
+        update(StudentStats)
+        .where(StudentStats.student_id == student_id)
+        .values(**values)
+        .returning(StudentStats)
+        .execution_options(populate_existing=True)
+    )
+
+    stats = db.execute(stmt).scalars().first()
+    if stats is None:
+        db.flush()
+        if backfill(db, [student_id]):
+            stats = _load(db, student_id)
+        else:
+            stats = db.execute(stmt).scalars().one()
+
+    return stats
+
+
+def backfill_student_stats(db: Session, student_id: UUID) -> StudentStats:
+    """Reconstruir los contadores de un estudiante desde el historial si aún no existen"""
+    backfill(db, [student_id])
+    return _load(db, student_id)
+
+
+def backfill(db: Session, student_ids: Optional[Sequence[UUID]] = None) -> int:
+    """
+    Crear desde el historial los contadores que faltan (todos los estudiantes sin fila, o los
+    indicados) con un solo INSERT ... SELECT ... ON CONFLICT DO NOTHING. No hace commit.
+    Retorna el número de filas creadas.
+    """
+    students = select(User.id.label("student_id")).where(
+        ~exists().where(StudentStats.student_id == User.id)
+    )
+    if student_ids is None:
+        students = students.where(User.role == UserRole.student)
+    else:
+        students = students.where(User.id.in_(student_ids))
+    students = students.subquery()
+
+    attempts = select(
+        ExerciseAttempt.student_id,
+        func.count(ExerciseAttempt.id).label("total"),
+        func.count(ExerciseAttempt.id).filter(ExerciseAttempt.is_correct == True).label("correct"),
+        func.sum(ExerciseAttempt.points_earned).label("points")
+    ).where(
+        ExerciseAttempt.student_id.in_(select(students.c.student_id))
+    ).group_by(ExerciseAttempt.student_id).subquery()
+
+    sessions = select(
+        GameSession.student_id,
+        func.count(GameSession.id).label("total"),
+        func.sum(GameSession.total_score).label("score"),
+        func.max(GameSession.total_score).label("best")
+    ).where(
+        GameSession.student_id.in_(select(students.c.student_id))
+    ).group_by(GameSession.student_id).subquery()
+
+    # Rachas calculadas en SQL (gaps and islands): cada error abre un nuevo grupo de aciertos
+    wrong_count = func.count(case((ExerciseAttempt.is_correct == False, 1))).over(
+        partition_by=ExerciseAttempt.student_id,
+        order_by=ExerciseAttempt.attempted_at
+    )
+    ordered = select(
+        ExerciseAttempt.student_id,
+        ExerciseAttempt.is_correct,
+        wrong_count.label("group_id")
+    ).where(
+        ExerciseAttempt.student_id.in_(select(students.c.student_id))
+    ).subquery()
+
+    islands = select(
+        ordered.c.student_id,
+        ordered.c.group_id,
+        func.count().filter(ordered.c.is_correct == True).label("streak")
+    ).group_by(ordered.c.student_id, ordered.c.group_id).subquery()
+
+    streaks = select(
+        islands.c.student_id,
+        func.max(islands.c.streak).label("best"),
+        # La racha actual es el último grupo
+        array_agg(aggregate_order_by(islands.c.streak, islands.c.group_id.desc()))[1].label("current")
+    ).group_by(islands.c.student_id).subquery()
+
+    rows = select(
+        students.c.student_id,
+        func.coalesce(attempts.c.total, 0),
+        func.coalesce(attempts.c.correct, 0),
+        func.coalesce(attempts.c.points, 0),
+        func.coalesce(sessions.c.score, 0),
+        func.coalesce(sessions.c.total, 0),
+        func.coalesce(sessions.c.best, 0),
+        func.coalesce(streaks.c.current, 0),
+        func.coalesce(streaks.c.best, 0)
+    ).select_from(students).outerjoin(
+        attempts, attempts.c.student_id == students.c.student_id
+    ).outerjoin(
+        sessions, sessions.c.student_id == students.c.student_id
+    ).outerjoin(
+        streaks, streaks.c.student_id == students.c.student_id
+    )
+
+    # ON CONFLICT DO NOTHING: si otra petición lo creó en paralelo, se conserva esa fila
+    result = db.execute(
+        insert(StudentStats).from_select(
+            ["student_id", "total_attempts", "correct_attempts", "points_earned", "total_score",
+             "total_sessions", "best_score", "current_streak", "best_streak"],
+            rows
+        ).on_conflict_do_nothing(index_elements=[StudentStats.student_id])
+    )
+    return result.rowcount
+
+
+async def backfill_missing():
+    """Crear al iniciar los contadores de los estudiantes que aún no los tienen"""
+    await asyncio.to_thread(_backfill_missing)
+
+
+def _backfill_missing():
+    db = SessionLocal()
+    try:
+        backfill(db)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _load(db: Session, student_id: UUID) -> StudentStats:
+    return db.execute(
+        select(StudentStats)
+        .where(StudentStats.student_id == student_id)
+        .execution_options(populate_existing=True)
+    ).scalars().one()
@@ -0,0 +1,36 @@
+"""Script para reconstruir los rollups diarios (student_daily_activity y paralelo_topic_daily)"""
+import sys
+import os
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import SessionLocal, engine, Base
+from app.models import StudentDailyActivity, ParaleloTopicDaily
+from app.services import daily_activity
+
+
+def backfill_daily_activity():
+    """Recalcula el rollup diario completo (reemplaza los valores existentes)"""
+    db = SessionLocal()
+
+    try:
+        print("🚀 Reconstruyendo actividad diaria...")
+
+        # Asegurar que las tablas existan
+        Base.metadata.create_all(bind=engine, tables=[StudentDailyActivity.__table__, ParaleloTopicDaily.__table__])
+
+        rows = daily_activity.backfill(db)
+        print(f"✅ {rows} filas de actividad diaria generadas")
+
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        db.rollback()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    backfill_daily_activity()
@@ -0,0 +1,115 @@
+"""
+Benchmark de AIRecommendations.generate_class_recommendations para un paralelo con 500
+estudiantes (progreso en todos los temas):
+- antes: una consulta de StudentTopicProgress por tema con IN (estudiantes), promedios en Python
+- después, sin caché: una consulta agrupada por tema
+- después, con caché: análisis en caché por paralelo
+
+Crea los datos la primera vez en la base configurada (DB_*).
+
+    python benchmarks/class_recommendations.py --students 500 --runs 30
+"""
+import argparse
+import random
+import time
+
+from common import ensure_paralelo, ensure_students, percentile
+from sqlalchemy.dialects.postgresql import insert
+from app.ai_recommendations import AIRecommendations, class_recommendations_cache
+from app.database import SessionLocal
+from app.models import Enrollment, MathTopic, StudentTopicProgress
+
+
+def seed(student_ids):
+    """Progreso por tema de cada estudiante (se conserva el existente)"""
+    db = SessionLocal()
+    try:
+        rows = []
+        for student_id in student_ids:
+            for topic in MathTopic:
+                attempts = random.randint(1, 60)
+                correct = random.randint(0, attempts)
+                rows.append({
+                    "student_id": student_id,
+                    "topic": topic,
+                    "total_attempts": attempts,
+                    "correct_attempts": correct,
+                    "wrong_attempts": attempts - correct,
+                    "mastery_level": int(min(attempts / 20, 1) * correct * 100 / attempts),
+                    "needs_improvement": False
+                })
+        db.execute(
+            insert(StudentTopicProgress).on_conflict_do_nothing(
+                index_elements=[StudentTopicProgress.student_id, StudentTopicProgress.topic]
+            ),
+            rows
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def baseline_topic_stats(db, paralelo_id):
+    """Cálculo original: una consulta por tema cargando cada fila como objeto ORM"""
+    student_ids = [
+        e.student_id for e in db.query(Enrollment).filter(
+            Enrollment.paralelo_id == paralelo_id,
+            Enrollment.is_active == True
+        ).all()
+    ]
+    topic_stats = {}
+    for topic in MathTopic:
+        progress_list = db.query(StudentTopicProgress).filter(
+            StudentTopicProgress.student_id.in_(student_ids),
+            StudentTopicProgress.topic == topic
+        ).all()
+        if progress_list:
+            total_attempts = sum(p.total_attempts for p in progress_list)
+            total_correct = sum(p.correct_attempts for p in progress_list)
+            topic_stats[topic] = {
+                "mastery": sum(p.mastery_level for p in progress_list) / len(progress_list),
+                "accuracy": (total_correct / total_attempts * 100) if total_attempts > 0 else 0
+            }
+    return topic_stats
+
+
+def measure(title: str, runs: int, call):
+    latencies = []
+    for _ in range(runs):
+        db = SessionLocal()
+        try:
+            start = time.perf_counter()
+            call(db)
+            latencies.append(time.perf_counter() - start)
+        finally:
+            db.close()
+    print(
+        f"   {title:<22}p50 {percentile(latencies, 50) * 1000:8.2f} ms"
+        f"   p95 {percentile(latencies, 95) * 1000:8.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+
+    paralelo = ensure_paralelo(f"Bench Recomendaciones {args.students}")
+    students = ensure_students(args.students, prefix=f"recs{args.students}-", paralelo_id=paralelo.id)
+    seed([student["id"] for student in students])
+    paralelo_id = str(paralelo.id)
+
+    def current(db, cached: bool):
+        if not cached:
+            class_recommendations_cache.invalidate(paralelo_id)
+        AIRecommendations.generate_class_recommendations(paralelo_id, db)
+
+    print(f"🚀 Recomendaciones de clase con {args.students} estudiantes, {args.runs} ejecuciones por variante")
+    measure("antes (consulta/tema)", args.runs, lambda db: baseline_topic_stats(db, paralelo_id))
+    measure("después, sin caché", args.runs, lambda db: current(db, cached=False))
+    measure("después, con caché", args.runs, lambda db: current(db, cached=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Utilidades compartidas por los benchmarks (datos de prueba y estadísticas)"""
+import json
+import os
+import sys
+import time
+import urllib.request
+from typing import Dict, List, Optional, Sequence
+
+# Agregar el directorio del backend al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.auth import create_access_token, get_password_hash
+from app.database import SessionLocal
+from app.models import User, UserRole, Paralelo, Enrollment
+
+BENCH_DOMAIN = "bench.mathmaster.local"
+
+
+def ensure_students(count: int, prefix: str = "bench", paralelo_id=None) -> List[Dict]:
+    """Crear (o reutilizar) estudiantes de prueba y devolver su id y token JWT"""
+    db = SessionLocal()
+    try:
+        password = get_password_hash("bench123")
+        students = []
+        for i in range(count):
+            email = f"{prefix}{i}@{BENCH_DOMAIN}"
+            user = db.query(User).filter(User.email == email).first()
+            if not user:
+                user = User(
+                    email=email,
+                    password=password,
+                    first_name="Bench",
+                    last_name=f"{prefix.capitalize()} {i}",
+                    role=UserRole.student,
+                    is_active=True
+                )
+                db.add(user)
+                db.flush()
+            if paralelo_id and not db.query(Enrollment).filter(
+                Enrollment.student_id == user.id,
+                Enrollment.paralelo_id == paralelo_id
+            ).first():
+                db.add(Enrollment(student_id=user.id, paralelo_id=paralelo_id, is_active=True))
+            students.append({"id": user.id, "email": email})
+        db.commit()
+        for student in students:
+            student["token"] = create_access_token(data={"sub": student["email"]})
+        return students
+    finally:
+        db.close()
+
+
+def ensure_paralelo(name: str) -> "Paralelo":
+    """Crear (o reutilizar) un paralelo de prueba"""
+    db = SessionLocal()
+    try:
+        paralelo = db.query(Paralelo).filter(Paralelo.name == name).first()
+        if not paralelo:
+            paralelo = Paralelo(name=name, level="bench", is_active=True)
+            db.add(paralelo)
+            db.commit()
+        db.refresh(paralelo)
+        db.expunge(paralelo)
+        return paralelo
+    finally:
+        db.close()
+
+
+def request(base_url: str, method: str, path: str, token: str, body: Optional[Dict] = None) -> Dict:
+    """Petición HTTP con la librería estándar (funciona igual contra cualquier versión del backend)"""
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(f"{base_url}{path}", data=data, method=method)
+    req.add_header("Authorization", f"Bearer {token}")
+    if data is not None:
+        req.add_header("Content-Type", "application/json")
+    with urllib.request.urlopen(req) as response:
+        return json.loads(response.read())
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Percentil por rango más cercano"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def report(title: str, latencies: Sequence[float], elapsed: float):
+    """Imprimir throughput y latencias (en ms)"""
+    print(f"📊 {title}")
+    print(f"   peticiones: {len(latencies)} en {elapsed:.2f}s -> {len(latencies) / elapsed:.1f} req/s")
+    print(f"   p50: {percentile(latencies, 50) * 1000:.1f} ms | p95: {percentile(latencies, 95) * 1000:.1f} ms")
+
+
+class Timer:
+    """Cronómetro simple para bloques with"""
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
@@ -0,0 +1,43 @@
+"""
+Micro-benchmark de generación de ejercicios: ExerciseGenerator.generate_exercise (uno por
+llamada) frente a ExerciseGenerator.generate_batch (N a la vez con NumPy), por tema y dificultad.
+No necesita base de datos.
+
+    python benchmarks/exercise_generation.py --n 10000
+"""
+import argparse
+
+from common import Timer
+from app.exercise_generator import ExerciseGenerator
+from app.models import MathTopic, ExerciseDifficulty
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=10000, help="ejercicios por tema y dificultad")
+    parser.add_argument("--difficulty", default="medium", choices=[d.value for d in ExerciseDifficulty])
+    args = parser.parse_args()
+
+    difficulty = ExerciseDifficulty(args.difficulty)
+    print(f"🚀 {args.n} ejercicios por tema, dificultad {difficulty.value}")
+    print(f"   {'tema':<22}{'por llamada':>16}{'por lote':>16}{'aceleración':>14}")
+
+    for topic in MathTopic:
+        with Timer() as single:
+            for _ in range(args.n):
+                # Puntaje 0: misma dificultad efectiva que el lote (sin ajuste por puntaje)
+                ExerciseGenerator.generate_exercise(topic, difficulty, 0)
+
+        with Timer() as batch:
+            ExerciseGenerator.generate_batch(topic, difficulty, args.n)
+
+        print(
+            f"   {topic.value:<22}"
+            f"{args.n / single.elapsed:>12.0f} ej/s"
+            f"{args.n / batch.elapsed:>12.0f} ej/s"
+            f"{single.elapsed / batch.elapsed:>13.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
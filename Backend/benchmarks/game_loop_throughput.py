@@ -0,0 +1,61 @@
+"""
+Benchmark de throughput concurrente del ciclo de juego del estudiante
+(/game/start, /game/next-exercise, /game/submit-answer, /game/end).
+
+Se ejecuta contra un servidor en marcha. Para comparar antes y después, levantar el
+backend con el código anterior (p. ej. `git stash` o un checkout del commit previo a la
+sesión asíncrona) y con el actual, usando la misma base de datos y los mismos parámetros:
+
+    python benchmarks/game_loop_throughput.py --base-url http://localhost:3000 --students 50 --rounds 10
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import ensure_students, request, report, Timer
+
+
+def play(base_url: str, token: str, rounds: int):
+    """Una partida completa; retorna la latencia de cada petición"""
+    latencies = []
+
+    def timed(method, path, body=None):
+        start = time.perf_counter()
+        response = request(base_url, method, path, token, body)
+        latencies.append(time.perf_counter() - start)
+        return response
+
+    session_id = timed("POST", "/api/student/game/start")["data"]["session_id"]
+    for _ in range(rounds):
+        exercise = timed("GET", f"/api/student/game/next-exercise?session_id={session_id}")["data"]
+        timed("POST", "/api/student/game/submit-answer", {
+            "session_id": session_id,
+            "exercise_id": exercise["exercise_id"],
+            "exercise_token": exercise.get("exercise_token"),
+            "answer": exercise["options"][0] if exercise["options"] else "0",
+            "time_taken": 5
+        })
+    timed("POST", "/api/student/game/end", {"session_id": session_id})
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:3000")
+    parser.add_argument("--students", type=int, default=50, help="estudiantes jugando en paralelo")
+    parser.add_argument("--rounds", type=int, default=10, help="ejercicios por partida")
+    args = parser.parse_args()
+
+    students = ensure_students(args.students, prefix="loop")
+    print(f"🚀 {args.students} partidas concurrentes de {args.rounds} ejercicios contra {args.base_url}")
+
+    latencies = []
+    with Timer() as timer, ThreadPoolExecutor(max_workers=args.students) as executor:
+        for result in executor.map(lambda s: play(args.base_url, s["token"], args.rounds), students):
+            latencies.extend(result)
+
+    report("Ciclo de juego", latencies, timer.elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+Benchmark del marcador en vivo de un versus con 200 estudiantes conectados.
+
+Mientras unos pocos participantes responden, los demás estudiantes siguen el marcador:
+- poll: cada estudiante consulta GET /api/student/challenges cada --poll-seconds
+  (lo que hacía la página antes del canal en vivo)
+- sse: cada estudiante mantiene abierta la conexión /challenges/{id}/live y recibe un
+  evento por respuesta (un put en la cola de cada suscriptor)
+
+Reporta la latencia de las respuestas de los participantes en ambos modos y, en sse, el
+tiempo desde el envío de la respuesta hasta que cada conexión recibe el evento.
+Se ejecuta contra un servidor en marcha que use la misma base de datos:
+
+    python benchmarks/live_scoreboard.py --base-url http://localhost:3000 --mode sse --students 200
+
+El modo broker mide solo el costo del fan-out en el proceso (sin servidor ni base de datos):
+publish a --students colas y el tiempo hasta que todos los suscriptores tienen el evento.
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+from common import BENCH_DOMAIN, ensure_students, ensure_paralelo, percentile, request, report, Timer
+from app.database import SessionLocal
+from app.models import Challenge, ChallengeParticipant, ChallengeStatus, MathTopic, User, UserRole
+from app.services import challenge_exercises
+from app.services.live_scoreboard import ScoreBroker
+
+
+def create_challenge(paralelo1, paralelo2, players, answers: int):
+    """Versus activo nuevo con su conjunto de ejercicios y los participantes que juegan"""
+    db = SessionLocal()
+    try:
+        email = f"livedocente@{BENCH_DOMAIN}"
+        teacher = db.query(User).filter(User.email == email).first()
+        if not teacher:
+            teacher = User(email=email, password="-", first_name="Bench", last_name="Docente",
+                           role=UserRole.teacher, is_active=True)
+            db.add(teacher)
+            db.flush()
+
+        challenge = Challenge(
+            teacher_id=teacher.id,
+            paralelo1_id=paralelo1.id,
+            paralelo2_id=paralelo2.id,
+            title=f"Bench en vivo {datetime.now(timezone.utc):%H:%M:%S}",
+            topic=MathTopic.operations,
+            num_exercises=answers,
+            status=ChallengeStatus.active,
+            start_time=datetime.now(timezone.utc)
+        )
+        db.add(challenge)
+        db.flush()
+        challenge_exercises.generate_set(db, challenge)
+        for player, paralelo_id in players:
+            db.add(ChallengeParticipant(
+                challenge_id=challenge.id, student_id=player["id"], paralelo_id=paralelo_id
+            ))
+        db.commit()
+        return challenge.id
+    finally:
+        db.close()
+
+
+def play(base_url: str, challenge_id, player, answers: int, sent_at: dict):
+    """Responder todos los ejercicios del versus; retorna la latencia de cada envío"""
+    latencies = []
+    for _ in range(answers):
+        exercise = request(base_url, "GET", f"/api/student/challenges/{challenge_id}/exercise", player["token"])["data"]
+        sent_at[(str(player["id"]), exercise["current_exercise"])] = time.perf_counter()
+        start = time.perf_counter()
+        request(base_url, "POST", f"/api/student/challenges/{challenge_id}/submit-answer", player["token"], {
+            "exercise_id": exercise["exercise_id"],
+            "answer": exercise["options"][0] if exercise["options"] else "0",
+            "time_taken": 5
+        })
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def listen(base_url: str, challenge_id, token: str, expected: int, connected, received: list, stop):
+    """Conexión SSE: registra (studentId, exercisesCompleted, instante) de cada evento"""
+    url = urlparse(base_url)
+    connection = http.client.HTTPConnection(url.hostname, url.port, timeout=5)
+    connection.request("GET", f"/api/student/challenges/{challenge_id}/live?token={token}")
+    response = connection.getresponse()
+    event, count = None, 0
+    try:
+        while count < expected and not stop.is_set():
+            try:
+                line = response.readline().decode().strip()
+            except TimeoutError:
+                continue
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: ") and event == "snapshot":
+                connected.release()
+            elif line.startswith("data: ") and event == "score":
+                data = json.loads(line[len("data: "):])
+                received.append((data["studentId"], data["exercisesCompleted"], time.perf_counter()))
+                count += 1
+    finally:
+        connection.close()
+
+
+def poll(base_url: str, token: str, interval: float, latencies: list, stop):
+    """Recarga periódica de la lista de versus"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        request(base_url, "GET", "/api/student/challenges?filter=available", token)
+        latencies.append(time.perf_counter() - start)
+        stop.wait(interval)
+
+
+async def broker_fanout(subscribers: int, events: int):
+    """Publicar eventos a muchas colas del broker en memoria y medir la entrega"""
+    broker = ScoreBroker()
+    challenge_id = "bench"
+    delivery, publish = [], []
+
+    async def subscriber():
+        queue = broker.subscribe(challenge_id)
+        try:
+            for _ in range(events):
+                message = await queue.get()
+                delivery.append(time.perf_counter() - json.loads(message)["sentAt"])
+        finally:
+            broker.unsubscribe(challenge_id, queue)
+
+    tasks = [asyncio.create_task(subscriber()) for _ in range(subscribers)]
+    await asyncio.sleep(0)
+    for i in range(events):
+        start = time.perf_counter()
+        broker.publish(challenge_id, {"sentAt": start, "paralelo1Score": i, "paralelo2Score": 0})
+        publish.append(time.perf_counter() - start)
+        # Dejar que los suscriptores consuman antes del siguiente evento
+        await asyncio.sleep(0.001)
+    await asyncio.gather(*tasks)
+
+    print(f"📊 Fan-out en memoria: {events} eventos x {subscribers} suscriptores")
+    print(f"   publish p50: {percentile(publish, 50) * 1000:.3f} ms | p95: {percentile(publish, 95) * 1000:.3f} ms")
+    print(f"   entrega p50: {percentile(delivery, 50) * 1000:.3f} ms | p95: {percentile(delivery, 95) * 1000:.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:3000")
+    parser.add_argument("--mode", choices=["poll", "sse", "broker"], default="sse")
+    parser.add_argument("--students", type=int, default=200, help="estudiantes siguiendo el marcador")
+    parser.add_argument("--players", type=int, default=10, help="participantes que responden")
+    parser.add_argument("--answers", type=int, default=10, help="respuestas por participante")
+    parser.add_argument("--poll-seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    if args.mode == "broker":
+        asyncio.run(broker_fanout(args.students, args.players * args.answers))
+        return
+
+    paralelo1 = ensure_paralelo("Bench Live A")
+    paralelo2 = ensure_paralelo("Bench Live B")
+    half = args.students // 2
+    viewers = (
+        [(s, paralelo1.id) for s in ensure_students(half, prefix="livea", paralelo_id=paralelo1.id)] +
+        [(s, paralelo2.id) for s in ensure_students(args.students - half, prefix="liveb", paralelo_id=paralelo2.id)]
+    )
+    players = viewers[:args.players // 2] + viewers[half:half + args.players - args.players // 2]
+    challenge_id = create_challenge(paralelo1, paralelo2, [(p, paralelo_id) for p, paralelo_id in players], args.answers)
+
+    print(f"🚀 {args.students} estudiantes en modo {args.mode}, {len(players)} participantes x {args.answers} respuestas")
+
+    stop = threading.Event()
+    sent_at, received, poll_latencies = {}, [], []
+    expected = len(players) * args.answers
+    background = ThreadPoolExecutor(max_workers=args.students)
+
+    if args.mode == "sse":
+        connected = threading.Semaphore(0)
+        for viewer, _ in viewers:
+            background.submit(listen, args.base_url, challenge_id, viewer["token"], expected, connected, received, stop)
+        for _ in viewers:
+            connected.acquire()
+        print(f"   {len(viewers)} conexiones abiertas")
+    else:
+        for viewer, _ in viewers:
+            background.submit(poll, args.base_url, viewer["token"], args.poll_seconds, poll_latencies, stop)
+
+    submit_latencies = []
+    with Timer() as timer, ThreadPoolExecutor(max_workers=len(players)) as executor:
+        for result in executor.map(
+            lambda p: play(args.base_url, challenge_id, p[0], args.answers, sent_at), players
+        ):
+            submit_latencies.extend(result)
+
+    if args.mode == "sse":
+        # Esperar a que lleguen los últimos eventos
+        deadline = time.perf_counter() + 10
+        while len(received) < expected * len(viewers) and time.perf_counter() < deadline:
+            time.sleep(0.05)
+    stop.set()
+    background.shutdown(wait=True)
+
+    report("Respuestas de los participantes", submit_latencies, timer.elapsed)
+    if args.mode == "sse":
+        delivery = [
+            at - sent_at[(student_id, completed)]
+            for student_id, completed, at in received
+            if (student_id, completed) in sent_at
+        ]
+        print(f"📊 Entrega de eventos: {len(received)} de {expected * len(viewers)}")
+        print(f"   envío -> recepción p50: {percentile(delivery, 50) * 1000:.1f} ms"
+              f" | p95: {percentile(delivery, 95) * 1000:.1f} ms")
+    else:
+        report("Consultas de la lista de versus", poll_latencies, timer.elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Benchmark de GET /api/student/stats para un estudiante con muchos intentos (50k por defecto):
+latencia p95 y pico de memoria de Python (tracemalloc) para
+- antes: cargar todos los ExerciseAttempt y GameSession como objetos ORM y sumar en Python
+  (lo que hacía el endpoint original)
+- después, sin caché: contadores de student_stats + progreso por tema
+- después, con caché: resumen en caché por versión
+
+Crea los datos la primera vez en la base configurada (DB_*).
+
+    python benchmarks/student_stats.py --attempts 50000 --runs 30
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from common import ensure_students, percentile
+from sqlalchemy import insert
+from app.database import SessionLocal
+from app.models import ExerciseAttempt, GameSession, User
+from app.routers.student import get_student_stats
+from app.services import student_stats
+
+ATTEMPTS_PER_SESSION = 20
+
+
+def seed(student_id, attempts: int):
+    """Insertar el historial del estudiante si aún no lo tiene"""
+    db = SessionLocal()
+    try:
+        existing = db.query(ExerciseAttempt).filter(ExerciseAttempt.student_id == student_id).count()
+        if existing >= attempts:
+            return
+
+        start = datetime.now(timezone.utc) - timedelta(days=365)
+        sessions, rows = [], []
+        for i in range(existing, attempts):
+            if i % ATTEMPTS_PER_SESSION == 0:
+                session_id = uuid.uuid4()
+                sessions.append({
+                    "id": session_id,
+                    "student_id": student_id,
+                    "started_at": start + timedelta(minutes=i),
+                    "total_score": 150,
+                    "exercises_completed": ATTEMPTS_PER_SESSION,
+                    "correct_answers": 15,
+                    "wrong_answers": 5,
+                    "is_active": False
+                })
+            is_correct = i % 4 != 0
+            rows.append({
+                "id": uuid.uuid4(),
+                "student_id": student_id,
+                "game_session_id": session_id,
+                "student_answer": "42",
+                "is_correct": is_correct,
+                "points_earned": 10 if is_correct else 0,
+                "points_lost": 0 if is_correct else 4,
+                "time_taken": 5,
+                "attempted_at": start + timedelta(minutes=i, seconds=1)
+            })
+
+        if sessions:
+            db.execute(insert(GameSession), sessions)
+        for offset in range(0, len(rows), 5000):
+            db.execute(insert(ExerciseAttempt), rows[offset:offset + 5000])
+        db.commit()
+    finally:
+        db.close()
+
+
+def baseline_stats(db, student_id):
+    """Cálculo del endpoint original: todas las filas como objetos ORM"""
+    all_attempts = db.query(ExerciseAttempt).filter(ExerciseAttempt.student_id == student_id).all()
+    sessions = db.query(GameSession).filter(GameSession.student_id == student_id).all()
+    return {
+        "total_attempts": len(all_attempts),
+        "correct_attempts": sum(1 for a in all_attempts if a.is_correct),
+        "total_points": sum(a.points_earned for a in all_attempts),
+        "total_sessions": len(sessions),
+        "total_score": sum(s.total_score for s in sessions),
+        "best_score": max([s.total_score for s in sessions]) if sessions else 0
+    }
+
+
+def measure(title: str, runs: int, call):
+    latencies = []
+    tracemalloc.start()
+    for _ in range(runs):
+        db = SessionLocal()
+        try:
+            start = time.perf_counter()
+            call(db)
+            latencies.append(time.perf_counter() - start)
+        finally:
+            db.close()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"   {title:<22}p50 {percentile(latencies, 50) * 1000:8.1f} ms"
+        f"   p95 {percentile(latencies, 95) * 1000:8.1f} ms"
+        f"   pico {peak / 1024 / 1024:8.1f} MiB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--attempts", type=int, default=50000)
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+
+    student = ensure_students(1, prefix="stats")[0]
+    student_id = student["id"]
+    seed(student_id, args.attempts)
+
+    db = SessionLocal()
+    try:
+        student_stats.backfill(db, [student_id])
+        db.commit()
+        user = db.query(User).filter(User.id == student_id).one()
+        db.expunge(user)
+    finally:
+        db.close()
+
+    def current(db, cached: bool):
+        if not cached:
+            student_stats.summary_cache.invalidate(student_id)
+        asyncio.run(get_student_stats(db=db, current_user=user))
+
+    print(f"🚀 /stats con {args.attempts} intentos, {args.runs} ejecuciones por variante")
+    measure("antes (ORM completo)", args.runs, lambda db: baseline_stats(db, student_id))
+    measure("después, sin caché", args.runs, lambda db: current(db, cached=False))
+    measure("después, con caché", args.runs, lambda db: current(db, cached=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Fixtures de las pruebas. Usan una base PostgreSQL real (el código depende de ON CONFLICT,
+RETURNING y bloqueos de PostgreSQL): por defecto la base mathmaster_test en DB_HOST, o la
+indicada en TEST_DB_NAME. Sus tablas se borran y se vuelven a crear en cada ejecución.
+
+    cd Backend && DB_HOST=localhost python -m pytest -q
+"""
+import asyncio
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Nunca apuntar las pruebas a la base de desarrollo
+os.environ["DB_NAME"] = os.environ.get("TEST_DB_NAME", "mathmaster_test")
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+
+from app import schemas
+from app.database import Base, engine, async_engine, SessionLocal, AsyncSessionLocal
+from app.auth import get_password_hash
+from app.models import (
+    User, UserRole, Paralelo, Enrollment, GameSession, Exercise, ExerciseType, ExerciseDifficulty, MathTopic
+)
+from app.routers.student import submit_answer
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    """Esquema limpio para toda la sesión de pruebas (se omiten si no hay base de datos)"""
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    except OperationalError as e:
+        pytest.skip(f"PostgreSQL de pruebas no disponible: {e.orig}")
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
+    engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def clean_tables():
+    """Vaciar todas las tablas después de cada prueba"""
+    yield
+    tables = ", ".join(table.name for table in Base.metadata.sorted_tables)
+    with engine.begin() as connection:
+        connection.execute(text(f"TRUNCATE {tables} CASCADE"))
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def run_async(coro_factory):
+    """
+    Ejecutar una corrutina que recibe una AsyncSession. Cada llamada usa su propio event loop,
+    así que las conexiones de asyncpg se liberan antes de cerrarlo.
+    """
+    async def _run():
+        try:
+            async with AsyncSessionLocal() as session:
+                return await coro_factory(session)
+        finally:
+            await async_engine.dispose()
+
+    return asyncio.run(_run())
+
+
+@contextmanager
+def count_queries():
+    """Contar las sentencias enviadas a la base (motores síncrono y asíncrono)"""
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engines = (engine, async_engine.sync_engine)
+    for target in engines:
+        event.listen(target, "before_cursor_execute", _record)
+    try:
+        yield statements
+    finally:
+        for target in engines:
+            event.remove(target, "before_cursor_execute", _record)
+
+
+def make_user(db, email: str, role: UserRole = UserRole.student, first_name: str = "Test") -> User:
+    user = User(
+        email=email,
+        password=get_password_hash("test123"),
+        first_name=first_name,
+        last_name="User",
+        role=role,
+        is_active=True
+    )
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+def make_paralelo(db, name: str = "Paralelo A", teacher: User = None) -> Paralelo:
+    paralelo = Paralelo(name=name, level="1", teacher_id=teacher.id if teacher else None, is_active=True)
+    db.add(paralelo)
+    db.commit()
+    db.refresh(paralelo)
+    return paralelo
+
+
+def enroll(db, student: User, paralelo: Paralelo) -> Enrollment:
+    enrollment = Enrollment(student_id=student.id, paralelo_id=paralelo.id, is_active=True)
+    db.add(enrollment)
+    db.commit()
+    return enrollment
+
+
+def setup_game(db, email: str = "student@test.local"):
+    """Estudiante inscrito con una sesión de juego activa y 4 ejercicios de práctica"""
+    student = make_user(db, email)
+    paralelo = make_paralelo(db)
+    enroll(db, student, paralelo)
+
+    session = GameSession(
+        student_id=student.id,
+        paralelo_id=paralelo.id,
+        started_at=datetime.now(timezone.utc),
+        is_active=True
+    )
+    db.add(session)
+    exercises = [
+        Exercise(
+            title="Suma",
+            question=f"¿Cuánto es {i} + 1?",
+            exercise_type=ExerciseType.multiple_choice,
+            difficulty=ExerciseDifficulty.easy,
+            topic=MathTopic.operations,
+            correct_answer=str(i + 1),
+            options="[]",
+            points=10,
+            is_practice=True,
+            is_active=True
+        )
+        for i in range(4)
+    ]
+    db.add_all(exercises)
+    db.commit()
+    db.refresh(student)
+    db.expunge(student)
+    return student, session.id, [exercise.id for exercise in exercises]
+
+
+def submit_game_answer(student, session_id, exercise_id, answer):
+    request = schemas.SubmitAnswerRequest(session_id=session_id, exercise_id=exercise_id, answer=answer, time_taken=4)
+    return run_async(lambda session: submit_answer(request=request, db=session, current_user=student))
@@ -0,0 +1,146 @@
+"""Respuestas de versus: solo el siguiente ejercicio del conjunto fijo cuenta, una vez"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from sqlalchemy import func
+
+from conftest import count_queries, make_user, make_paralelo, enroll
+from app import schemas
+from app.database import SessionLocal
+from app.models import Challenge, ChallengeParticipant, ChallengeStatus, Exercise, ExerciseAttempt, MathTopic, UserRole
+from app.routers.student import submit_challenge_answer
+from app.services import challenge_exercises
+from upgrade_schema import exercise_challenge_sets
+
+
+def start_challenge(db, num_exercises: int = 3, title: str = "Versus", with_set: bool = True) -> Challenge:
+    teacher = make_user(db, f"docente-{title}@test.local", role=UserRole.teacher)
+    paralelo1 = make_paralelo(db, f"{title} A", teacher)
+    paralelo2 = make_paralelo(db, f"{title} B", teacher)
+    challenge = Challenge(
+        teacher_id=teacher.id,
+        paralelo1_id=paralelo1.id,
+        paralelo2_id=paralelo2.id,
+        title=title,
+        topic=MathTopic.operations,
+        num_exercises=num_exercises,
+        status=ChallengeStatus.active,
+        start_time=datetime.now(timezone.utc)
+    )
+    db.add(challenge)
+    db.flush()
+    if with_set:
+        challenge_exercises.generate_set(db, challenge)
+    db.commit()
+    return challenge
+
+
+def join(db, challenge: Challenge, email: str):
+    student = make_user(db, email)
+    enroll(db, student, challenge.paralelo1)
+    participant = ChallengeParticipant(
+        challenge_id=challenge.id, student_id=student.id, paralelo_id=challenge.paralelo1_id
+    )
+    db.add(participant)
+    db.commit()
+    db.refresh(student)
+    return student
+
+
+def submit(db, challenge_id, student, exercise, correct: bool = True):
+    request = schemas.SubmitChallengeAnswerRequest(
+        exercise_id=exercise["id"],
+        answer=exercise["correct_answer"] if correct else "x",
+        time_taken=5
+    )
+    return asyncio.run(submit_challenge_answer(challenge_id, request, db=db, current_user=student))
+
+
+def test_only_the_next_exercise_of_the_set_is_accepted(db):
+    challenge = start_challenge(db)
+    other = start_challenge(db, title="Otro")
+    student = join(db, challenge, "ana@test.local")
+    first, second, _ = (challenge_exercises.get_exercise(db, challenge, index) for index in range(3))
+    foreign = challenge_exercises.get_exercise(db, other, 0)
+    challenge_id = challenge.id
+
+    # Un ejercicio posterior o de otro versus no cuenta
+    for exercise in (second, foreign):
+        with pytest.raises(HTTPException) as error:
+            submit(db, challenge_id, student, exercise)
+        assert error.value.status_code == 400
+
+    response = submit(db, challenge_id, student, first)
+    assert response.data["exercises_completed"] == 1
+
+    # Reenviar el mismo ejercicio ya no suma
+    with pytest.raises(HTTPException) as error:
+        submit(db, challenge_id, student, first)
+    assert error.value.status_code == 400
+
+    response = submit(db, challenge_id, student, second, correct=False)
+    assert response.data["exercises_completed"] == 2
+    assert db.query(ExerciseAttempt).count() == 2
+
+
+def test_concurrent_duplicate_submits_count_once(db):
+    num_exercises, copies = 4, 3
+    challenge = start_challenge(db, num_exercises)
+    students = [join(db, challenge, f"estudiante{i}@test.local") for i in range(30)]
+    exercises = [challenge_exercises.get_exercise(db, challenge, index) for index in range(num_exercises)]
+    challenge_id = challenge.id
+    for student in students:
+        db.refresh(student)
+        db.expunge(student)
+
+    def submit_copy(student, exercise):
+        session = SessionLocal()
+        try:
+            submit(session, challenge_id, student, exercise)
+            return 200
+        except HTTPException as e:
+            return e.status_code
+        finally:
+            session.close()
+
+    # Cada ronda envía varias copias simultáneas de la misma respuesta por estudiante
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        for exercise in exercises:
+            statuses = list(pool.map(
+                lambda args: submit_copy(*args),
+                [(student, exercise) for student in students for _ in range(copies)]
+            ))
+            assert statuses.count(200) == len(students)
+            assert set(statuses) <= {200, 400, 409}
+
+    db.expire_all()
+    participants = db.query(ChallengeParticipant).all()
+    assert all(p.exercises_completed == num_exercises and p.has_finished for p in participants)
+    assert all(p.correct_answers == num_exercises and p.wrong_answers == 0 for p in participants)
+    assert db.query(ExerciseAttempt).count() == len(students) * num_exercises
+
+    # El puntaje del paralelo coincide con la suma de sus participantes y de sus intentos
+    challenge = db.query(Challenge).filter(Challenge.id == challenge_id).one()
+    assert challenge.paralelo1_score == sum(p.score for p in participants)
+    assert challenge.paralelo1_score == db.query(func.sum(ExerciseAttempt.points_earned)).scalar()
+
+
+def test_missing_sets_are_generated_by_the_upgrade_not_on_read(db):
+    # Versus iniciado antes de existir los conjuntos fijos
+    challenge = start_challenge(db, with_set=False)
+
+    with count_queries() as statements:
+        assert challenge_exercises.get_exercise(db, challenge, 0) is None
+    assert all(statement.lstrip().upper().startswith("SELECT") for statement in statements)
+
+    exercise_challenge_sets(db)
+    db.commit()
+    exercise_challenge_sets(db)
+    db.commit()
+
+    assert db.query(Exercise).filter(Exercise.challenge_id == challenge.id).count() == 3
+    assert challenge_exercises.get_exercise(db, challenge, 2) is not None
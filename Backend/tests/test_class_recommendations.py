@@ -0,0 +1,47 @@
+"""Recomendaciones de clase: una consulta agrupada, caché por paralelo e invalidación al responder"""
+from conftest import count_queries, make_user, enroll, setup_game, submit_game_answer
+from app.ai_recommendations import AIRecommendations
+from app.models import Enrollment, MathTopic, Paralelo, StudentTopicProgress
+
+
+def _progress(db, student_id, topic: MathTopic, mastery: int, attempts: int, correct: int):
+    db.add(StudentTopicProgress(
+        student_id=student_id,
+        topic=topic,
+        total_attempts=attempts,
+        correct_attempts=correct,
+        wrong_attempts=attempts - correct,
+        mastery_level=mastery
+    ))
+    db.commit()
+
+
+def test_grouped_query_cache_and_invalidation(db):
+    student, session_id, exercise_ids = setup_game(db)
+    paralelo = db.query(Paralelo).join(Enrollment).filter(Enrollment.student_id == student.id).one()
+    classmates = [make_user(db, f"companero{i}@test.local") for i in range(5)]
+    for classmate in classmates:
+        enroll(db, classmate, paralelo)
+        _progress(db, classmate.id, MathTopic.operations, 10, 20, 4)
+        _progress(db, classmate.id, MathTopic.linear_equations, 90, 20, 19)
+    paralelo_id = str(paralelo.id)
+
+    # Estudiantes del paralelo + una consulta agrupada para todos los temas
+    with count_queries() as statements:
+        result = AIRecommendations.generate_class_recommendations(paralelo_id, db)
+    assert len(statements) == 2
+    assert [topic["topic"] for topic in result["weak_topics"]] == ["operations"]
+    assert [topic["topic"] for topic in result["strong_topics"]] == ["linear_equations"]
+    assert result["average_mastery"] == 50.0
+
+    # Segunda lectura desde la caché
+    with count_queries() as statements:
+        assert AIRecommendations.generate_class_recommendations(paralelo_id, db) == result
+    assert statements == []
+
+    # Responder escribe el progreso por tema del estudiante e invalida su paralelo
+    submit_game_answer(student, session_id, exercise_ids[0], "1")
+    with count_queries() as statements:
+        refreshed = AIRecommendations.generate_class_recommendations(paralelo_id, db)
+    assert len(statements) == 2
+    assert refreshed["average_mastery"] != result["average_mastery"]
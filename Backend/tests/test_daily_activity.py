@@ -0,0 +1,87 @@
+"""Rollups diarios: reconstrucción concurrente y ventana semanal del ranking"""
+import asyncio
+import threading
+from datetime import datetime, timedelta, timezone
+
+from conftest import make_user, make_paralelo, enroll
+from app.database import SessionLocal
+from app.models import GameSession, StudentDailyActivity, UserRole
+from app.routers.teacher import get_teacher_ranking
+from app.services import daily_activity
+
+
+def test_backfill_keeps_increments_of_in_flight_answers(db):
+    student = make_user(db, "ana@test.local")
+    paralelo = make_paralelo(db)
+    today = datetime.now(timezone.utc).date()
+    session = GameSession(
+        student_id=student.id,
+        paralelo_id=paralelo.id,
+        started_at=datetime.now(timezone.utc),
+        exercises_completed=2,
+        correct_answers=2,
+        is_active=True
+    )
+    db.add(session)
+    db.commit()
+    daily_activity.backfill(db)
+    student_id, paralelo_id, session_id = student.id, paralelo.id, session.id
+
+    # Respuesta en curso: ya sumó en el rollup pero aún no confirma
+    upserted = threading.Event()
+
+    def answer():
+        answer_db = SessionLocal()
+        try:
+            daily_activity.record_answer(answer_db, student_id, paralelo_id, today, True, 10)
+            answer_db.query(GameSession).filter(GameSession.id == session_id).update({
+                GameSession.exercises_completed: GameSession.exercises_completed + 1,
+                GameSession.correct_answers: GameSession.correct_answers + 1,
+                GameSession.total_score: GameSession.total_score + 10
+            })
+            upserted.set()
+            threading.Event().wait(0.5)
+            answer_db.commit()
+        finally:
+            answer_db.close()
+
+    thread = threading.Thread(target=answer)
+    thread.start()
+    upserted.wait(5)
+
+    rebuild_db = SessionLocal()
+    try:
+        daily_activity.backfill(rebuild_db)
+    finally:
+        rebuild_db.close()
+    thread.join()
+
+    db.expire_all()
+    row = db.query(StudentDailyActivity).one()
+    assert (row.exercises_completed, row.correct_answers, row.score) == (3, 3, 10)
+
+
+def test_teacher_week_ranking_covers_seven_days(db):
+    teacher = make_user(db, "docente@test.local", role=UserRole.teacher)
+    paralelo = make_paralelo(db, teacher=teacher)
+    student = make_user(db, "ana@test.local")
+    enroll(db, student, paralelo)
+    today = datetime.now(timezone.utc).date()
+
+    # Hoy y 6 días atrás entran en la semana; 7 días atrás ya no
+    for days_ago, score in ((0, 1), (6, 10), (7, 100)):
+        db.add(StudentDailyActivity(
+            student_id=student.id,
+            paralelo_id=paralelo.id,
+            day=today - timedelta(days=days_ago),
+            sessions_count=1,
+            exercises_completed=1,
+            correct_answers=1,
+            wrong_answers=0,
+            score=score
+        ))
+    db.commit()
+
+    response = asyncio.run(get_teacher_ranking(period="week", db=db, current_user=teacher))
+
+    assert response.data["ranking"][0]["totalScore"] == 11
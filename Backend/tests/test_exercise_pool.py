@@ -0,0 +1,45 @@
+"""Pool de ejercicios: filas insertadas al rellenar, servir no escribe y limpieza de las no usadas"""
+from datetime import datetime, timedelta, timezone
+
+from conftest import count_queries, setup_game, submit_game_answer
+from app.exercise_generator import ExerciseGenerator
+from app.models import Exercise, ExerciseDifficulty, MathTopic
+from app.services.exercise_pool import ExercisePool, cleanup_pooled_exercises
+
+
+def test_refill_inserts_rows_and_pop_does_not_write(db):
+    pool = ExercisePool(is_practice=True, size=4, refill_threshold=1, max_age_seconds=60)
+    # Registrar las colas de dos bandas de puntaje distintas y rellenarlas
+    assert pool.pop(MathTopic.operations, ExerciseDifficulty.easy, 0) is None
+    assert pool.pop(MathTopic.operations, ExerciseDifficulty.easy, 550) is None
+    pool._refill()
+    assert db.query(Exercise).count() == 8
+
+    with count_queries() as statements:
+        low = pool.pop(MathTopic.operations, ExerciseDifficulty.easy, 50)
+        high = pool.pop(MathTopic.operations, ExerciseDifficulty.easy, 550)
+    assert statements == []
+
+    # Mismos puntos que un ejercicio generado en línea con ese puntaje
+    assert low["points"] == ExerciseGenerator.exercise_points(ExerciseDifficulty.easy, 50)
+    assert high["points"] == ExerciseGenerator.exercise_points(ExerciseDifficulty.easy, 550)
+    assert db.query(Exercise).filter(Exercise.id == high["id"]).one().points == high["points"]
+
+    # Vencida la antigüedad máxima la cola ya no sirve sus ejercicios
+    pool.max_age_seconds = -1
+    assert pool.pop(MathTopic.operations, ExerciseDifficulty.easy, 50) is None
+
+
+def test_cleanup_removes_only_old_unanswered_pool_rows(db):
+    student, session_id, exercise_ids = setup_game(db)
+    submit_game_answer(student, session_id, exercise_ids[0], "1")
+    old = datetime.now(timezone.utc) - timedelta(days=1)
+    db.query(Exercise).filter(Exercise.id.in_(exercise_ids[:3])).update(
+        {Exercise.created_at: old}, synchronize_session=False
+    )
+    db.commit()
+
+    # El respondido y el reciente se conservan
+    assert cleanup_pooled_exercises(db) == 2
+    db.commit()
+    assert sorted(e.id for e in db.query(Exercise).all()) == sorted([exercise_ids[0], exercise_ids[3]])
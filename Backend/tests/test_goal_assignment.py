@@ -0,0 +1,57 @@
+"""Asignación masiva de metas: una fila por (meta, estudiante)"""
+from datetime import datetime, timedelta, timezone
+
+from conftest import make_user, make_paralelo, enroll
+from app.models import Goal, GoalType, StudentGoal, UserRole
+from app.services import goal_assignment
+
+
+def make_goal(db, teacher, paralelo=None) -> Goal:
+    now = datetime.now(timezone.utc)
+    goal = Goal(
+        teacher_id=teacher.id,
+        paralelo_id=paralelo.id if paralelo else None,
+        title="Meta",
+        goal_type=GoalType.exercises,
+        target_value=10,
+        start_date=now,
+        end_date=now + timedelta(days=7),
+        is_active=True
+    )
+    db.add(goal)
+    db.commit()
+    return goal
+
+
+def test_general_goal_is_assigned_once_per_student(db):
+    teacher = make_user(db, "docente@test.local", role=UserRole.teacher)
+    paralelo_a = make_paralelo(db, "A", teacher)
+    paralelo_b = make_paralelo(db, "B", teacher)
+    ana = make_user(db, "ana@test.local")
+    luis = make_user(db, "luis@test.local")
+    enroll(db, ana, paralelo_a)
+    enroll(db, ana, paralelo_b)
+    enroll(db, luis, paralelo_b)
+    goal = make_goal(db, teacher)
+
+    # Ana está en los dos paralelos del profesor
+    assert goal_assignment.assign_goal(db, goal) == 2
+    assert goal_assignment.assign_goal(db, goal) == 0
+    db.commit()
+
+    assigned = sorted(row.student_id for row in db.query(StudentGoal).all())
+    assert assigned == sorted([ana.id, luis.id])
+
+
+def test_new_enrollment_gets_paralelo_and_general_goals(db):
+    teacher = make_user(db, "docente@test.local", role=UserRole.teacher)
+    paralelo = make_paralelo(db, "A", teacher)
+    other = make_paralelo(db, "B", teacher)
+    make_goal(db, teacher, paralelo)
+    make_goal(db, teacher)
+    make_goal(db, teacher, other)
+    ana = make_user(db, "ana@test.local")
+    enroll(db, ana, paralelo)
+
+    assert goal_assignment.assign_goals_to_students(db, paralelo.id, [ana.id]) == 2
+    assert goal_assignment.assign_goals_to_students(db, paralelo.id, [ana.id]) == 0
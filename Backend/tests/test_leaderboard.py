@@ -0,0 +1,59 @@
+"""Tabla de posiciones materializada: relleno en bloque y lectura sin escrituras"""
+from datetime import datetime, timezone
+
+from conftest import count_queries, make_user, make_paralelo, enroll
+from app.models import GameSession, ParaleloLeaderboard
+from app.services import leaderboard
+
+
+def _play(db, student, paralelo, score, exercises, correct):
+    db.add(GameSession(
+        student_id=student.id,
+        paralelo_id=paralelo.id,
+        started_at=datetime.now(timezone.utc),
+        total_score=score,
+        exercises_completed=exercises,
+        correct_answers=correct,
+        is_active=False
+    ))
+    db.commit()
+
+
+def test_backfill_creates_missing_rows_from_history(db):
+    paralelo = make_paralelo(db)
+    ana = make_user(db, "ana@test.local")
+    luis = make_user(db, "luis@test.local")
+    for student in (ana, luis):
+        enroll(db, student, paralelo)
+    _play(db, ana, paralelo, 30, 5, 3)
+    _play(db, ana, paralelo, 20, 4, 4)
+
+    assert leaderboard.backfill(db) == 2
+    db.commit()
+
+    rows = {row.student_id: row for row in db.query(ParaleloLeaderboard).all()}
+    assert (rows[ana.id].total_score, rows[ana.id].exercises_completed, rows[ana.id].correct_answers) == (50, 9, 7)
+    assert rows[luis.id].total_score == 0
+
+    # Idempotente: las filas existentes no se tocan
+    assert leaderboard.backfill(db) == 0
+
+
+def test_ranking_read_does_not_write(db):
+    paralelo = make_paralelo(db)
+    ana = make_user(db, "ana@test.local")
+    luis = make_user(db, "luis@test.local")
+    enroll(db, ana, paralelo)
+    enroll(db, luis, paralelo)
+    _play(db, luis, paralelo, 40, 4, 4)
+    leaderboard.backfill(db, paralelo.id, [luis.id])
+    db.commit()
+    paralelo_id, ana_id, luis_id = paralelo.id, ana.id, luis.id
+
+    with count_queries() as statements:
+        rows = leaderboard.get_paralelo_leaderboard(db, paralelo_id)
+
+    assert len(statements) == 1
+    assert statements[0].lstrip().upper().startswith("SELECT")
+    # Ana aún no tiene fila: aparece con 0 detrás de Luis
+    assert [(row.student_id, row.total_score) for row in rows] == [(luis_id, 40), (ana_id, 0)]
@@ -0,0 +1,86 @@
+"""Snapshots de desempeño: refresco coordinado por el planificador, lectura sin escrituras y ventana semanal"""
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+
+from conftest import count_queries, make_user, make_paralelo, enroll
+from app.database import engine
+from app.models import PerformanceSnapshot, StudentDailyActivity
+from app.services import performance_snapshots
+from app.services.scheduler import Scheduler, _lock_key
+
+
+def _activity(db, student, paralelo, days_ago: int, score: int):
+    db.add(StudentDailyActivity(
+        student_id=student.id,
+        paralelo_id=paralelo.id,
+        day=datetime.now(timezone.utc).date() - timedelta(days=days_ago),
+        sessions_count=1,
+        exercises_completed=1,
+        correct_answers=1,
+        wrong_answers=0,
+        score=score
+    ))
+    db.commit()
+
+
+def test_refresh_runs_only_in_the_worker_holding_the_lock(db):
+    student = make_user(db, "ana@test.local")
+    paralelo = make_paralelo(db)
+    enroll(db, student, paralelo)
+    _activity(db, student, paralelo, 0, 10)
+    scheduler = Scheduler(tick_seconds=1)
+
+    # Otro worker está ejecutando la tarea: este no reconstruye nada
+    with engine.connect() as other_worker:
+        with other_worker.begin():
+            other_worker.execute(select(func.pg_advisory_xact_lock(_lock_key("refresh_performance_snapshots"))))
+            scheduler._run_due()
+            assert db.query(PerformanceSnapshot).count() == 0
+
+    scheduler._run_due()
+    periods = {snapshot.period for snapshot in db.query(PerformanceSnapshot).all()}
+    assert periods == set(performance_snapshots.PERIODS)
+
+
+def test_read_never_writes_and_flags_stale_snapshots(db):
+    student = make_user(db, "ana@test.local")
+    paralelo = make_paralelo(db)
+    enroll(db, student, paralelo)
+    _activity(db, student, paralelo, 0, 10)
+    paralelo_id = paralelo.id
+
+    # Sin snapshot se calcula sin guardarlo
+    with count_queries() as statements:
+        payload = performance_snapshots.get_performance(db, paralelo_id, "week")
+    assert all(statement.lstrip().upper().startswith("SELECT") for statement in statements)
+    assert payload["isStale"] is False and payload["topStudents"][0]["score"] == 10
+    assert db.query(PerformanceSnapshot).count() == 0
+
+    Scheduler(tick_seconds=1)._run_due()
+    assert performance_snapshots.get_performance(db, paralelo_id, "week")["isStale"] is False
+
+    # Un snapshot vencido se sirve marcado y el planificador lo reconstruye
+    db.query(PerformanceSnapshot).update({PerformanceSnapshot.computed_at: datetime.now(timezone.utc) - timedelta(days=1)})
+    db.commit()
+    with count_queries() as statements:
+        assert performance_snapshots.get_performance(db, paralelo_id, "week")["isStale"] is True
+    assert len(statements) == 1
+    assert performance_snapshots.refresh_active_snapshots(db) == 1
+    db.commit()
+    assert performance_snapshots.get_performance(db, paralelo_id, "week")["isStale"] is False
+
+
+def test_week_covers_seven_days(db):
+    student = make_user(db, "ana@test.local")
+    paralelo = make_paralelo(db)
+    enroll(db, student, paralelo)
+
+    # Hoy y 6 días atrás entran en la semana; 7 días atrás ya no
+    for days_ago, score in ((0, 1), (6, 10), (7, 100)):
+        _activity(db, student, paralelo, days_ago, score)
+
+    payload = performance_snapshots.build_performance(db, paralelo.id, "week")
+
+    assert payload["topStudents"][0]["score"] == 11
+    assert payload["general"]["totalExercises"] == 2
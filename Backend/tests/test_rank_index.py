@@ -0,0 +1,26 @@
+"""Índice de posiciones: un estudiante nuevo sin puntos aparece último en el ranking global"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from conftest import make_user, setup_game, submit_game_answer
+from app.routers.student import get_my_rank
+from app.services.rank_index import rank_index
+
+
+def test_new_student_without_score_gets_bottom_global_rank(db):
+    student, session_id, exercise_ids = setup_game(db)
+    submit_game_answer(student, session_id, exercise_ids[0], "1")
+    rank_index._rebuild()
+
+    # Registrado después de reconstruir el índice y sin inscripciones ni puntos
+    newcomer = make_user(db, "nuevo@test.local")
+
+    response = asyncio.run(get_my_rank(scope="global", db=db, current_user=newcomer))
+    assert response.data == {"rank": 2, "total_score": 0, "total_students": 2, "paralelo_id": None}
+
+    # En el ranking de un paralelo sigue sin aparecer
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(get_my_rank(scope="paralelo", db=db, current_user=newcomer))
+    assert error.value.status_code == 404
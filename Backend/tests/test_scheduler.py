@@ -0,0 +1,45 @@
+"""Planificador: una tarea que falla deshace solo su SAVEPOINT y guarda el error con el lock tomado"""
+from datetime import datetime, timezone
+
+from sqlalchemy import event, text
+
+from conftest import make_user
+from app.database import SessionLocal
+from app.models import ScheduledJob, User
+from app.services.scheduler import Scheduler, _lock_key
+
+
+def test_failed_job_rolls_back_its_work_and_keeps_the_lock(db):
+    make_user(db, "ana@test.local")
+    db.add(ScheduledJob(name="falla", interval_seconds=60, next_run_at=datetime.now(timezone.utc)))
+    db.commit()
+
+    def failing_job(session):
+        session.query(User).update({User.first_name: "Cambiado"})
+        raise RuntimeError("falla de prueba")
+
+    # Al guardar el error, otra conexión todavía no puede tomar el lock de la tarea
+    lock_free_at_commit = []
+
+    def try_lock(session):
+        other = SessionLocal()
+        try:
+            lock_free_at_commit.append(other.execute(
+                text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": _lock_key("falla")}
+            ).scalar())
+        finally:
+            other.close()
+
+    session = SessionLocal()
+    event.listen(session, "before_commit", try_lock)
+    try:
+        Scheduler._run_job(session, "falla", 60, failing_job)
+    finally:
+        session.close()
+
+    assert lock_free_at_commit == [False]
+    db.expire_all()
+    assert db.query(User).one().first_name == "Test"
+    job = db.query(ScheduledJob).one()
+    assert job.last_error == "falla de prueba"
+    assert job.last_run_at is not None
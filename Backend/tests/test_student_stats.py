@@ -0,0 +1,64 @@
+"""Contadores por estudiante: relleno desde el historial y /stats sin escrituras"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from conftest import count_queries, make_user
+from app.models import ExerciseAttempt, GameSession, StudentStats
+from app.routers.student import get_student_stats
+from app.services import student_stats
+
+
+def _history(db, student, answers):
+    start = datetime.now(timezone.utc) - timedelta(hours=1)
+    session = GameSession(student_id=student.id, started_at=start, total_score=25, is_active=False)
+    db.add(session)
+    db.flush()
+    for i, is_correct in enumerate(answers):
+        db.add(ExerciseAttempt(
+            student_id=student.id,
+            game_session_id=session.id,
+            student_answer="x",
+            is_correct=is_correct,
+            points_earned=10 if is_correct else 0,
+            attempted_at=start + timedelta(seconds=i)
+        ))
+    db.commit()
+
+
+def test_backfill_rebuilds_counters_and_streaks(db):
+    ana = make_user(db, "ana@test.local")
+    luis = make_user(db, "luis@test.local")
+    _history(db, ana, [True, True, False, True, True, True])
+    _history(db, luis, [True, True, True, False])
+
+    assert student_stats.backfill(db) == 2
+    db.commit()
+
+    stats = {row.student_id: row for row in db.query(StudentStats).all()}
+    assert (stats[ana.id].total_attempts, stats[ana.id].correct_attempts, stats[ana.id].points_earned) == (6, 5, 50)
+    assert (stats[ana.id].best_streak, stats[ana.id].current_streak) == (3, 3)
+    assert (stats[luis.id].best_streak, stats[luis.id].current_streak) == (3, 0)
+    assert (stats[luis.id].total_sessions, stats[luis.id].total_score, stats[luis.id].best_score) == (1, 25, 25)
+
+    assert student_stats.backfill(db) == 0
+
+
+def test_stats_endpoint_does_not_write(db):
+    student = make_user(db, "ana@test.local")
+    newcomer = make_user(db, "luis@test.local")
+    _history(db, student, [True, False])
+    student_stats.backfill(db, [student.id])
+    db.commit()
+    for user in (student, newcomer):
+        db.refresh(user)
+        db.expunge(user)
+
+    with count_queries() as statements:
+        response = asyncio.run(get_student_stats(db=db, current_user=student))
+        empty = asyncio.run(get_student_stats(db=db, current_user=newcomer))
+
+    assert all(statement.lstrip().upper().startswith("SELECT") for statement in statements)
+    assert (response.data["general"]["total_attempts"], response.data["general"]["correct_attempts"]) == (2, 1)
+    # Sin fila de contadores: ceros y ninguna fila creada
+    assert empty.data["general"]["total_attempts"] == 0
+    assert db.query(StudentStats).count() == 1
@@ -0,0 +1,34 @@
+"""Ingesta de respuestas: una transacción con un presupuesto fijo de consultas"""
+from conftest import count_queries, setup_game, submit_game_answer
+from app.models import StudentTopicProgress
+
+# Sentencias por respuesta en una sesión con paralelo: sesión + ejercicio, contadores,
+# leaderboard, dos rollups diarios, progreso por tema, metas, sesión e intento
+SUBMIT_QUERY_BUDGET = 9
+
+
+def test_submit_answer_stays_within_query_budget(db):
+    student, session_id, exercise_ids = setup_game(db)
+
+    # El primer intento inserta el progreso por tema; los siguientes lo actualizan
+    submit_game_answer(student, session_id, exercise_ids[0], "1")
+
+    with count_queries() as statements:
+        response = submit_game_answer(student, session_id, exercise_ids[1], "2")
+
+    assert response.success
+    assert response.data["is_correct"] is True
+    assert len(statements) <= SUBMIT_QUERY_BUDGET, "\n\n".join(statements)
+
+
+def test_submit_answer_upserts_topic_progress(db):
+    student, session_id, exercise_ids = setup_game(db)
+
+    for exercise_id, answer in zip(exercise_ids, ["1", "2", "0", "4"]):
+        submit_game_answer(student, session_id, exercise_id, answer)
+
+    progress = db.query(StudentTopicProgress).filter(StudentTopicProgress.student_id == student.id).all()
+    assert len(progress) == 1
+    assert (progress[0].total_attempts, progress[0].correct_attempts, progress[0].wrong_attempts) == (4, 3, 1)
+    # floor(min(4 / 20, 1) * 3 / 4 * 100) = 15
+    assert progress[0].mastery_level == 15
@@ -0,0 +1,83 @@
+"""Resumen de paralelos y ranking del profesor: consultas agrupadas y rollups tras actualizar"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from conftest import count_queries, make_user, make_paralelo, enroll
+from app.models import GameSession, StudentDailyActivity, UserRole
+from app.routers.teacher import get_my_paralelos, get_teacher_ranking
+from upgrade_schema import upgrade_schema
+
+
+def _paralelo_with_activity(db, teacher, index: int):
+    paralelo = make_paralelo(db, f"Paralelo {index}", teacher)
+    active = make_user(db, f"activo{index}@test.local")
+    idle = make_user(db, f"inactivo{index}@test.local")
+    enroll(db, active, paralelo)
+    enroll(db, idle, paralelo)
+    db.add(StudentDailyActivity(
+        student_id=active.id,
+        paralelo_id=paralelo.id,
+        day=datetime.now(timezone.utc).date(),
+        sessions_count=2,
+        exercises_completed=10,
+        correct_answers=8,
+        wrong_answers=2,
+        score=80
+    ))
+    db.commit()
+
+
+def _overview(db, teacher):
+    with count_queries() as statements:
+        response = asyncio.run(get_my_paralelos(db=db, current_user=teacher))
+    return response.data, len(statements)
+
+
+def test_query_count_does_not_grow_with_paralelos(db):
+    teacher = make_user(db, "docente@test.local", role=UserRole.teacher)
+    _paralelo_with_activity(db, teacher, 0)
+    db.refresh(teacher)
+
+    data, single = _overview(db, teacher)
+    assert len(data) == 1
+
+    for index in range(1, 6):
+        _paralelo_with_activity(db, teacher, index)
+    db.refresh(teacher)
+
+    data, many = _overview(db, teacher)
+    assert len(data) == 6
+    assert single == many == 2
+
+    for paralelo in data:
+        assert paralelo["activeStudents"] == 2
+        assert (paralelo["totalSessions"], paralelo["totalExercises"]) == (2, 10)
+        assert paralelo["avgAccuracy"] == 80.0
+        assert paralelo["progress"] == 50.0
+
+
+def test_upgrade_script_rebuilds_rollups_for_historical_sessions(db):
+    teacher = make_user(db, "docente@test.local", role=UserRole.teacher)
+    paralelo = make_paralelo(db, teacher=teacher)
+    student = make_user(db, "ana@test.local")
+    enroll(db, student, paralelo)
+    # Sesión anterior a los rollups: no tiene filas en student_daily_activity
+    db.add(GameSession(
+        student_id=student.id,
+        paralelo_id=paralelo.id,
+        started_at=datetime.now(timezone.utc) - timedelta(days=40),
+        exercises_completed=5,
+        correct_answers=4,
+        wrong_answers=1,
+        total_score=40,
+        is_active=False
+    ))
+    db.commit()
+
+    upgrade_schema()
+
+    db.refresh(teacher)
+    ranking = asyncio.run(get_teacher_ranking(db=db, current_user=teacher)).data["ranking"]
+    assert (ranking[0]["totalScore"], ranking[0]["exercisesCompleted"]) == (40, 5)
+    overview, _ = _overview(db, teacher)
+    assert (overview[0]["totalSessions"], overview[0]["totalExercises"]) == (1, 5)
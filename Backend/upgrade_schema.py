@@ -0,0 +1,186 @@
+"""
+Script para actualizar una base de datos existente al esquema actual.
+Base.metadata.create_all solo crea las tablas que faltan; las columnas y restricciones
+nuevas en tablas existentes se agregan aquí. Cada paso es idempotente.
+"""
+import sys
+import os
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+from app.database import SessionLocal, engine, Base
+import app.models  # noqa: F401 (registra todos los modelos en Base.metadata)
+from app.services import challenge_exercises, daily_activity
+
+
+def _add_unique_constraint(db, table: str, name: str, columns: str):
+    """Crear la restricción única si todavía no existe"""
+    exists = db.execute(
+        text("SELECT 1 FROM pg_constraint WHERE conname = :name AND conrelid = CAST(:table AS regclass)"),
+        {"name": name, "table": table}
+    ).first()
+    if not exists:
+        db.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE ({columns})"))
+
+
+def exercise_attempts_inline_exercise(db):
+    """Intentos con los datos del ejercicio en línea (modo sin estado)"""
+    db.execute(text("ALTER TABLE exercise_attempts ALTER COLUMN exercise_id DROP NOT NULL"))
+    db.execute(text("ALTER TABLE exercise_attempts ADD COLUMN IF NOT EXISTS topic mathtopic"))
+    db.execute(text("ALTER TABLE exercise_attempts ADD COLUMN IF NOT EXISTS difficulty exercisedifficulty"))
+    db.execute(text("ALTER TABLE exercise_attempts ADD COLUMN IF NOT EXISTS question TEXT"))
+    db.execute(text("ALTER TABLE exercise_attempts ADD COLUMN IF NOT EXISTS correct_answer TEXT"))
+
+    # Intentos anteriores: tema y dificultad desde su ejercicio
+    db.execute(text("""
+        UPDATE exercise_attempts a
+        SET topic = e.topic, difficulty = e.difficulty
+        FROM exercises e
+        WHERE a.exercise_id = e.id AND a.topic IS NULL
+    """))
+
+
+def unique_student_topic_progress(db):
+    """Progreso por tema único por (estudiante, tema) para el UPSERT"""
+    # Las filas duplicadas (carreras del SELECT + INSERT anterior) se fusionan en la más
+    # antigua sumando sus contadores y recalculando el dominio con la fórmula del UPSERT
+    db.execute(text("""
+        WITH dup AS (
+            SELECT student_id, topic,
+                   (array_agg(id ORDER BY created_at, id))[1] AS keep_id,
+                   sum(coalesce(total_attempts, 0)) AS total,
+                   sum(coalesce(correct_attempts, 0)) AS correct,
+                   sum(coalesce(wrong_attempts, 0)) AS wrong,
+                   max(last_practiced) AS last_practiced
+            FROM student_topic_progress
+            GROUP BY student_id, topic
+            HAVING count(*) > 1
+        ), merged AS (
+            UPDATE student_topic_progress p
+            SET total_attempts = d.total,
+                correct_attempts = d.correct,
+                wrong_attempts = d.wrong,
+                mastery_level = CASE WHEN d.total > 0
+                    THEN floor(least(d.total / 20.0, 1.0) * d.correct * 100.0 / d.total) ELSE 0 END,
+                needs_improvement = d.total = 0
+                    OR floor(least(d.total / 20.0, 1.0) * d.correct * 100.0 / d.total) < 50
+                    OR d.correct * 100.0 / d.total < 60,
+                last_practiced = d.last_practiced,
+                updated_at = now()
+            FROM dup d
+            WHERE p.id = d.keep_id
+        )
+        DELETE FROM student_topic_progress p
+        USING dup d
+        WHERE p.student_id = d.student_id AND p.topic = d.topic AND p.id <> d.keep_id
+    """))
+    _add_unique_constraint(db, "student_topic_progress", "uq_student_topic_progress", "student_id, topic")
+
+
+def challenge_scoreboard_version(db):
+    """Versión del marcador de cada versus (invalida la caché del marcador)"""
+    db.execute(text("ALTER TABLE challenges ADD COLUMN IF NOT EXISTS scoreboard_version INTEGER NOT NULL DEFAULT 0"))
+
+
+def exercise_challenge_sets(db):
+    """Conjunto fijo de ejercicios por versus (challenge_id, sequence)"""
+    db.execute(text("""
+        ALTER TABLE exercises
+        ADD COLUMN IF NOT EXISTS challenge_id UUID REFERENCES challenges(id) ON DELETE SET NULL
+    """))
+    db.execute(text("ALTER TABLE exercises ADD COLUMN IF NOT EXISTS sequence INTEGER"))
+    _add_unique_constraint(db, "exercises", "uq_exercise_challenge_sequence", "challenge_id, sequence")
+    # Los versus ya iniciados reciben aquí su conjunto (pedir un ejercicio nunca lo genera)
+    challenge_exercises.generate_missing_sets(db)
+
+
+def unique_student_goal(db):
+    """Asignación única por (meta, estudiante) para la asignación en bloque"""
+    # De las asignaciones repetidas se conserva la más avanzada (completada, luego mayor progreso)
+    db.execute(text("""
+        DELETE FROM student_goals g
+        USING (
+            SELECT id, row_number() OVER (
+                PARTITION BY goal_id, student_id
+                ORDER BY status = 'completed' DESC, current_value DESC NULLS LAST, created_at, id
+            ) AS position
+            FROM student_goals
+        ) ranked
+        WHERE g.id = ranked.id AND ranked.position > 1
+    """))
+    _add_unique_constraint(db, "student_goals", "uq_student_goal", "goal_id, student_id")
+
+
+def unique_student_badge(db):
+    """Insignia única por (insignia, estudiante) para el motor de reglas"""
+    # De las insignias repetidas se conserva la primera obtenida; queda equipada si alguna lo estaba
+    db.execute(text("""
+        WITH dup AS (
+            SELECT badge_id, student_id,
+                   (array_agg(id ORDER BY earned_at, id))[1] AS keep_id,
+                   bool_or(coalesce(is_equipped, false)) AS equipped
+            FROM student_badges
+            GROUP BY badge_id, student_id
+            HAVING count(*) > 1
+        ), merged AS (
+            UPDATE student_badges b
+            SET is_equipped = d.equipped
+            FROM dup d
+            WHERE b.id = d.keep_id
+        )
+        DELETE FROM student_badges b
+        USING dup d
+        WHERE b.badge_id = d.badge_id AND b.student_id = d.student_id AND b.id <> d.keep_id
+    """))
+    _add_unique_constraint(db, "student_badges", "uq_student_badge", "badge_id, student_id")
+
+
+def daily_activity_rollups(db):
+    """Rollups diarios reconstruidos desde el historial de sesiones e intentos"""
+    # Rankings, resumen de paralelos y snapshots de rendimiento leen solo de los rollups;
+    # la reconstrucción reemplaza los valores, así que repetir el paso no duplica nada
+    daily_activity.backfill(db)
+
+
+# Pasos en orden de aplicación
+STEPS = [
+    exercise_attempts_inline_exercise,
+    unique_student_topic_progress,
+    challenge_scoreboard_version,
+    exercise_challenge_sets,
+    unique_student_goal,
+    unique_student_badge,
+    daily_activity_rollups,
+]
+
+
+def upgrade_schema():
+    """Crea las tablas nuevas y aplica cada paso en su propia transacción"""
+    db = SessionLocal()
+
+    try:
+        print("🚀 Actualizando esquema...")
+
+        # Tablas nuevas (student_stats, rollups, snapshots, etc.)
+        Base.metadata.create_all(bind=engine)
+
+        for step in STEPS:
+            step(db)
+            db.commit()
+            print(f"✅ {step.__doc__}")
+
+        print("✅ Esquema actualizado")
+
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        db.rollback()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    upgrade_schema()
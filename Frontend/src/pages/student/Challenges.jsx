@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useMemo } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { motion, AnimatePresence } from 'framer-motion';
 import { Swords, Trophy, Clock, Users, Play, CheckCircle, Loader2, Crown, Zap } from 'lucide-react';
@@ -15,6 +15,22 @@ export default function Challenges() {
     loadChallenges();
   }, [filter]);
 
+  // Ids de los versus activos; solo cambian al cambiar el conjunto (no con cada puntaje)
+  const activeKey = challenges.filter(c => c.status === 'active').map(c => c.id).join(',');
+  const activeChallengeIds = useMemo(() => (activeKey ? activeKey.split(',') : []), [activeKey]);
+
+  // Marcadores en vivo de los versus activos (reemplaza recargar la lista)
+  useEffect(() => {
+    const sources = activeChallengeIds.map(id => studentService.subscribeChallengeScores(id, (update) => {
+      setChallenges(prev => prev.map(item => item.id !== id ? item : {
+        ...item,
+        paralelo1: { ...item.paralelo1, score: update.paralelo1Score },
+        paralelo2: { ...item.paralelo2, score: update.paralelo2Score }
+      }));
+    }));
+    return () => sources.forEach(source => source.close());
+  }, [activeChallengeIds]);
+
   const loadChallenges = async () => {
     try {
       setLoading(true);
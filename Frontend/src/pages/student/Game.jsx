@@ -353,7 +353,8 @@ export default function Game() {
         sessionId,
         currentExercise.exercise_id,
         selectedAnswer,
-        timeTaken
+        timeTaken,
+        currentExercise.exercise_token
       );
 
       if (response.success) {
@@ -652,7 +653,7 @@ export default function Game() {
         <AnimatePresence mode="wait">
           {currentExercise && (
             <motion.div
-              key={currentExercise.exercise_id}
+              key={currentExercise.exercise_id || currentExercise.exercise_token}
               initial={{ opacity: 0, y: 20 }}
               animate={{ opacity: 1, y: 0 }}
               exit={{ opacity: 0, y: -20 }}
@@ -47,6 +47,7 @@ export default function Goals() {
   const [showDetailModal, setShowDetailModal] = useState(false);
   const [selectedGoal, setSelectedGoal] = useState(null);
   const [goalStudents, setGoalStudents] = useState([]);
+  const [goalStudentsCursor, setGoalStudentsCursor] = useState(null);
   const [filter, setFilter] = useState('all');
   const [paraleloFilter, setParaleloFilter] = useState('');
 
@@ -133,6 +134,7 @@ export default function Goals() {
       const response = await teacherService.getGoalStudents(goal.id);
       if (response.success) {
         setGoalStudents(response.data.students);
+        setGoalStudentsCursor(response.data.nextCursor);
       }
     } catch (error) {
       console.error('Error al cargar estudiantes:', error);
@@ -140,6 +142,18 @@ export default function Goals() {
     setShowDetailModal(true);
   };
 
+  const handleLoadMoreGoalStudents = async () => {
+    try {
+      const response = await teacherService.getGoalStudents(selectedGoal.id, goalStudentsCursor);
+      if (response.success) {
+        setGoalStudents(prev => [...prev, ...response.data.students]);
+        setGoalStudentsCursor(response.data.nextCursor);
+      }
+    } catch (error) {
+      console.error('Error al cargar estudiantes:', error);
+    }
+  };
+
   const resetForm = () => {
     setFormData({
       title: '',
@@ -692,6 +706,14 @@ export default function Goals() {
                       )}
                     </motion.div>
                   ))}
+                  {goalStudentsCursor && (
+                    <button
+                      onClick={handleLoadMoreGoalStudents}
+                      className="w-full py-2 text-sm font-medium text-indigo-600 hover:bg-indigo-50 rounded-xl transition-colors"
+                    >
+                      Cargar más
+                    </button>
+                  )}
                 </div>
 
                 {goalStudents.length === 0 && (
@@ -1,4 +1,4 @@
-import api from './api';
+import api, { getApiUrl } from './api';
 
 const studentService = {
   // Iniciar sesión de juego
@@ -24,11 +24,12 @@ const studentService = {
   },
 
   // Enviar respuesta
-  submitAnswer: async (sessionId, exerciseId, answer, timeTaken) => {
+  submitAnswer: async (sessionId, exerciseId, answer, timeTaken, exerciseToken = null) => {
     try {
       const response = await api.post('/student/game/submit-answer', {
         session_id: sessionId,
         exercise_id: exerciseId,
+        exercise_token: exerciseToken,
         answer,
         time_taken: timeTaken
       });
@@ -138,6 +139,16 @@ const studentService = {
     }
   },
 
+  // Marcador en vivo de un versus (Server-Sent Events); devuelve el EventSource para cerrarlo
+  subscribeChallengeScores: (challengeId, onScore) => {
+    const token = localStorage.getItem('token');
+    const source = new EventSource(
+      `${getApiUrl()}/student/challenges/${challengeId}/live?token=${encodeURIComponent(token)}`
+    );
+    source.addEventListener('score', (event) => onScore(JSON.parse(event.data)));
+    return source;
+  },
+
   // ==================== METAS ====================
 
   // Obtener metas del estudiante
@@ -85,10 +85,11 @@ const teacherService = {
     }
   },
 
-  // Obtener estudiantes de una meta
-  getGoalStudents: async (goalId) => {
+  // Obtener estudiantes de una meta (paginado: pasar el nextCursor de la página anterior)
+  getGoalStudents: async (goalId, cursor = null) => {
     try {
-      const response = await api.get(`/teacher/goals/${goalId}/students`);
+      const params = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+      const response = await api.get(`/teacher/goals/${goalId}/students${params}`);
       return response.data;
     } catch (error) {
       console.error('Error al obtener estudiantes de la meta:', error);